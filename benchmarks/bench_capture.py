@@ -0,0 +1,78 @@
+"""Per-call overhead of ``capture`` vs. ``span`` on an empty body.
+
+Runs in a fresh interpreter with the prod (JSON) profile writing to a temp
+``run.log`` and a discarded console, and reports microseconds per call for:
+
+* ``capture``     - full span: END record, contextvars, rusage;
+* ``span``        - aggregated only (``sample=0``);
+* ``span@<rate>`` - aggregated, with every 1/rate-th call promoted to ``capture``.
+
+Usage::
+
+    python benchmarks/bench_capture.py [--calls N] [--sample RATE]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_CHILD = """
+import json, sys, time
+from logkit import capture, configure, span
+
+calls, rate = int(sys.argv[1]), float(sys.argv[2])
+configure()
+
+def timed(make):
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        with make():
+            pass
+    return round((time.perf_counter() - t0) / calls * 1e6, 3)
+
+print(json.dumps({
+    'capture': timed(lambda: capture(step='bench_capture')),
+    'span': timed(lambda: span(step='bench_span', sample=0)),
+    f'span@{rate:g}': timed(lambda: span(step='bench_sampled', sample=rate)),
+}))
+"""
+
+
+def run(calls: int, sample: float) -> dict[str, object]:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            'PYTHONPATH': str(ROOT / 'src'),
+            'LOG_PROFILE': 'prod',
+            'LOG_FILE': str(Path(tmp) / 'run.log'),
+            'LOG_ASYNC': '0',
+        }
+        out = subprocess.run(
+            [sys.executable, '-c', _CHILD, str(calls), str(sample)],
+            env=env,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+    return {'calls': calls, 'us_per_call': json.loads(out.stdout)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20_000)
+    parser.add_argument('--sample', type=float, default=0.01)
+    args = parser.parse_args()
+    print(json.dumps(run(args.calls, args.sample), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Sequential vs. process-pool context assembly.
+
+Builds the ``bench_e2e`` fixture (``vendor/whatthepatch`` replicated
+``--copies`` times), then for each changed-file count touches that many
+Python files and times :func:`ai_pr_review.context.process_pr_context` with
+``max_workers=1`` (in-process) and with ``--workers`` worker processes. The
+pool's break-even file count is what ``PARALLEL_MIN_FILES`` should be.
+
+Usage::
+
+    python benchmarks/bench_context_pool.py [--files 4,8,16,32] [--workers W]
+        [--copies N] [--repeat R]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / 'src'))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from bench_e2e import _git, _touch_hunks  # noqa: E402
+
+from ai_pr_review import context  # noqa: E402
+
+
+def build_repo(base: Path, copies: int) -> tuple[Path, list[Path]]:
+    work = base / 'work'
+    work.mkdir(parents=True)
+    for i in range(copies):
+        shutil.copytree(ROOT / 'vendor' / 'whatthepatch', work / f'copy{i}')
+    _git(work, 'init', '-q', '-b', 'main')
+    _git(work, 'config', 'user.email', 'bench@example.com')
+    _git(work, 'config', 'user.name', 'Bench')
+    _git(work, 'add', '.')
+    _git(work, 'commit', '-q', '-m', 'fixture')
+    return work, sorted(p for p in work.rglob('*.py') if p.stat().st_size > 0)
+
+
+def time_context(work: Path, diff: str, workers: int, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _ = context.process_pr_context(str(work), diff, max_workers=workers)
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 1)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', default='4,8,16,32')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--copies', type=int, default=6)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    # Time the pool at every size, whatever the current threshold is.
+    context.PARALLEL_MIN_FILES = 1
+    base = Path(tempfile.mkdtemp(prefix='bench_context_pool_'))
+    try:
+        work, py_files = build_repo(base, args.copies)
+        results = []
+        for count in (int(n) for n in args.files.split(',')):
+            if count > len(py_files):
+                raise SystemExit(f'--copies too small for {count} files')
+            for path in py_files[:count]:
+                _touch_hunks(path, 4, 'pool')
+            diff = subprocess.run(
+                ['git', 'diff'], cwd=work, check=True, capture_output=True, text=True
+            ).stdout
+            results.append(
+                {
+                    'files': count,
+                    'sequential_ms': time_context(work, diff, 1, args.repeat),
+                    'pool_ms': time_context(work, diff, args.workers, args.repeat),
+                }
+            )
+            _git(work, 'checkout', '-q', '--', '.')
+        print(
+            json.dumps(
+                {'cpus': os.cpu_count(), 'workers': args.workers, 'runs': results},
+                indent=2,
+            )
+        )
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,325 @@
+"""Offline end-to-end benchmark of ``review_pr``.
+
+Everything runs locally:
+
+* a bare git repository built from ``vendor/whatthepatch`` (replicated
+  ``--copies`` times) is served to ``git clone`` through ``GITHUB_URL``;
+* one pull request per diff size is recorded as a commit on that repository
+  and its ``git diff`` is served by a stub GitHub API (``GITHUB_API_URL``);
+* a stub OpenAI endpoint (``OPENAI_BASE_URL``) answers chat completions
+  after ``--llm-latency-ms``.
+
+Each diff size is reviewed ``--repeat`` times in a fresh interpreter, so peak
+RSS is per size. The diff-only fast path is disabled so every size exercises
+clone, checkout and context assembly. The report holds the best wall time,
+CPU time and peak RSS per stage (from ``logkit.metrics``) and the
+context-stage throughput. It is written as JSON to ``--output``. Pass
+``--baseline`` with an earlier report to print the per-stage change.
+
+Usage::
+
+    python benchmarks/bench_e2e.py [--sizes small,medium,large] [--repeat R]
+        [--output FILE] [--baseline FILE]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+ROOT = Path(__file__).resolve().parents[1]
+OWNER, REPO = 'bench', 'fixture'
+STAGES = ('fetch', 'clone', 'checkout', 'context', 'llm')
+# Diff size name -> (changed files, hunks per file).
+SIZES = {'small': (1, 2), 'medium': (10, 4), 'large': (40, 8)}
+
+_CHILD = """
+import json, sys
+from logkit import metrics
+from ai_pr_review.review import review_pr
+
+owner, repo, pr_number, repeat = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+runs = []
+for _ in range(repeat):
+    metrics.reset()
+    review_pr(owner, repo, pr_number, fast_path=False)
+    runs.append(metrics.summary())
+print(json.dumps(runs))
+"""
+
+
+# --------------------------------------------------------------------- fixtures
+def _git(repo: Path, *args: str) -> str:
+    out = subprocess.run(
+        ['git', *args], cwd=repo, check=True, capture_output=True, text=True
+    )
+    return out.stdout.strip()
+
+
+def _touch_hunks(path: Path, hunks: int, tag: str) -> None:
+    """Insert ``hunks`` comment lines spread evenly through a file."""
+    lines = path.read_text().splitlines(keepends=True)
+    step = max(1, len(lines) // hunks)
+    for i in reversed(range(0, min(len(lines), step * hunks), step)):
+        indent = lines[i][: len(lines[i]) - len(lines[i].lstrip())]
+        lines.insert(i, f'{indent}# bench: {tag} {i}\n')
+    path.write_text(''.join(lines))
+
+
+def build_fixtures(base: Path, copies: int, sizes: list[str]) -> dict[str, Any]:
+    """Create the bare repo and one PR commit per size; return the PR table."""
+    work = base / 'work'
+    work.mkdir(parents=True)
+    for i in range(copies):
+        shutil.copytree(ROOT / 'vendor' / 'whatthepatch', work / f'copy{i}')
+    _git(work, 'init', '-q', '-b', 'main')
+    _git(work, 'config', 'user.email', 'bench@example.com')
+    _git(work, 'config', 'user.name', 'Bench')
+    _git(work, 'add', '.')
+    _git(work, 'commit', '-q', '-m', 'fixture')
+    base_sha = _git(work, 'rev-parse', 'HEAD')
+    py_files = sorted(p for p in work.rglob('*.py') if p.stat().st_size > 0)
+
+    prs: dict[str, Any] = {}
+    for number, size in enumerate(sizes, start=1):
+        n_files, hunks = SIZES[size]
+        if n_files > len(py_files):
+            raise SystemExit(f'--copies too small for {size!r} ({len(py_files)} files)')
+        _git(work, 'checkout', '-q', '-b', f'pr/{number}', base_sha)
+        for path in py_files[:n_files]:
+            _touch_hunks(path, hunks, size)
+        _git(work, 'commit', '-q', '-am', f'{size} change')
+        head_sha = _git(work, 'rev-parse', 'HEAD')
+        diff = _git(work, 'diff', base_sha, head_sha) + '\n'
+        prs[str(number)] = {
+            'size': size,
+            'head_sha': head_sha,
+            'diff': diff,
+            'title': f'Benchmark {size} change',
+        }
+
+    bare = base / 'git' / OWNER / f'{REPO}.git'
+    subprocess.run(
+        ['git', 'clone', '-q', '--bare', str(work), str(bare)],
+        check=True,
+        capture_output=True,
+    )
+    return prs
+
+
+# ------------------------------------------------------------------ stub server
+def make_stub_server(prs: dict[str, Any], llm_latency_s: float) -> ThreadingHTTPServer:
+    """Serve the GitHub pull request API and OpenAI chat completions."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body: str, content_type: str) -> None:
+            data = body.encode()
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self) -> None:
+            prefix = f'/repos/{OWNER}/{REPO}/pulls/'
+            pr = prs.get(self.path.removeprefix(prefix))
+            if not self.path.startswith(prefix) or pr is None:
+                self.send_error(404)
+                return
+            if 'diff' in self.headers.get('Accept', ''):
+                self._send(pr['diff'], 'text/plain')
+            else:
+                meta = {
+                    'head': {'sha': pr['head_sha']},
+                    'title': pr['title'],
+                    'body': 'Recorded benchmark fixture.',
+                }
+                self._send(json.dumps(meta), 'application/json')
+
+        def do_POST(self) -> None:
+            if self.path != '/v1/chat/completions':
+                self.send_error(404)
+                return
+            request = self.rfile.read(int(self.headers['Content-Length']))
+            time.sleep(llm_latency_s)
+            prompt_tokens = len(request) // 4
+            completion = {
+                'id': 'chatcmpl-bench',
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': json.loads(request)['model'],
+                'choices': [
+                    {
+                        'index': 0,
+                        'finish_reason': 'stop',
+                        'message': {'role': 'assistant', 'content': 'LGTM.'},
+                    }
+                ],
+                'usage': {
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': 2,
+                    'total_tokens': prompt_tokens + 2,
+                },
+            }
+            self._send(json.dumps(completion), 'application/json')
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+
+
+# -------------------------------------------------------------------- reporting
+def summarize(size: str, runs: list[dict[str, Any]]) -> dict[str, Any]:
+    """Reduce per-run metrics to the best run per stage."""
+    stages: dict[str, Any] = {}
+    for stage in (*STAGES, 'total'):
+        name = 'work=review_pr' if stage == 'total' else f'stage={stage}'
+        samples = [run[name] for run in runs if name in run]
+        stages[stage] = {
+            'wall_ms': min(s['dur_ms_sum'] for s in samples),
+            'cpu_ms': min(s['cpu_ms_sum'] for s in samples),
+            'child_cpu_ms': min(s['child_cpu_ms_sum'] for s in samples),
+            'max_rss_kb': max(s['max_rss_kb'] for s in samples),
+        }
+    counters = {
+        k: v
+        for run in runs[:1]
+        for st in run.values()
+        for k, v in st['counters'].items()
+    }
+    context_s = stages['context']['wall_ms'] / 1000 or 1e-9
+    return {
+        'size': size,
+        'runs': len(runs),
+        'stages': stages,
+        'diff_bytes': counters.get('diff_bytes', 0),
+        'diff_lines': counters.get('diff_lines', 0),
+        'context_chars': counters.get('context_chars', 0),
+        'context_diff_mb_per_s': round(
+            counters.get('diff_bytes', 0) / 1e6 / context_s, 3
+        ),
+        'context_diff_lines_per_s': round(counters.get('diff_lines', 0) / context_s),
+    }
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    """Return one line per size and stage with the wall-time change vs. baseline."""
+    old = {r['size']: r for r in baseline['results']}
+    lines = []
+    for result in report['results']:
+        prev = old.get(result['size'])
+        if prev is None:
+            continue
+        for stage, st in result['stages'].items():
+            before = prev['stages'].get(stage, {}).get('wall_ms')
+            if not before:
+                continue
+            change = (st['wall_ms'] - before) / before * 100
+            lines.append(
+                f'{result["size"]:>6} {stage:>8}: {before:9.1f} -> '
+                f'{st["wall_ms"]:9.1f} ms ({change:+.1f}%)'
+            )
+    return lines
+
+
+def _version() -> str:
+    try:
+        return _git(ROOT, 'describe', '--always', '--dirty')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    sizes = [s for s in args.sizes.split(',') if s]
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        prs = build_fixtures(base, args.copies, sizes)
+        server = make_stub_server(prs, args.llm_latency_ms / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+        env = {
+            **os.environ,
+            'PYTHONPATH': str(ROOT / 'src'),
+            'GITHUB_API_URL': url,
+            'GITHUB_URL': (base / 'git').as_uri(),
+            'GITHUB_TOKEN': '',
+            'OPENAI_API_KEY': 'bench',
+            'OPENAI_BASE_URL': f'{url}/v1',
+            'LOG_PROFILE': 'prod',
+            'LOG_FILE': str(base / 'run.log'),
+        }
+        env.pop('AI_PR_REVIEW_INDEX_DIR', None)
+        results = []
+        try:
+            for number, pr in prs.items():
+                out = subprocess.run(
+                    [
+                        sys.executable,
+                        '-c',
+                        _CHILD,
+                        OWNER,
+                        REPO,
+                        number,
+                        str(args.repeat),
+                    ],
+                    cwd=tmp,
+                    env=env,
+                    check=True,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                )
+                runs = json.loads(out.stdout.strip().splitlines()[-1])
+                results.append(summarize(pr['size'], runs))
+        finally:
+            server.shutdown()
+    return {
+        'version': _version(),
+        'python': platform.python_version(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'params': {
+            'copies': args.copies,
+            'repeat': args.repeat,
+            'llm_latency_ms': args.llm_latency_ms,
+        },
+        'results': results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=','.join(SIZES))
+    parser.add_argument('--copies', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--llm-latency-ms', type=float, default=200.0)
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--baseline', help='earlier report to compare against')
+    args = parser.parse_args()
+    unknown = set(args.sizes.split(',')) - set(SIZES)
+    if unknown:
+        parser.error(f'unknown sizes: {", ".join(sorted(unknown))}')
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + '\n')
+    print(text)
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        print('\n'.join(compare(report, baseline)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Import-time profile of the CLI entry point via ``python -X importtime``.
+
+Runs a fresh interpreter ``--repeat`` times, keeps the best cumulative time
+per module and prints the total plus the ``--top`` most expensive imports.
+
+Usage::
+
+    python benchmarks/bench_import_time.py [--module ai_pr_review.cli] [--top 15]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def importtime(module: str) -> dict[str, int]:
+    env = {**os.environ, 'PYTHONPATH': str(ROOT / 'src')}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, cumulative, name = line[len('import time:') :].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='ai_pr_review.cli')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    best: dict[str, int] = {}
+    for _ in range(args.repeat):
+        for name, us in importtime(args.module).items():
+            best[name] = min(us, best.get(name, us))
+    top = sorted(best.items(), key=lambda kv: kv[1], reverse=True)[: args.top]
+    print(
+        json.dumps(
+            {
+                'module': args.module,
+                'total_ms': round(best[args.module] / 1000, 1),
+                'top_ms': {name: round(us / 1000, 1) for name, us in top},
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Log-heavy throughput: inline (LOG_ASYNC=0) vs. queued sink (LOG_ASYNC=1).
+
+Each mode runs in a fresh interpreter because logkit configures itself from
+the environment. The child emits ``--lines`` records from ``--threads``
+threads with the prod (JSON) profile, writing to a temp ``run.log`` and to a
+discarded console stream, and reports:
+
+* ``caller_lines_per_s`` - how fast the hot path returns to the caller;
+* ``drained_lines_per_s`` - end-to-end, including draining the queue at exit;
+* ``written`` / ``dropped`` - records that reached the file vs. were shed.
+
+Usage::
+
+    python benchmarks/bench_logging.py [--lines N] [--threads T]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+_CHILD = """
+import json, sys, threading, time
+import logkit
+from logkit import log
+
+lines, threads = int(sys.argv[1]), int(sys.argv[2])
+
+def work(n):
+    for i in range(n):
+        log.info('bench', i=i, payload='x' * 64)
+
+t0 = time.perf_counter()
+workers = [threading.Thread(target=work, args=(lines // threads,)) for _ in range(threads)]
+for w in workers:
+    w.start()
+for w in workers:
+    w.join()
+caller = time.perf_counter() - t0
+sink = next((h for h in logkit.logging.getLogger().handlers if isinstance(h, logkit._QueueSink)), None)
+print(json.dumps({'caller_s': caller, 'dropped': sink.dropped if sink else 0}))
+"""
+
+
+def run_mode(
+    async_sink: bool, lines: int, threads: int, policy: str
+) -> dict[str, object]:
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = Path(tmp) / 'run.log'
+        env = {
+            **os.environ,
+            'PYTHONPATH': str(ROOT / 'src'),
+            'LOG_PROFILE': 'prod',
+            'LOG_FILE': str(log_file),
+            'LOG_ASYNC': '1' if async_sink else '0',
+            'LOG_QUEUE_POLICY': policy,
+        }
+        t0 = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, '-c', _CHILD, str(lines), str(threads)],
+            env=env,
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        total = time.perf_counter() - t0
+        child = json.loads(out.stdout)
+        written = sum(1 for _ in log_file.open())
+    return {
+        'mode': f'async/{policy}' if async_sink else 'sync',
+        'caller_lines_per_s': round(lines / child['caller_s']),
+        'drained_lines_per_s': round(written / total),
+        'written': written,
+        'dropped': child['dropped'],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=50_000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+    results = [
+        run_mode(False, args.lines, args.threads, 'block'),
+        run_mode(True, args.lines, args.threads, 'block'),
+        run_mode(True, args.lines, args.threads, 'drop'),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""Throughput and peak memory of diff parsing on large synthetic corpora.
+
+For every :mod:`diffgen` scenario this measures:
+
+* ``parse_patch``     - ``list(whatthepatch.parse_patch(text))``;
+* ``apply_diff``      - ``whatthepatch.apply_diff`` for every parsed text
+  diff against its original file (results are checked against the new text);
+* ``parse_patchset`` - :func:`ai_pr_review.patchset.parse_patchset`.
+
+Each operation reports the best of ``--repeat`` runs as MB/s and lines/s of
+patch text, plus peak traced memory from a separate ``tracemalloc`` pass.
+
+Usage::
+
+    python benchmarks/bench_parser.py [--scenario NAME ...] [--scale X]
+        [--repeat R] [--output FILE]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / 'src'))
+
+from diffgen import SCENARIOS, Corpus, scenarios  # noqa: E402
+from whatthepatch import apply_diff, parse_patch  # noqa: E402
+
+from ai_pr_review.patchset import parse_patchset  # noqa: E402
+
+
+def _apply_all(corpus: Corpus, diffs: list[Any]) -> int:
+    applied = 0
+    for diff in diffs:
+        if diff.header is None or not diff.changes:
+            continue
+        source = corpus.sources.get(diff.header.old_path)
+        if source is None:
+            continue
+        old_lines, new_lines = source
+        if apply_diff(diff, old_lines) != new_lines:
+            raise AssertionError(f'{corpus.name}: bad apply of {diff.header.old_path}')
+        applied += 1
+    return applied
+
+
+def _measure(fn: Callable[[], object], repeat: int) -> tuple[float, int]:
+    """Return (best seconds, peak traced bytes) for ``fn``."""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def bench_corpus(corpus: Corpus, repeat: int) -> dict[str, Any]:
+    diffs = list(parse_patch(corpus.text))
+    with_header = sum(1 for d in diffs if d.header is not None)
+    expected = len(corpus.sources) + corpus.binary_files
+    if with_header != expected:
+        raise AssertionError(
+            f'{corpus.name}: parsed {with_header} file diffs, expected {expected}'
+        )
+    applied = _apply_all(corpus, diffs)
+    if applied != len(corpus.sources):
+        raise AssertionError(
+            f'{corpus.name}: applied {applied} diffs, expected {len(corpus.sources)}'
+        )
+
+    ops: dict[str, Callable[[], object]] = {
+        'parse_patch': lambda: list(parse_patch(corpus.text)),
+        'apply_diff': lambda: _apply_all(corpus, diffs),
+        'parse_patchset': lambda: parse_patchset(corpus.text),
+    }
+    mb, lines = corpus.size_bytes / 1e6, corpus.line_count
+    results: dict[str, Any] = {}
+    for name, fn in ops.items():
+        seconds, peak = _measure(fn, repeat)
+        results[name] = {
+            'ms': round(seconds * 1000, 2),
+            'mb_per_s': round(mb / seconds, 2),
+            'lines_per_s': round(lines / seconds),
+            'peak_mb': round(peak / 1e6, 2),
+        }
+    return {
+        'scenario': corpus.name,
+        'format': corpus.spec.fmt,
+        'mb': round(mb, 2),
+        'lines': lines,
+        'files': len(diffs),
+        'binary_files': corpus.binary_files,
+        'applied': applied,
+        'ops': results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS))
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here')
+    args = parser.parse_args()
+
+    report = [
+        bench_corpus(corpus, args.repeat)
+        for corpus in scenarios(args.scenario, args.scale, args.seed)
+    ]
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + '\n')
+    print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Cold vs. warm benchmark for the persistent symbol index.
+
+Builds a local fixture git repository from ``vendor/whatthepatch`` (optionally
+replicated to make it larger) and times three refreshes of
+:class:`ai_pr_review.index.SymbolIndex`:
+
+* ``cold``   - empty cache directory, every blob is parsed;
+* ``warm``   - same commit, everything is reused from disk;
+* ``commit`` - after a commit touching one file, only that blob is parsed.
+
+Usage::
+
+    python benchmarks/bench_symbol_index.py [--copies N] [--repeat R]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / 'src'))
+
+from ai_pr_review.index import SymbolIndex  # noqa: E402
+
+
+def _git(repo: Path, *args: str) -> None:
+    subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True)
+
+
+def build_fixture_repo(dest: Path, copies: int) -> Path:
+    """Create a git repo with ``copies`` copies of the vendored whatthepatch."""
+    src = ROOT / 'vendor' / 'whatthepatch'
+    dest.mkdir(parents=True)
+    for i in range(copies):
+        shutil.copytree(src, dest / f'copy{i}')
+    _git(dest, 'init', '-q')
+    _git(dest, 'config', 'user.email', 'bench@example.com')
+    _git(dest, 'config', 'user.name', 'Bench')
+    _git(dest, 'add', '.')
+    _git(dest, 'commit', '-q', '-m', 'fixture')
+    return dest
+
+
+def _timed_refresh(repo: Path, cache: Path) -> dict[str, float | int]:
+    t0 = time.perf_counter()
+    index = SymbolIndex.open(str(repo), str(cache))
+    index.refresh()
+    index.save()
+    return {
+        'ms': round((time.perf_counter() - t0) * 1000, 2),
+        'parsed': index.parsed,
+        'reused': index.reused,
+    }
+
+
+def run(copies: int, repeat: int) -> dict[str, object]:
+    results: dict[str, list[dict[str, float | int]]] = {
+        'cold': [],
+        'warm': [],
+        'commit': [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = build_fixture_repo(Path(tmp) / 'repo', copies)
+        target = repo / 'copy0' / 'src' / 'whatthepatch' / 'patch.py'
+        for i in range(repeat):
+            cache = Path(tmp) / f'cache{i}'
+            results['cold'].append(_timed_refresh(repo, cache))
+            results['warm'].append(_timed_refresh(repo, cache))
+            target.write_text(target.read_text() + f'\n# bench {i}\n')
+            _git(repo, 'commit', '-q', '-am', f'touch {i}')
+            results['commit'].append(_timed_refresh(repo, cache))
+
+    summary: dict[str, object] = {'copies': copies, 'repeat': repeat}
+    for name, runs in results.items():
+        summary[name] = {
+            'best_ms': min(float(r['ms']) for r in runs),
+            'parsed': runs[-1]['parsed'],
+            'reused': runs[-1]['reused'],
+        }
+    return summary
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--copies', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    print(json.dumps(run(args.copies, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""Deterministic generator of large, realistic diffs for parser benchmarks.
+
+A corpus is a set of synthetic source files, each edited in ``hunks`` places,
+rendered as one patch in one of these formats:
+
+* ``git``     - ``diff --git`` with ``index`` lines, plus optional renames
+  (``similarity index`` / ``rename from`` / ``rename to``) and
+  ``GIT binary patch`` literals;
+* ``svn``     - ``Index:`` / ``=====`` headers with ``(revision N)``;
+* ``cvs``     - ``Index:`` / ``RCS file:`` / ``retrieving revision`` headers;
+* ``context`` - ``diff -c`` style ``***`` / ``---`` hunks.
+
+Any format can use CRLF line endings. The original text of every edited
+file is kept, keyed by the old path as whatthepatch reports it, so
+``apply_diff`` can be measured and checked as well.
+
+Usage::
+
+    python benchmarks/diffgen.py OUT_DIR [--scenario NAME] [--scale X]
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import difflib
+import random
+import zlib
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class Spec:
+    fmt: str = 'git'
+    files: int = 100
+    lines: int = 300
+    hunks: int = 3
+    hunk_size: int = 6
+    renames: float = 0.0
+    binaries: float = 0.0
+    crlf: bool = False
+
+
+@dataclass
+class Corpus:
+    name: str
+    spec: Spec
+    text: str
+    # old path -> (old lines, new lines) for every text file with changes
+    sources: dict[str, tuple[list[str], list[str]]] = field(default_factory=dict)
+    binary_files: int = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.text.encode())
+
+    @property
+    def line_count(self) -> int:
+        return self.text.count('\n')
+
+
+SCENARIOS: dict[str, Spec] = {
+    'git-many-files': Spec(files=2000, lines=200, hunks=2),
+    'git-huge-hunks': Spec(files=8, lines=20_000, hunks=2, hunk_size=4000),
+    'git-mixed': Spec(files=500, renames=0.2, binaries=0.1),
+    'git-crlf': Spec(files=500, crlf=True),
+    'svn': Spec(fmt='svn', files=500),
+    'cvs': Spec(fmt='cvs', files=500),
+    'context': Spec(fmt='context', files=500),
+}
+
+_WORDS = (
+    'value result index count buffer offset token parser state config '
+    'request response handler cache entry record payload item node path'
+).split()
+
+
+def _source_lines(rng: random.Random, n: int, file_no: int) -> list[str]:
+    """Python-looking lines; the line number keeps every line unique."""
+    lines: list[str] = []
+    for i in range(n):
+        if i % 25 == 0:
+            lines.append(
+                f'def {rng.choice(_WORDS)}_{file_no}_{i}(self, {rng.choice(_WORDS)}):'
+            )
+        else:
+            a, b = rng.choice(_WORDS), rng.choice(_WORDS)
+            lines.append(f'    {a}_{i} = {b}.get({i}) or {rng.randint(0, 9999)}')
+    return lines
+
+
+def _edit(rng: random.Random, old: list[str], spec: Spec) -> list[str]:
+    """Replace ``hunk_size`` lines at ``hunks`` evenly spaced places."""
+    new = list(old)
+    stride = max(1, len(old) // spec.hunks)
+    size = min(spec.hunk_size, max(1, stride - 8))
+    for h in reversed(range(spec.hunks)):
+        start = h * stride + rng.randint(0, max(0, stride - size - 1))
+        removed = rng.randint(0, size)
+        added = [f'    changed_{h}_{k} = {rng.random():.6f}' for k in range(size)]
+        new[start : start + removed] = added
+    return new
+
+
+def _git_binary(rng: random.Random, n_bytes: int) -> list[str]:
+    """A ``GIT binary patch`` literal block (git's base85, 52 bytes per line)."""
+    data = zlib.compress(rng.randbytes(n_bytes))
+    out = ['GIT binary patch', f'literal {n_bytes}']
+    for i in range(0, len(data), 52):
+        chunk = data[i : i + 52]
+        n = len(chunk)
+        prefix = chr(ord('A') + n - 1) if n <= 26 else chr(ord('a') + n - 27)
+        out.append(prefix + base64.b85encode(chunk, pad=True).decode())
+    out += ['', 'literal 0', 'HcmV?d00001', '']
+    return out
+
+
+def _header(spec: Spec, i: int, old: str, new: str, rename: bool) -> list[str]:
+    if spec.fmt == 'git':
+        out = [f'diff --git a/{old} b/{new}']
+        if rename:
+            out += ['similarity index 91%', f'rename from {old}', f'rename to {new}']
+        out.append(f'index {i:07x}a..{i:07x}b 100644')
+        return out
+    if spec.fmt == 'svn':
+        return [f'Index: {new}', '=' * 67]
+    if spec.fmt == 'cvs':
+        return [
+            f'Index: {new}',
+            '=' * 67,
+            f'RCS file: /cvsroot/bench/{new},v',
+            'retrieving revision 1.4',
+            'diff -u -r1.4 ' + new,
+        ]
+    return []
+
+
+def _file_labels(spec: Spec, old: str, new: str) -> tuple[str, str]:
+    if spec.fmt == 'git':
+        return f'a/{old}', f'b/{new}'
+    if spec.fmt == 'svn':
+        return f'{old}\t(revision 1200)', f'{new}\t(working copy)'
+    if spec.fmt == 'cvs':
+        return (
+            f'{old}\t5 Jan 2013 16:56:19 -0000\t1.4',
+            f'{new}\t5 Jan 2013 16:56:35 -0000',
+        )
+    return (
+        f'{old}\t2013-01-05 16:56:19.000000000 -0600',
+        f'{new}\t2013-01-05 16:56:35.000000000 -0600',
+    )
+
+
+def generate(spec: Spec, seed: int = 0, name: str = '') -> Corpus:
+    """Render one corpus for ``spec``; the same seed gives the same text."""
+    rng = random.Random(seed)
+    out: list[str] = []
+    corpus = Corpus(name=name or spec.fmt, spec=spec, text='')
+    for i in range(spec.files):
+        old_path = f'pkg{i % 40}/module_{i}.py'
+        if spec.fmt == 'git' and rng.random() < spec.binaries:
+            path = f'assets/blob_{i}.bin'
+            out += [
+                f'diff --git a/{path} b/{path}',
+                'new file mode 100644',
+                f'index 0000000..{i:07x}c',
+            ]
+            out += _git_binary(rng, rng.randint(64, 4096))
+            corpus.binary_files += 1
+            continue
+        rename = spec.fmt == 'git' and rng.random() < spec.renames
+        new_path = f'pkg{i % 40}/renamed_{i}.py' if rename else old_path
+        old_lines = _source_lines(rng, spec.lines, i)
+        new_lines = _edit(rng, old_lines, spec)
+        from_label, to_label = _file_labels(spec, old_path, new_path)
+        differ = difflib.context_diff if spec.fmt == 'context' else difflib.unified_diff
+        body = list(differ(old_lines, new_lines, from_label, to_label, lineterm=''))
+        if not body:
+            continue
+        out += _header(spec, i, old_path, new_path, rename)
+        out += body
+        corpus.sources[old_path] = (old_lines, new_lines)
+    eol = '\r\n' if spec.crlf else '\n'
+    corpus.text = eol.join(out) + eol
+    return corpus
+
+
+def scenarios(
+    names: list[str] | None = None, scale: float = 1.0, seed: int = 0
+) -> list[Corpus]:
+    """Generate the named scenarios (all by default), scaling the file count."""
+    out = []
+    for name in names or list(SCENARIOS):
+        spec = SCENARIOS[name]
+        files = max(1, round(spec.files * scale))
+        out.append(generate(replace(spec, files=files), seed, name))
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('out_dir', type=Path)
+    parser.add_argument('--scenario', action='append', choices=list(SCENARIOS))
+    parser.add_argument('--scale', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    for corpus in scenarios(args.scenario, args.scale, args.seed):
+        path = args.out_dir / f'{corpus.name}.diff'
+        path.write_bytes(corpus.text.encode())
+        print(f'{path}\t{corpus.size_bytes / 1e6:.2f} MB\t{corpus.line_count} lines')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import ast
+import os
+import threading
+from collections import OrderedDict
+from typing import cast
+
+DEFAULT_MAX_BYTES = 64 * 1_048_576
+MAX_FILE_BYTES = 1_048_576
+# Rough in-memory size of a Python AST relative to its source text.
+_AST_SIZE_FACTOR = 8
+
+
+class FileCache:
+    """Per-run LRU cache of file contents and Python parse trees.
+
+    Entries are evicted least-recently-used first once their estimated size
+    exceeds ``max_bytes``. Missing, oversized and binary files are cached as
+    ``None`` so they are not re-read either. The cache is thread-safe so the
+    usage scan can share it with context assembly.
+    """
+
+    def __init__(self, repo_path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.repo_path = repo_path
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple[str, str], tuple[object, int]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters: dict[str, int] = {
+            'text_hits': 0,
+            'text_misses': 0,
+            'tree_hits': 0,
+            'tree_misses': 0,
+            'evictions': 0,
+        }
+
+    def _get(self, kind: str, rel_path: str) -> tuple[bool, object]:
+        key = (kind, rel_path)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.counters[f'{kind}_hits'] += 1
+                return True, self._entries[key][0]
+            self.counters[f'{kind}_misses'] += 1
+            return False, None
+
+    def _put(self, kind: str, rel_path: str, value: object, size: int) -> None:
+        key = (kind, rel_path)
+        with self._lock:
+            if key in self._entries:
+                return
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _key, (_value, old_size) = self._entries.popitem(last=False)
+                self._bytes -= old_size
+                self.counters['evictions'] += 1
+
+    def text(self, rel_path: str) -> str | None:
+        """Return a file's text, or None if it is missing, binary or too big."""
+        found, value = self._get('text', rel_path)
+        if found:
+            return cast(str | None, value)
+        text: str | None = None
+        root = os.path.realpath(self.repo_path)
+        abs_path = os.path.realpath(os.path.join(root, rel_path))
+        try:
+            # Paths come from the PR diff; never read outside the checkout.
+            if os.path.commonpath([root, abs_path]) != root:
+                text = None
+            elif os.path.getsize(abs_path) <= MAX_FILE_BYTES:
+                with open(abs_path, 'rb') as fh:
+                    raw = fh.read()
+                if b'\0' not in raw:
+                    text = raw.decode('utf-8', errors='ignore')
+        except (OSError, ValueError):
+            text = None
+        self._put('text', rel_path, text, len(text) if text else 1)
+        return text
+
+    def python_tree(self, rel_path: str) -> ast.Module | None:
+        """Return the parsed AST of a Python file, or None if it cannot parse."""
+        found, value = self._get('tree', rel_path)
+        if found:
+            return cast(ast.Module | None, value)
+        code = self.text(rel_path)
+        tree: ast.Module | None = None
+        if code is not None:
+            try:
+                tree = ast.parse(code, filename=rel_path)
+            except (SyntaxError, ValueError):
+                tree = None
+        size = len(code) * _AST_SIZE_FACTOR if code and tree else 1
+        self._put('tree', rel_path, tree, size)
+        return tree
+
+    def stats(self) -> dict[str, float | int]:
+        """Return hit/miss counters, hit rates and the current size in bytes."""
+        with self._lock:
+            stats: dict[str, float | int] = dict(self.counters)
+            stats['bytes'] = self._bytes
+        for kind in ('text', 'tree'):
+            total = stats[f'{kind}_hits'] + stats[f'{kind}_misses']
+            stats[f'{kind}_hit_rate'] = (
+                round(stats[f'{kind}_hits'] / total, 3) if total else 0.0
+            )
+        return stats
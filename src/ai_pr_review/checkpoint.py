@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import stat
+import tempfile
+from collections.abc import Iterator, MutableMapping
+from typing import cast
+
+from logkit import log
+
+from .errors import ConfigurationError
+
+_SAFE_RE = re.compile(r'[^A-Za-z0-9._-]')
+
+
+def default_checkpoint_dir() -> str:
+    """``AI_PR_REVIEW_CHECKPOINT_DIR``, or a directory in the user's cache dir.
+
+    The cache dir is ``$XDG_CACHE_HOME``, falling back to ``~/.cache``, so
+    the default is never shared between users.
+    """
+    cache_home = os.getenv('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache'
+    )
+    return os.getenv('AI_PR_REVIEW_CHECKPOINT_DIR') or os.path.join(
+        cache_home, 'ai-pr-review', 'checkpoints'
+    )
+
+
+def stage_key(*parts: str) -> str:
+    """Short digest of the inputs a stage result depends on."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode() + b'\0')
+    return digest.hexdigest()[:16]
+
+
+def _write_atomic(path: str, text: str) -> None:
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+        _ = fh.write(text)
+    os.replace(tmp_path, path)
+
+
+def _private_root(root: str) -> None:
+    """Create ``root`` for the current user only, or check that it is so.
+
+    Raises :class:`ConfigurationError` for an existing directory that is
+    owned by another user or open to others, since checkpoints hold private
+    code and reviews and are read back without further checks.
+    """
+    try:
+        os.makedirs(root, mode=0o700)
+    except FileExistsError:
+        pass
+    else:
+        # ``makedirs`` applies the umask; a fresh root is ours to fix.
+        os.chmod(root, 0o700)
+    getuid = getattr(os, 'getuid', None)
+    if getuid is None:  # pragma: no cover - not POSIX
+        return
+    st = os.stat(root)
+    if st.st_uid != getuid():
+        raise ConfigurationError(
+            f'Checkpoint directory {root} is owned by another user; '
+            'set AI_PR_REVIEW_CHECKPOINT_DIR to a directory of your own'
+        )
+    if stat.S_IMODE(st.st_mode) != 0o700:
+        raise ConfigurationError(
+            f'Checkpoint directory {root} has mode '
+            f'{stat.S_IMODE(st.st_mode):o}; run chmod 700 on it'
+        )
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path, encoding='utf-8') as fh:
+            return fh.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+class ChunkReviews(MutableMapping[str, str]):
+    """Reviews of individual context chunks, one file per chunk key."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{_SAFE_RE.sub("_", key)}.md')
+
+    def __getitem__(self, key: str) -> str:
+        text = _read(self._path(key))
+        if text is None:
+            raise KeyError(key)
+        return text
+
+    def __setitem__(self, key: str, value: str) -> None:
+        _write_atomic(self._path(key), value)
+
+    def __delitem__(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            raise KeyError(key) from None
+
+    def __iter__(self) -> Iterator[str]:
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError:
+            return iter(())
+        return iter(name[:-3] for name in names if name.endswith('.md'))
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class ReviewCheckpoint:
+    """Stage results of one pull request review, persisted between runs.
+
+    Checkpoints live in ``<root>/<owner>/<name>/<number>/<head_sha>/``, so a
+    new push starts from scratch; checkpoints of older heads are removed.
+    The fetched diff is stored too, and a checkpoint whose diff no longer
+    matches (e.g. after the base branch moved) is discarded. Reviews hold
+    private code, so ``root`` is created readable by its owner only, and an
+    existing ``root`` that is not private to the current user is refused.
+    """
+
+    def __init__(self, root: str, repo_owner: str, repo_name: str, pr_number: int):
+        self.root = root
+        self.pr_dir = os.path.join(
+            root,
+            _SAFE_RE.sub('_', repo_owner),
+            _SAFE_RE.sub('_', repo_name),
+            str(pr_number),
+        )
+        self.path: str | None = None
+        self.resumed: list[str] = []
+
+    def clear(self) -> None:
+        """Remove every checkpoint of this pull request."""
+        shutil.rmtree(self.pr_dir, ignore_errors=True)
+
+    def start(self, head_sha: str, diff_text: str, *, resume: bool) -> None:
+        """Select the checkpoint for ``head_sha``, keeping it only if resuming."""
+        head = _SAFE_RE.sub('_', head_sha)
+        _private_root(self.root)
+        self.path = os.path.join(self.pr_dir, head)
+        try:
+            stale = [name for name in os.listdir(self.pr_dir) if name != head]
+        except OSError:
+            stale = []
+        for name in stale:
+            shutil.rmtree(os.path.join(self.pr_dir, name), ignore_errors=True)
+        if resume and _read(self._file('diff.patch')) not in (None, diff_text):
+            log.warning('checkpoint diff changed, starting over', path=self.path)
+            resume = False
+        if not resume:
+            shutil.rmtree(self.path, ignore_errors=True)
+        self.save('diff.patch', diff_text)
+
+    def _file(self, name: str) -> str:
+        assert self.path is not None, 'start() must be called first'
+        return os.path.join(self.path, name)
+
+    def load(self, name: str) -> str | None:
+        """Return a stage result, or ``None`` if that stage has not finished."""
+        text = _read(self._file(name))
+        if text is not None:
+            self.resumed.append(name)
+        return text
+
+    def save(self, name: str, text: str) -> None:
+        _write_atomic(self._file(name), text)
+
+    def load_json(self, name: str) -> object | None:
+        text = self.load(name)
+        if text is None:
+            return None
+        try:
+            return cast(object, json.loads(text))
+        except ValueError:
+            return None
+
+    def save_json(self, name: str, value: object) -> None:
+        self.save(name, json.dumps(value))
+
+    @property
+    def chunks(self) -> ChunkReviews:
+        return ChunkReviews(self._file('chunks'))
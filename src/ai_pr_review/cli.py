@@ -1,18 +1,24 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
 import sys
-from typing import cast
+import threading
+from typing import TYPE_CHECKING, Iterable, Iterator, cast
 
-from logkit import capture, log, new_context
+from logkit import capture, log, log_span_summary, new_context
 
-from .errors import ReviewError
+from .checkpoint import ReviewCheckpoint, default_checkpoint_dir
+from .errors import PublishError, ReviewError
 from .review import review_pr
 
+if TYPE_CHECKING:
+    from .profiling import SamplingProfiler
+    from .scheduler import ReviewJob
+
 
 def main(cli_args: list[str] | None = None) -> None:
     """Entry point for the command line interface."""
-    new_context(cmd='cli')
     parser = argparse.ArgumentParser(
         description='AI PR Reviewer using Kit and whatthepatch (Version 1)'
     )
@@ -33,22 +39,186 @@ def main(cli_args: list[str] | None = None) -> None:
         default='gpt-4.1',
         help='OpenAI model to use for generating the review',
     )
+    parser.add_argument(
+        '--post',
+        action='store_true',
+        help='Post the review to the pull request, with inline comments',
+    )
+    rerun = parser.add_mutually_exclusive_group()
+    rerun.add_argument(
+        '--resume',
+        action='store_true',
+        help='Reuse stages checkpointed by an earlier run of this PR head',
+    )
+    rerun.add_argument(
+        '--force',
+        action='store_true',
+        help="Delete this PR's checkpoints and run every stage again",
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='PATH',
+        help='Sample the review and write a profile to PATH: speedscope JSON '
+        'for a .json path, collapsed stacks otherwise',
+    )
+    parser.add_argument(
+        '--profile-top',
+        type=int,
+        default=10,
+        help='Functions per stage in the printed hotspot table',
+    )
 
     args = parser.parse_args(cli_args)
+    new_context(cmd='cli')
+    checkpoint_dir = default_checkpoint_dir()
+    if cast(bool, args.force):
+        ReviewCheckpoint(
+            checkpoint_dir,
+            cast(str, args.repo_owner),
+            cast(str, args.repo_name),
+            cast(int, args.pr_number),
+        ).clear()
+    profile_path = cast(str | None, args.profile)
+    profiler: SamplingProfiler | None = None
+    if profile_path:
+        from .profiling import SamplingProfiler
+
+        profiler = SamplingProfiler()
     review_text: str | None = None
     try:
-        with capture(cli='run'):
+        with profiler or contextlib.nullcontext(), capture(cli='run'):
             review_text = review_pr(
                 cast(str, args.repo_owner),
                 cast(str, args.repo_name),
                 cast(int, args.pr_number),
                 cast(bool, args.keep_temp),
                 cast(str, args.model),
+                publish=cast(bool, args.post),
+                checkpoint_dir=checkpoint_dir,
+                resume=cast(bool, args.resume),
             )
         print('\n--- AI PR Review (whatthepatch version) ---')
         print(review_text)
         print('--- End of AI PR Review ---')
     except ReviewError as exc:
         log.exception('review failed', exc_info=exc)
+        if isinstance(exc, PublishError):
+            print('\n--- AI PR Review (not posted) ---')
+            print(exc.review_text)
+            print('--- End of AI PR Review ---')
         print(str(exc), file=sys.stderr)
+        print('Rerun with --resume to continue from the failed stage.', file=sys.stderr)
         raise SystemExit(1) from exc
+    finally:
+        log_span_summary()
+        if profiler is not None and profile_path:
+            _report_profile(profiler, profile_path, cast(int, args.profile_top))
+
+
+def _report_profile(profiler: SamplingProfiler, path: str, top_n: int) -> None:
+    from .profiling import hotspot_table
+
+    profiler.write(path)
+    print(f'\n--- Profile ({path}) ---', file=sys.stderr)
+    print(hotspot_table(profiler, top_n), file=sys.stderr)
+
+
+def _read_pr_refs(lines: Iterable[str]) -> Iterator[tuple[str, str, int]]:
+    from .scheduler import parse_pr_ref
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            yield parse_pr_ref(line)
+        except ValueError as exc:
+            log.warning('skipping pull request reference', ref=line)
+            print(str(exc), file=sys.stderr)
+
+
+def batch_main(cli_args: list[str] | None = None) -> None:
+    """Entry point for reviewing many pull requests, cheapest first."""
+    parser = argparse.ArgumentParser(
+        description='Review many pull requests, scheduled by estimated cost'
+    )
+    parser.add_argument(
+        'prs',
+        nargs='?',
+        default='-',
+        help="File with one 'owner/name#number' per line, or '-' for stdin",
+    )
+    parser.add_argument(
+        '--model',
+        default='gpt-4.1',
+        help='OpenAI model to use for generating the reviews',
+    )
+    parser.add_argument(
+        '--workers', type=int, default=4, help='Reviews to run concurrently'
+    )
+    parser.add_argument(
+        '--large-workers',
+        type=int,
+        default=1,
+        help='Workers that prefer large pull requests',
+    )
+    parser.add_argument(
+        '--per-repo',
+        type=int,
+        default=1,
+        help='Maximum concurrent reviews per repository',
+    )
+    parser.add_argument(
+        '--small-cost',
+        type=int,
+        default=None,
+        help='Largest estimated cost that still counts as a small pull request',
+    )
+    parser.add_argument(
+        '--post',
+        action='store_true',
+        help='Post each review to its pull request, with inline comments',
+    )
+
+    args = parser.parse_args(cli_args)
+    new_context(cmd='batch')
+    from .scheduler import SMALL_PR_COST, queue_stats, review_batch
+
+    print_lock = threading.Lock()
+
+    def print_job(job: ReviewJob) -> None:
+        with print_lock:
+            if isinstance(job.error, PublishError):
+                print(f'\n--- AI PR Review {job.label} (not posted) ---')
+                print(job.error.review_text)
+                print('--- End of AI PR Review ---', flush=True)
+            if job.error is not None:
+                print(f'{job.label}: {job.error}', file=sys.stderr)
+                return
+            print(f'\n--- AI PR Review {job.label} ---')
+            print(job.review)
+            print('--- End of AI PR Review ---', flush=True)
+
+    prs = cast(str, args.prs)
+    small_cost = cast(int | None, args.small_cost)
+    with sys.stdin if prs == '-' else open(prs) as lines:
+        jobs = review_batch(
+            _read_pr_refs(lines),
+            model=cast(str, args.model),
+            workers=cast(int, args.workers),
+            large_workers=cast(int, args.large_workers),
+            per_repo_limit=cast(int, args.per_repo),
+            small_cost=SMALL_PR_COST if small_cost is None else small_cost,
+            publish=cast(bool, args.post),
+            on_done=print_job,
+        )
+    log_span_summary()
+    for lane, stats in queue_stats(jobs).items():
+        print(
+            f'{lane}: {stats["count"]} PRs, {stats["failed"]} failed, queue wait '
+            f'avg {stats["wait_ms_avg"]:.0f} ms, p50 {stats["wait_ms_p50"]:.0f} ms, '
+            f'max {stats["wait_ms_max"]:.0f} ms',
+            file=sys.stderr,
+        )
+    if any(job.error is not None for job in jobs):
+        raise SystemExit(1)
@@ -1,84 +1,320 @@
 from __future__ import annotations
 
+import ast
+import multiprocessing
 import os
-from typing import Any, Optional, Set, cast
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, Optional, Set, cast, overload
 
 from kit import Repository
-from whatthepatch import parse_patch
-from whatthepatch.patch import Change
 
+from logkit import log, span, spans_tracked
 
-class _MiniHunk:
-    def __init__(self, target_start: int):
-        self.target_start = target_start
+from .cache import FileCache
+from .errors import RepoError, ReviewError
+from .graph import ImportGraph, dependents_context
+from .index import SymbolIndex
+from .patchset import parse_patchset
+from .summary import architecture_context, repo_overview, repo_summary
+from .usages import find_symbol_usages_batch
 
+if TYPE_CHECKING:
+    from .embeddings import Embedder
 
-class _MiniPatchFile:
-    def __init__(self, path: str, removed: bool, hunks: list[_MiniHunk]):
-        self.path = path
-        self.is_removed_file = removed
-        self._hunks = hunks
 
-    def __iter__(self):
-        return iter(self._hunks)
+class _CachedRepository(Repository):
+    """kit Repository that serves reads and Python parses from a FileCache.
 
+    The context assembler, parent-symbol lookup and usage scan all go through
+    the same cache, so each file is read and parsed at most once per review.
+    """
 
-def _parse_patchset(diff_text: str) -> list[_MiniPatchFile]:
-    files: list[_MiniPatchFile] = []
-    for diff in parse_patch(diff_text):
-        if diff.header is None:
-            continue
+    def __init__(self, repo_path: str, file_cache: FileCache):
+        super().__init__(repo_path)
+        self.file_cache = file_cache
 
-        new_path = diff.header.new_path
-        old_path = diff.header.old_path
-        file_path = new_path or old_path
-        removed = (new_path in (None, '/dev/null')) or (bool(old_path) and not new_path)
+    @overload
+    def get_file_content(self, file_path: str) -> str: ...
 
-        hunks: dict[int, list[Change]] = {}
-        if diff.changes:
-            for ch in diff.changes:
-                hunks.setdefault(ch.hunk, []).append(ch)
+    @overload
+    def get_file_content(self, file_path: list[str]) -> dict[str, str]: ...
 
-        parsed_hunks: list[_MiniHunk] = []
-        for changes in hunks.values():
-            target_start: int | None = None
-            for ch in changes:
-                if ch.new is not None and (
-                    target_start is None or ch.new < target_start
-                ):
-                    target_start = ch.new
-            if target_start is not None:
-                parsed_hunks.append(_MiniHunk(target_start))
+    def get_file_content(self, file_path: str | list[str]) -> str | dict[str, str]:
+        if isinstance(file_path, list):
+            return {path: self.get_file_content(path) for path in file_path}
+        text = self.file_cache.text(file_path)
+        if text is None:
+            raise FileNotFoundError(f'File not found in repository: {file_path}')
+        return text
 
-        if file_path:
-            files.append(_MiniPatchFile(file_path, removed, parsed_hunks))
+    def extract_context_around_line(
+        self, file_path: str, line: int
+    ) -> Optional[dict[str, Any]]:
+        if not file_path.endswith('.py'):
+            return super().extract_context_around_line(file_path, line)
+        tree = self.file_cache.python_tree(file_path)
+        code = self.file_cache.text(file_path)
+        if tree is None or code is None:
+            return super().extract_context_around_line(file_path, line)
 
-    return files
+        # Same selection rule as kit: the shortest enclosing def or class,
+        # preferring a function over a class of equal length.
+        best: ast.FunctionDef | ast.ClassDef | None = None
+        for node in ast.walk(tree):
+            if not isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+                continue
+            end = node.end_lineno or node.lineno
+            if not node.lineno <= line <= end:
+                continue
+            if best is None:
+                best = node
+                continue
+            length = end - node.lineno
+            best_length = (best.end_lineno or best.lineno) - best.lineno
+            if length < best_length or (
+                length == best_length
+                and isinstance(node, ast.FunctionDef)
+                and isinstance(best, ast.ClassDef)
+            ):
+                best = node
+        if best is None:
+            return super().extract_context_around_line(file_path, line)
+
+        lines = code.splitlines(keepends=True)
+        return {
+            'type': 'function' if isinstance(best, ast.FunctionDef) else 'class',
+            'name': best.name,
+            'code': ''.join(lines[best.lineno - 1 : best.end_lineno or best.lineno]),
+        }
 
 
 def _safe_parent_context(
     repo: Repository, file_path: str, one_based_line: int
 ) -> Optional[dict[str, Any]]:
     """Return a {'name', 'code', 'start_line'} dict for the symbol that
-    encloses `one_based_line` in `file_path`, or None if not found."""
+    encloses `one_based_line` in `file_path`, or None if not found.
+
+    kit numbers lines from 1, like hunks and :meth:`SymbolIndex.enclosing_symbol`.
+    """
     try:
-        return repo.extract_context_around_line(file_path, one_based_line - 1)
+        return repo.extract_context_around_line(file_path, one_based_line)
     except Exception:
         return None
 
 
-def process_pr_context(repo_path: str, diff_text: str) -> str:
-    """Build an LLM-ready context string for a PR diff."""
-    repo = Repository(repo_path)
+def _open_symbol_index(repo_path: str, index_dir: str | None) -> SymbolIndex | None:
+    """Open and refresh the persistent symbol index, if one is configured."""
+    index_dir = index_dir or os.getenv('AI_PR_REVIEW_INDEX_DIR')
+    if not index_dir:
+        return None
+    try:
+        index = SymbolIndex.open(repo_path, index_dir)
+        index.refresh()
+        index.save()
+    except (RepoError, OSError) as exc:
+        log.warning('symbol index unavailable', error=str(exc))
+        return None
+    log.info('symbol index refreshed', parsed=index.parsed, reused=index.reused)
+    return index
+
+
+def _open_import_graph(index: SymbolIndex) -> ImportGraph | None:
+    """Open the persisted import graph and update it from ``index``."""
+    try:
+        graph = ImportGraph.open(index)
+        graph.update(index)
+        if graph.updated:
+            graph.save()
+    except OSError as exc:
+        log.warning('import graph unavailable', error=str(exc))
+        return None
+    log.info('import graph updated', updated=graph.updated)
+    return graph
+
+
+def _related_code(
+    index: SymbolIndex,
+    diff_text: str,
+    changed_files: list[str],
+    file_cache: FileCache,
+    embedder: Embedder | None,
+) -> str:
+    """Retrieve code similar to the diff hunks from the embedding index.
+
+    Enabled by passing ``embedder`` or setting ``AI_PR_REVIEW_EMBEDDINGS``;
+    NumPy is only needed then.
+    """
+    if embedder is None and not os.getenv('AI_PR_REVIEW_EMBEDDINGS'):
+        return ''
+    try:
+        from .embeddings import (
+            EmbeddingIndex,
+            default_embedder,
+            hunk_queries,
+            related_code_context,
+        )
+    except ImportError as exc:
+        log.warning('embedding index unavailable', error=str(exc))
+        return ''
+    try:
+        store = EmbeddingIndex.open(index, embedder or default_embedder())
+        store.update(index, file_cache)
+        if store.embedded:
+            store.save()
+        log.info('embedding index updated', embedded=store.embedded)
+        with span(step='semantic_search'):
+            chunks = store.search(
+                hunk_queries(diff_text), file_cache, exclude=changed_files
+            )
+    except (ReviewError, OSError, ValueError) as exc:
+        log.warning('embedding index unavailable', error=str(exc))
+        return ''
+    return related_code_context(chunks)
+
+
+# Below this many changed files the process pool costs more than it saves.
+# benchmarks/bench_context_pool.py: a file section takes ~16 ms in-process,
+# while each worker spends ~0.5 s importing kit and rebuilding its
+# Repository, so even with two idle cores the pool only breaks even around
+# 64 files.
+PARALLEL_MIN_FILES = 64
+_POOL_START_METHOD = (
+    'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+)
+
+# (file_path, include_file, target_start, precomputed parent context)
+_FileTask = tuple[str, bool, Optional[int], Optional[dict[str, Any]]]
+
+_worker_repo: Repository | None = None
+
+
+def _build_file_section(repo: Repository, task: _FileTask) -> tuple[str, str | None]:
+    """Render the context for one changed file.
+
+    Returns the formatted section (possibly empty) and the name of the symbol
+    enclosing the file's first hunk, if any.
+    """
+    with span(step='file_section'):
+        return _render_file_section(repo, task)
+
+
+def _render_file_section(repo: Repository, task: _FileTask) -> tuple[str, str | None]:
+    file_path, include_file, target_start, parent_ctx = task
     assembler = repo.get_context_assembler()
+    if include_file:
+        assembler.add_file(file_path, highlight_changes=True, max_lines=400)
+        add_deps = getattr(assembler, 'add_symbol_dependencies', None)
+        if callable(add_deps):
+            add_deps(file_path, max_depth=1)
+
+    symbol: str | None = None
+    if target_start:
+        if parent_ctx is None:
+            parent_ctx = _safe_parent_context(repo, file_path, target_start)
+        if parent_ctx and parent_ctx.get('code'):
+            assembler.add_search_results(
+                [{'file': file_path, 'code': parent_ctx['code']}],
+                query='parent symbol context',
+            )
+            if parent_ctx.get('name'):
+                symbol = cast(str, parent_ctx['name'])
+    return assembler.format_context(), symbol
+
+
+def _init_worker(repo_path: str) -> None:
+    global _worker_repo
+    # Each worker process keeps its own cache for the files it is handed.
+    _worker_repo = _CachedRepository(repo_path, FileCache(repo_path))
+
+
+def _build_file_section_in_worker(task: _FileTask) -> tuple[str, str | None]:
+    assert _worker_repo is not None
+    return _build_file_section(_worker_repo, task)
+
+
+def _build_file_sections(
+    repo: Repository,
+    repo_path: str,
+    tasks: list[_FileTask],
+    max_workers: int | None,
+) -> list[tuple[str, str | None]]:
+    """Build per-file sections, in a process pool for large PRs.
+
+    Results are returned in task order regardless of which worker finished
+    first, so the assembled context is deterministic. While a sampling
+    profiler runs (``logkit.spans_tracked()``), sections are always built
+    in-process so their time is sampled under the context stage.
+    """
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if workers < 2 or len(tasks) < PARALLEL_MIN_FILES or spans_tracked():
+        return [_build_file_section(repo, task) for task in tasks]
+
+    chunksize = max(1, len(tasks) // (workers * 4))
+    # Never fork: by now logkit's writer and batch worker threads may hold
+    # locks. Workers rebuild their state in _init_worker instead.
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(_POOL_START_METHOD),
+        initializer=_init_worker,
+        initargs=(repo_path,),
+    ) as pool:
+        return list(pool.map(_build_file_section_in_worker, tasks, chunksize=chunksize))
+
+
+def repo_context(repo_path: str, *, index_dir: str | None = None) -> str:
+    """Repository-level context for the cached prompt prefix.
+
+    This is the module overview from the precomputed summary, so it needs
+    ``index_dir`` (or ``AI_PR_REVIEW_INDEX_DIR``); without one it is empty.
+    """
+    index = _open_symbol_index(repo_path, index_dir)
+    if index is None:
+        return ''
+    try:
+        return repo_overview(repo_summary(index))
+    except OSError as exc:
+        log.warning('repository summary unavailable', error=str(exc))
+        return ''
+
+
+def process_pr_context(
+    repo_path: str,
+    diff_text: str,
+    *,
+    index_dir: str | None = None,
+    max_workers: int | None = None,
+    file_cache: FileCache | None = None,
+    embedder: Embedder | None = None,
+) -> str:
+    """Build an LLM-ready context string for a PR diff.
+
+    When ``index_dir`` (or ``AI_PR_REVIEW_INDEX_DIR``) is set, parent symbols
+    and usage candidates come from the persistent :class:`SymbolIndex` rather
+    than from re-parsing and re-scanning the checkout, and a repository
+    architecture section is looked up from the precomputed summary. The usage
+    scan is then limited to the changed files, their dependents in the
+    persisted :class:`ImportGraph` (at any depth) and non-Python candidates,
+    and the nearest ranked dependents are listed. With ``embedder`` (or
+    ``AI_PR_REVIEW_EMBEDDINGS``) set as well, code similar to the diff hunks
+    is retrieved from a local embedding index. Per-file work is spread over up
+    to ``max_workers`` processes once a PR touches ``PARALLEL_MIN_FILES``
+    files. File contents and parse trees are shared through ``file_cache``; a
+    fresh one is created per call when omitted.
+    """
+    file_cache = file_cache or FileCache(repo_path)
+    repo = _CachedRepository(repo_path, file_cache)
+    index = _open_symbol_index(repo_path, index_dir)
 
     # 1️⃣  Raw diff – always first so the model sees the exact edits.
-    assembler.add_diff(diff_text)
+    diff_assembler = repo.get_context_assembler()
+    diff_assembler.add_diff(diff_text)
+    sections = [diff_assembler.format_context()]
 
-    patch = _parse_patchset(diff_text)
+    patch = parse_patchset(diff_text)
 
     seen_files: Set[str] = set()
     touched_symbols: Set[str] = set()
+    tasks: list[_FileTask] = []
 
     for pfile in patch:
         if pfile.is_removed_file:
@@ -88,33 +324,52 @@ def process_pr_context(repo_path: str, diff_text: str) -> str:
         if not file_path:
             continue
 
-        if file_path not in seen_files and os.path.exists(
+        include_file = file_path not in seen_files and os.path.exists(
             os.path.join(repo_path, file_path)
-        ):
-            assembler.add_file(file_path, highlight_changes=True, max_lines=400)
-            add_deps = getattr(assembler, 'add_symbol_dependencies', None)
-            if callable(add_deps):
-                add_deps(file_path, max_depth=1)
+        )
+        if include_file:
             seen_files.add(file_path)
 
         hunk = next(iter(pfile), None)
-        if hunk and hunk.target_start:
-            parent_ctx = _safe_parent_context(repo, file_path, hunk.target_start)
-            if parent_ctx and parent_ctx.get('code'):
-                assembler.add_search_results(
-                    [{'file': file_path, 'code': parent_ctx['code']}],
-                    query='parent symbol context',
-                )
-                if parent_ctx.get('name'):
-                    touched_symbols.add(cast(str, parent_ctx['name']))
-
-    for sym_name in touched_symbols:
+        target_start = hunk.target_start if hunk else None
+        parent_ctx = None
+        if index is not None and target_start:
+            parent_ctx = index.enclosing_symbol(file_path, target_start, file_cache)
+        tasks.append((file_path, include_file, target_start, parent_ctx))
+
+    if index is not None:
+        # Precomputed per-commit summary: where the changed files sit in the repo.
         try:
-            usages = repo.find_symbol_usages(sym_name)
-        except Exception:
-            usages = []
+            summary = repo_summary(index)
+        except OSError as exc:
+            log.warning('repository summary unavailable', error=str(exc))
+        else:
+            sections.append(architecture_context(summary, [t[0] for t in tasks]))
 
-        for u in usages[:20]:
+    for section, symbol in _build_file_sections(repo, repo_path, tasks, max_workers):
+        sections.append(section)
+        if symbol:
+            touched_symbols.add(symbol)
+
+    candidates = index.candidate_files(touched_symbols) if index else None
+    graph = _open_import_graph(index) if index is not None else None
+    if graph is not None and candidates is not None:
+        changed = [t[0] for t in tasks]
+        dependents = graph.dependents(
+            changed, max_depth=None, limit=None, symbols=touched_symbols, index=index
+        )
+        sections.append(dependents_context(dependents))
+        # Python files outside the reverse import closure cannot use the
+        # changed code, so they are not scanned; only the listing is capped.
+        related = set(changed).union(d['file'] for d in dependents)
+        candidates = [f for f in candidates if not f.endswith('.py') or f in related]
+
+    assembler = repo.get_context_assembler()
+    usages_by_symbol = find_symbol_usages_batch(
+        repo_path, touched_symbols, files=candidates, file_cache=file_cache
+    )
+    for sym_name in sorted(touched_symbols):
+        for u in usages_by_symbol.get(sym_name, []):
             u_file = u.get('file')
             u_line = u.get('line_number')
             snippet = u.get('snippet') or u.get('line')
@@ -127,4 +382,10 @@ def process_pr_context(repo_path: str, diff_text: str) -> str:
                 query=f'usage of {sym_name}',
             )
 
-    return assembler.format_context()
+    sections.append(assembler.format_context())
+    if index is not None:
+        sections.append(
+            _related_code(index, diff_text, [t[0] for t in tasks], file_cache, embedder)
+        )
+    log.debug('file cache', **file_cache.stats())
+    return '\n\n'.join(section for section in sections if section)
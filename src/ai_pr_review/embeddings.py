@@ -0,0 +1,408 @@
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+import os
+import re
+import tempfile
+import zipfile
+from typing import Any, Callable, Iterable, Protocol, Sequence, TypedDict, cast
+
+import numpy as np
+from numpy.lib.npyio import NpzFile
+from numpy.typing import NDArray
+from whatthepatch import parse_patch
+
+from .cache import FileCache
+from .errors import ConfigurationError
+from .index import SymbolIndex, SymbolSpan
+
+EMBED_VERSION = 3
+DEFAULT_DIM = 256
+# Symbols longer than this are split into their nested symbols, and code
+# outside any chunk into windows of this many lines.
+MAX_CHUNK_LINES = 80
+DEFAULT_TOP_K = 8
+DEFAULT_TOKEN_BUDGET = 2_000
+# Rough characters per token for budgeting snippets.
+_CHARS_PER_TOKEN = 4
+_WORD_RE = re.compile(r'[A-Za-z][a-z0-9]*|[A-Z]+(?![a-z])|\d+')
+_IDENT_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+Vectors = NDArray[np.float32]
+
+
+class Embedder(Protocol):
+    """Maps texts to an ``(len(texts), dim)`` array of unit vectors."""
+
+    name: str
+
+    def __call__(self, texts: Sequence[str]) -> Vectors: ...
+
+
+class RelatedChunk(TypedDict):
+    file: str
+    name: str
+    start_line: int
+    end_line: int
+    score: float
+    code: str
+
+
+class HashingEmbedder:
+    """Deterministic offline embedder: signed feature hashing of identifiers.
+
+    Identifiers and their snake/camel-case words are hashed into ``dim``
+    buckets, so code sharing vocabulary with the query scores high. It needs
+    no model download and gives the same vectors on every machine.
+    """
+
+    def __init__(self, dim: int = DEFAULT_DIM):
+        self.dim = dim
+        self.name = f'hashing-{dim}'
+        self._buckets: dict[str, tuple[int, float]] = {}
+
+    def _bucket(self, token: str) -> tuple[int, float]:
+        found = self._buckets.get(token)
+        if found is None:
+            digest = int.from_bytes(
+                hashlib.blake2b(token.encode(), digest_size=8).digest(), 'big'
+            )
+            found = (digest % self.dim, 1.0 if digest >> 63 else -1.0)
+            self._buckets[token] = found
+        return found
+
+    def _tokens(self, text: str) -> list[str]:
+        tokens: list[str] = []
+        for ident in cast(list[str], _IDENT_RE.findall(text)):
+            tokens.append(ident)
+            words = cast(list[str], _WORD_RE.findall(ident))
+            if len(words) > 1:
+                tokens.extend(w.lower() for w in words)
+        return tokens
+
+    def __call__(self, texts: Sequence[str]) -> Vectors:
+        rows: list[int] = []
+        cols: list[int] = []
+        signs: list[float] = []
+        for row, text in enumerate(texts):
+            for token in self._tokens(text):
+                col, sign = self._bucket(token)
+                rows.append(row)
+                cols.append(col)
+                signs.append(sign)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(
+            out, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), signs
+        )
+        return _normalise(out)
+
+
+def _normalise(vectors: Vectors) -> Vectors:
+    norms = cast(Vectors, np.linalg.norm(vectors, axis=1, keepdims=True))
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def default_embedder() -> Embedder:
+    """Return the embedder named by ``AI_PR_REVIEW_EMBEDDER``.
+
+    The variable holds ``module:attribute`` of a zero-argument factory; when
+    unset, the offline :class:`HashingEmbedder` is used.
+    """
+    spec = os.getenv('AI_PR_REVIEW_EMBEDDER')
+    if not spec:
+        return HashingEmbedder()
+    module_name, _, attr = spec.partition(':')
+    try:
+        factory = cast(
+            Callable[[], Embedder], getattr(importlib.import_module(module_name), attr)
+        )
+    except (ImportError, AttributeError, ValueError) as exc:
+        raise ConfigurationError(f'Cannot load embedder {spec!r}: {exc}') from exc
+    return factory()
+
+
+def _windows(label: str, start: int, end: int) -> list[tuple[str, int, int]]:
+    prefix = f'{label} ' if label else ''
+    chunks: list[tuple[str, int, int]] = []
+    for first in range(start, end + 1, MAX_CHUNK_LINES):
+        last = min(first + MAX_CHUNK_LINES - 1, end)
+        chunks.append((f'{prefix}lines {first}-{last}', first, last))
+    return chunks
+
+
+def _cover(
+    ordered: list[SymbolSpan],
+    start: int,
+    end: int,
+    label: str,
+    blank: frozenset[int],
+) -> list[tuple[str, int, int]]:
+    """Chunks covering lines ``start``-``end`` using the outermost of ``ordered``."""
+    chunks: list[tuple[str, int, int]] = []
+
+    def gap(first: int, last: int) -> None:
+        while first <= last and first in blank:
+            first += 1
+        while last >= first and last in blank:
+            last -= 1
+        if first <= last:
+            chunks.extend(_windows(label, first, last))
+
+    pos = start
+    for i, span in enumerate(ordered):
+        first, last = span['start_line'], span['end_line']
+        if first < pos or last > end:
+            continue
+        gap(pos, first - 1)
+        if last - first + 1 <= MAX_CHUNK_LINES:
+            chunks.append((span['name'], first, last))
+        else:
+            inner = [
+                t
+                for t in ordered[i + 1 :]
+                if t['start_line'] >= first and t['end_line'] <= last
+            ]
+            chunks.extend(_cover(inner, first, last, span['name'], blank))
+        pos = last + 1
+    gap(pos, end)
+    return chunks
+
+
+def symbol_chunks(
+    symbols: list[SymbolSpan], line_count: int, *, text: str | None = None
+) -> list[tuple[str, int, int]]:
+    """Split a file into ``(name, start_line, end_line)`` chunks by symbol.
+
+    The outermost symbols of at most ``MAX_CHUNK_LINES`` lines are chunks;
+    longer ones are replaced by their nested symbols. Lines no chunk covers,
+    such as module-level code or the body of a long function, are cut into
+    fixed windows; with ``text``, blank lines at the edges of those ranges
+    are dropped first.
+    """
+    ordered = sorted(symbols, key=lambda s: (s['start_line'], -s['end_line']))
+    blank = frozenset(
+        number
+        for number, line in enumerate((text or '').splitlines(), 1)
+        if not line.strip()
+    )
+    return _cover(ordered, 1, line_count, '', blank)
+
+
+def _slice(text: str, start: int, end: int) -> str:
+    return ''.join(text.splitlines(keepends=True)[start - 1 : end])
+
+
+def hunk_queries(diff_text: str) -> list[str]:
+    """One query text per diff hunk: its context, added and removed lines."""
+    queries: list[str] = []
+    for diff in parse_patch(diff_text):
+        hunks: dict[int, list[str]] = {}
+        for change in diff.changes or []:
+            if isinstance(change.line, str):
+                hunks.setdefault(change.hunk, []).append(change.line)
+        queries.extend('\n'.join(lines) for lines in hunks.values())
+    return [q for q in queries if q.strip()]
+
+
+class EmbeddingIndex:
+    """Per-commit vector index over symbol-sized chunks of repository code.
+
+    Stored next to the :class:`SymbolIndex` as one ``.npz`` file holding the
+    JSON manifest and the NumPy array of unit vectors, so readers never see
+    one without the other. Like the symbol index, chunks are keyed by git
+    blob SHA, so a new commit only embeds the files it changed.
+    """
+
+    def __init__(self, base_path: str, embedder: Embedder):
+        self.path = base_path + '.npz'
+        self.embedder = embedder
+        self.commit: str | None = None
+        self.files: dict[str, str] = {}
+        # blob sha -> (first row, chunks)
+        self.blobs: dict[str, tuple[int, list[tuple[str, int, int]]]] = {}
+        self.vectors: Vectors = np.zeros((0, 0), dtype=np.float32)
+        self.embedded = 0
+        self._load()
+
+    @classmethod
+    def open(cls, index: SymbolIndex, embedder: Embedder) -> EmbeddingIndex:
+        """Open the embedding index stored alongside ``index``."""
+        return cls(index.index_path.removesuffix('.json') + '.embed', embedder)
+
+    def _load(self) -> None:
+        try:
+            with cast(NpzFile, np.load(self.path)) as archive:
+                manifest = cast(NDArray[np.uint8], archive['manifest'])
+                vectors = cast(Vectors, archive['vectors'])
+            data = cast(dict[str, Any], json.loads(manifest.tobytes()))
+        except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+            return
+        if (
+            data.get('version') != EMBED_VERSION
+            or data.get('embedder') != self.embedder.name
+        ):
+            return
+        blobs = cast(
+            dict[str, tuple[int, list[tuple[str, int, int]]]], data.get('blobs', {})
+        )
+        rows = max((row + len(chunks) for row, chunks in blobs.values()), default=0)
+        if rows != len(vectors):
+            return
+        # JSON turns the chunk tuples into lists.
+        self.blobs = {
+            sha: (row, [(c[0], c[1], c[2]) for c in chunks])
+            for sha, (row, chunks) in blobs.items()
+        }
+        self.commit = cast(str | None, data.get('commit'))
+        self.files = cast(dict[str, str], data.get('files', {}))
+        self.vectors = vectors
+
+    def save(self) -> None:
+        """Atomically write the manifest and vectors to disk as one file."""
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        payload = {
+            'version': EMBED_VERSION,
+            'embedder': self.embedder.name,
+            'commit': self.commit,
+            'files': self.files,
+            'blobs': {sha: [row, chunks] for sha, (row, chunks) in self.blobs.items()},
+        }
+        manifest = json.dumps(payload, separators=(',', ':')).encode()
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npz.tmp')
+        with os.fdopen(fd, 'wb') as fh:
+            np.savez(
+                fh,
+                manifest=np.frombuffer(manifest, dtype=np.uint8),
+                vectors=self.vectors,
+            )
+        os.replace(tmp_path, self.path)
+
+    def update(self, index: SymbolIndex, file_cache: FileCache) -> None:
+        """Embed the chunks of blobs new in ``index``'s commit, in one batch."""
+        self.embedded = 0
+        texts: list[str] = []
+        new_blobs: dict[str, list[tuple[str, int, int]]] = {}
+        for path, sha in sorted(index.files.items()):
+            if sha in self.blobs or sha in new_blobs:
+                continue
+            entry = index.blobs.get(sha)
+            text = file_cache.text(path) if entry and entry['identifiers'] else None
+            if entry is None or text is None:
+                new_blobs[sha] = []
+                continue
+            chunks = symbol_chunks(entry['symbols'], len(text.splitlines()), text=text)
+            new_blobs[sha] = chunks
+            texts.extend(_slice(text, start, end) for _name, start, end in chunks)
+
+        # Keep the previous commit's blobs, as the symbol index does.
+        live = set(index.files.values()) | set(self.files.values())
+        kept = [
+            (sha, row, chunks)
+            for sha, (row, chunks) in self.blobs.items()
+            if sha in live
+        ]
+        parts: list[Vectors] = []
+        blobs: dict[str, tuple[int, list[tuple[str, int, int]]]] = {}
+        offset = 0
+        for sha, row, chunks in kept:
+            parts.append(self.vectors[row : row + len(chunks)])
+            blobs[sha] = (offset, chunks)
+            offset += len(chunks)
+        if texts:
+            parts.append(self.embedder(texts).astype(np.float32))
+            self.embedded = len(texts)
+        for sha, chunks in new_blobs.items():
+            blobs[sha] = (offset, chunks)
+            offset += len(chunks)
+
+        parts = [p for p in parts if p.size]
+        self.vectors = (
+            np.concatenate(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+        )
+        self.blobs = blobs
+        self.files = dict(index.files)
+        self.commit = index.commit
+
+    def search(
+        self,
+        queries: Sequence[str],
+        file_cache: FileCache,
+        *,
+        exclude: Iterable[str] = (),
+        top_k: int = DEFAULT_TOP_K,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+    ) -> list[RelatedChunk]:
+        """Return the chunks most similar to any query, best first.
+
+        Scores are cosine similarities computed for all queries and chunks
+        in one matrix product. Chunks of ``exclude`` files are skipped, and
+        snippets stop once their estimated tokens would exceed the budget.
+        """
+        if not queries or not self.vectors.size:
+            return []
+        skip = set(exclude)
+        rows: list[int] = []
+        labels: list[tuple[str, str, int, int]] = []
+        seen: set[str] = set()
+        for path, sha in sorted(self.files.items()):
+            if path in skip or sha in seen or sha not in self.blobs:
+                continue
+            seen.add(sha)
+            first, chunks = self.blobs[sha]
+            for i, (name, start, end) in enumerate(chunks):
+                rows.append(first + i)
+                labels.append((path, name, start, end))
+        if not rows:
+            return []
+
+        matrix = self.vectors[np.array(rows, dtype=np.intp)]
+        similarity = cast(Vectors, self.embedder(queries) @ matrix.T)
+        # Best match over all hunks, for every chunk at once.
+        scores = cast(Vectors, similarity.max(axis=0))
+        k = min(top_k, len(rows))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+
+        found: list[RelatedChunk] = []
+        budget = token_budget * _CHARS_PER_TOKEN
+        for i in cast(list[int], best.tolist()):
+            score = float(cast(np.float32, scores[i]))
+            if score <= 0:
+                break
+            path, name, start, end = labels[i]
+            text = file_cache.text(path)
+            if text is None:
+                continue
+            code = _slice(text, start, end)
+            if len(code) > budget:
+                break
+            budget -= len(code)
+            found.append(
+                {
+                    'file': path,
+                    'name': name,
+                    'start_line': start,
+                    'end_line': end,
+                    'score': round(score, 3),
+                    'code': code,
+                }
+            )
+        return found
+
+
+def related_code_context(chunks: list[RelatedChunk]) -> str:
+    """Render retrieved chunks as a context section."""
+    if not chunks:
+        return ''
+    parts = ['## Semantically related code']
+    for chunk in chunks:
+        parts.append(
+            f'# {chunk["file"]}:{chunk["start_line"]}-{chunk["end_line"]} '
+            f'{chunk["name"]} (similarity {chunk["score"]:.2f})\n'
+            f'{chunk["code"].rstrip()}'
+        )
+    return '\n\n'.join(parts)
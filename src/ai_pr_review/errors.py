@@ -10,5 +10,13 @@ class GitHubError(ReviewError):
     """Raised when GitHub operations fail."""
 
 
+class PublishError(GitHubError):
+    """Raised when a generated review could not be posted to the PR."""
+
+    def __init__(self, message: str, review_text: str):
+        super().__init__(message)
+        self.review_text = review_text
+
+
 class RepoError(ReviewError):
     """Raised for local repository operation failures."""
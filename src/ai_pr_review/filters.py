@@ -0,0 +1,246 @@
+from __future__ import annotations
+
+import fnmatch
+import os
+import posixpath
+from typing import Iterable, NamedTuple
+
+LOCKFILES = frozenset(
+    {
+        'package-lock.json',
+        'npm-shrinkwrap.json',
+        'yarn.lock',
+        'pnpm-lock.yaml',
+        'poetry.lock',
+        'uv.lock',
+        'Pipfile.lock',
+        'Cargo.lock',
+        'Gemfile.lock',
+        'composer.lock',
+        'go.sum',
+    }
+)
+GENERATED_PATTERNS = (
+    '*.min.js',
+    '*.min.css',
+    '*.map',
+    '*_pb2.py',
+    '*_pb2_grpc.py',
+    '*.pb.go',
+    '*.snap',
+    '*.generated.*',
+    'dist/',
+    '__snapshots__/',
+)
+VENDORED_PATTERNS = ('vendor/', 'node_modules/', 'third_party/')
+
+# Glob -> reason. A glob without a slash matches the file name at any depth;
+# a trailing slash matches a directory at any depth; other globs match the
+# whole path.
+DEFAULT_SKIP_GLOBS: dict[str, str] = {
+    **{name: 'lockfile' for name in sorted(LOCKFILES)},
+    **{pattern: 'generated' for pattern in GENERATED_PATTERNS},
+    **{pattern: 'vendored' for pattern in VENDORED_PATTERNS},
+}
+# Added lines longer than this mean minified or generated output.
+MAX_LINE_LENGTH = 1_000
+MAX_FILE_DIFF_BYTES = 512 * 1024
+
+
+class FileDiff(NamedTuple):
+    path: str
+    text: str
+    added: int
+    removed: int
+    max_line_length: int
+    binary: bool
+
+
+class SkippedFile(NamedTuple):
+    path: str
+    reason: str
+    added: int
+    removed: int
+
+
+class FilteredDiff(NamedTuple):
+    text: str
+    skipped: list[SkippedFile]
+
+
+def path_matches(pattern: str, path: str) -> bool:
+    """Match ``path`` against a ``.gitignore``-style glob."""
+    pattern = pattern.lstrip('/')
+    if pattern.endswith('/'):
+        directory = pattern.rstrip('/')
+        return fnmatch.fnmatchcase(path, f'{directory}/*') or fnmatch.fnmatchcase(
+            path, f'*/{directory}/*'
+        )
+    if '/' not in pattern:
+        return fnmatch.fnmatchcase(posixpath.basename(path), pattern)
+    if pattern.startswith('**/') and fnmatch.fnmatchcase(path, pattern[3:]):
+        return True
+    return fnmatch.fnmatchcase(path, pattern)
+
+
+def read_gitattributes(repo_path: str) -> dict[str, bool]:
+    """Return glob -> generated for ``linguist-generated``/``-vendored`` lines.
+
+    ``False`` entries (``-linguist-generated`` or ``=false``) exempt files
+    from the default globs.
+    """
+    try:
+        with open(os.path.join(repo_path, '.gitattributes'), encoding='utf-8') as fh:
+            lines = fh.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return {}
+    rules: dict[str, bool] = {}
+    for line in lines:
+        fields = line.split()
+        if not fields or fields[0].startswith('#'):
+            continue
+        for attr in fields[1:]:
+            name, _, value = attr.lstrip('-!').partition('=')
+            if name not in ('linguist-generated', 'linguist-vendored'):
+                continue
+            rules[fields[0]] = not attr.startswith(('-', '!')) and value != 'false'
+    return rules
+
+
+class FileFilter:
+    """Decide which changed files are generated or vendored noise.
+
+    Files match by glob (``DEFAULT_SKIP_GLOBS`` plus ``extra_globs``), by
+    ``.gitattributes`` rules, or by heuristics: binary patches, very long
+    added lines and very large per-file diffs.
+    """
+
+    def __init__(
+        self,
+        extra_globs: Iterable[str] = (),
+        *,
+        gitattributes: dict[str, bool] | None = None,
+        max_line_length: int = MAX_LINE_LENGTH,
+        max_diff_bytes: int = MAX_FILE_DIFF_BYTES,
+    ):
+        self.globs = dict(DEFAULT_SKIP_GLOBS)
+        self.globs.update((glob, 'configured') for glob in extra_globs)
+        self.gitattributes = gitattributes or {}
+        self.max_line_length = max_line_length
+        self.max_diff_bytes = max_diff_bytes
+
+    @classmethod
+    def from_env(cls, repo_path: str | None = None) -> FileFilter:
+        """Build a filter from ``AI_PR_REVIEW_SKIP_GLOBS`` and the checkout."""
+        extra = os.getenv('AI_PR_REVIEW_SKIP_GLOBS', '')
+        return cls(
+            [glob.strip() for glob in extra.split(',') if glob.strip()],
+            gitattributes=read_gitattributes(repo_path) if repo_path else None,
+        )
+
+    def path_reason(self, path: str) -> str | None:
+        """Why ``path`` is skipped by glob or ``.gitattributes``, if it is."""
+        # Like git, the last matching .gitattributes line wins.
+        marked: bool | None = None
+        for pattern, generated in self.gitattributes.items():
+            if path_matches(pattern, path):
+                marked = generated
+        if marked is not None:
+            return 'generated (gitattributes)' if marked else None
+        for pattern, reason in self.globs.items():
+            if path_matches(pattern, path):
+                return reason
+        return None
+
+    def reason(self, file_diff: FileDiff) -> str | None:
+        """Why a changed file is skipped, or ``None`` to keep it."""
+        reason = self.path_reason(file_diff.path)
+        if reason is not None:
+            return reason
+        if file_diff.binary:
+            return 'binary'
+        if file_diff.max_line_length > self.max_line_length:
+            return 'minified'
+        if len(file_diff.text) > self.max_diff_bytes:
+            return 'oversized'
+        return None
+
+
+def _file_diff(lines: list[str]) -> FileDiff:
+    path = ''
+    added = removed = longest = 0
+    binary = False
+    in_hunk = False
+    for raw in lines:
+        line = raw.rstrip('\r\n')
+        if not in_hunk:
+            if line.startswith('+++ '):
+                target = line[4:].split('\t')[0]
+                if target != '/dev/null':
+                    path = target.removeprefix('b/')
+            elif line.startswith('--- ') and not path:
+                source = line[4:].split('\t')[0]
+                if source != '/dev/null':
+                    path = source.removeprefix('a/')
+            elif line.startswith(('GIT binary patch', 'Binary files ')):
+                binary = True
+            elif line.startswith('@@'):
+                in_hunk = True
+            continue
+        if line.startswith('+'):
+            added += 1
+            longest = max(longest, len(line) - 1)
+        elif line.startswith('-'):
+            removed += 1
+    if not path:
+        # No ---/+++ lines (binary, mode-only or pure rename): use the header.
+        header = lines[0].rstrip('\r\n')
+        path = header.split(' b/', 1)[1] if ' b/' in header else ''
+    return FileDiff(path, ''.join(lines), added, removed, longest, binary)
+
+
+def split_diff(diff_text: str) -> tuple[str, list[FileDiff]]:
+    """Split a git diff into its preamble and per-file sections.
+
+    Only ``diff --git`` headers are recognised; other formats come back as a
+    preamble with no files, so they are never filtered.
+    """
+    preamble: list[str] = []
+    sections: list[list[str]] = []
+    for line in diff_text.splitlines(keepends=True):
+        if line.startswith('diff --git '):
+            sections.append([line])
+        elif sections:
+            sections[-1].append(line)
+        else:
+            preamble.append(line)
+    return ''.join(preamble), [_file_diff(lines) for lines in sections]
+
+
+def filter_diff(diff_text: str, file_filter: FileFilter) -> FilteredDiff:
+    """Drop skipped files from a diff, before anything parses it."""
+    preamble, files = split_diff(diff_text)
+    kept = [preamble]
+    skipped: list[SkippedFile] = []
+    for file_diff in files:
+        reason = file_filter.reason(file_diff)
+        if reason is None:
+            kept.append(file_diff.text)
+        else:
+            skipped.append(
+                SkippedFile(file_diff.path, reason, file_diff.added, file_diff.removed)
+            )
+    if not skipped:
+        return FilteredDiff(diff_text, [])
+    return FilteredDiff(''.join(kept), skipped)
+
+
+def skipped_summary(skipped: list[SkippedFile]) -> str:
+    """One line per skipped file, as a context section."""
+    if not skipped:
+        return ''
+    lines = ['## Skipped files (not reviewed)']
+    lines.extend(
+        f'{f.path}: {f.reason}, +{f.added} -{f.removed} lines' for f in skipped
+    )
+    return '\n'.join(lines)
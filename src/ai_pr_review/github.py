@@ -1,25 +1,50 @@
 from __future__ import annotations
 
 import os
+import threading
 from typing import Any, Tuple, cast
 
 import requests
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+
+from logkit import record
 
 from .errors import GitHubError
 
 load_dotenv()
 
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
+GITHUB_API_URL = (os.getenv('GITHUB_API_URL') or 'https://api.github.com').rstrip('/')
+# Keep-alive connections per host for the shared session; batch mode posts
+# from several threads at once.
+SESSION_POOL_SIZE = 16
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def github_session() -> requests.Session:
+    """Return the process-wide pooled session for GitHub API calls."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=SESSION_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers['Accept'] = 'application/vnd.github+json'
+            if GITHUB_TOKEN:
+                session.headers['Authorization'] = f'token {GITHUB_TOKEN}'
+            _session = session
+        return _session
 
 
 def fetch_pr_data(
     repo_owner: str, repo_name: str, pr_number: int
 ) -> Tuple[str, str, str, str]:
     """Fetch diff text and metadata for the pull request."""
-    base_url = (
-        f'https://api.github.com/repos/{repo_owner}/{repo_name}/pulls/{pr_number}'
-    )
+    base_url = f'{GITHUB_API_URL}/repos/{repo_owner}/{repo_name}/pulls/{pr_number}'
     headers: dict[str, str] = {}
     if GITHUB_TOKEN:
         headers['Authorization'] = f'token {GITHUB_TOKEN}'
@@ -30,11 +55,13 @@ def fetch_pr_data(
         response_diff = requests.get(base_url, headers=diff_headers)
         response_diff.raise_for_status()
         diff_text = response_diff.text
+        record(bytes_downloaded=len(response_diff.content))
 
         meta_headers = headers.copy()
         meta_headers['Accept'] = 'application/vnd.github.v3+json'
         response_meta = requests.get(base_url, headers=meta_headers)
         response_meta.raise_for_status()
+        record(bytes_downloaded=len(response_meta.content))
         pr_metadata = cast(dict[str, Any], response_meta.json())
         head_sha = cast(str, pr_metadata['head']['sha'])
         pr_title = cast(str, pr_metadata.get('title', ''))
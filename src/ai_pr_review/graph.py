@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+from collections import deque
+from typing import Any, Iterable, TypedDict, cast
+
+from .index import SymbolIndex
+
+GRAPH_VERSION = 1
+# How far and how many dependents are listed in the review context.
+LISTED_DEPTH = 2
+LISTED_LIMIT = 20
+
+
+class Dependent(TypedDict):
+    file: str
+    distance: int
+    # The changed or dependent file this one imports on the shortest path.
+    via: str
+    # Touched symbol names the file mentions.
+    mentions: list[str]
+
+
+def module_parts(path: str) -> list[str]:
+    """Split a Python file path into its module name components."""
+    parts = path[: -len('.py')].split('/')
+    if parts[-1] == '__init__':
+        parts = parts[:-1]
+    return parts
+
+
+class ModuleResolver:
+    """Resolve import names to repository paths by dotted-suffix lookup."""
+
+    def __init__(self, paths: Iterable[str]):
+        self.paths = set(paths)
+        self._by_suffix: dict[str, str] = {}
+        # Shorter paths first, so the least nested file wins an ambiguous name.
+        for path in sorted(self.paths, key=lambda p: (p.count('/'), p)):
+            parts = module_parts(path)
+            for i in range(len(parts)):
+                _ = self._by_suffix.setdefault('.'.join(parts[i:]), path)
+
+    def _relative(self, importer: str, name: str) -> str | None:
+        level = len(name) - len(name.lstrip('.'))
+        base = importer.split('/')[:-1]
+        if level > 1:
+            base = base[: -(level - 1)] if level - 1 <= len(base) else []
+        parts = [p for p in name[level:].split('.') if p]
+        while True:
+            stem = '/'.join(base + parts)
+            candidates = [f'{stem}/__init__.py' if stem else '__init__.py']
+            if parts:
+                candidates.insert(0, f'{stem}.py')
+            for candidate in candidates:
+                if candidate in self.paths:
+                    return candidate
+            if not parts:
+                return None
+            _ = parts.pop()
+
+    def resolve(self, importer: str, name: str) -> str | None:
+        if name.startswith('.'):
+            return self._relative(importer, name)
+        parts = name.split('.')
+        while parts:
+            found = self._by_suffix.get('.'.join(parts))
+            if found is not None:
+                return found
+            _ = parts.pop()
+        return None
+
+    def resolve_all(self, importer: str, names: Iterable[str]) -> list[str]:
+        """Resolve every import of ``importer``, dropping external modules."""
+        targets = {self.resolve(importer, name) for name in names}
+        return sorted(t for t in targets if t is not None and t != importer)
+
+
+class ImportGraph:
+    """Persisted forward and reverse import graph of a repository's Python files.
+
+    Stored next to the :class:`SymbolIndex` and updated from it: only files
+    whose blob changed are re-resolved, unless files were added or removed,
+    which can change what any import resolves to.
+    """
+
+    def __init__(self, graph_path: str):
+        self.graph_path = graph_path
+        self.commit: str | None = None
+        self.files: dict[str, str] = {}
+        self.imports: dict[str, list[str]] = {}
+        self.imported_by: dict[str, list[str]] = {}
+        self.updated = 0
+        self._load()
+
+    @classmethod
+    def open(cls, index: SymbolIndex) -> ImportGraph:
+        """Open the graph stored alongside ``index``."""
+        return cls(index.index_path.removesuffix('.json') + '.graph.json')
+
+    def _load(self) -> None:
+        try:
+            with open(self.graph_path, encoding='utf-8') as fh:
+                data = cast(dict[str, Any], json.load(fh))
+        except (OSError, ValueError):
+            return
+        if data.get('version') != GRAPH_VERSION:
+            return
+        self.commit = cast(str | None, data.get('commit'))
+        self.files = cast(dict[str, str], data.get('files', {}))
+        self.imports = cast(dict[str, list[str]], data.get('imports', {}))
+        self.imported_by = cast(dict[str, list[str]], data.get('imported_by', {}))
+
+    def save(self) -> None:
+        """Atomically write the graph to disk."""
+        directory = os.path.dirname(self.graph_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        payload = {
+            'version': GRAPH_VERSION,
+            'commit': self.commit,
+            'files': self.files,
+            'imports': self.imports,
+            'imported_by': self.imported_by,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            json.dump(payload, fh, separators=(',', ':'))
+        os.replace(tmp_path, self.graph_path)
+
+    def _set_imports(self, path: str, targets: list[str]) -> None:
+        for old in self.imports.pop(path, []):
+            importers = self.imported_by.get(old, [])
+            if path in importers:
+                importers.remove(path)
+            if not importers:
+                _ = self.imported_by.pop(old, None)
+        if targets:
+            self.imports[path] = targets
+        for target in targets:
+            importers = self.imported_by.setdefault(target, [])
+            importers.append(path)
+            importers.sort()
+
+    def update(self, index: SymbolIndex) -> None:
+        """Bring the graph up to date with a refreshed ``index``."""
+        files = {p: sha for p, sha in index.files.items() if p.endswith('.py')}
+        if set(files) != set(self.files):
+            changed = list(files)
+            for path in set(self.files) - set(files):
+                self._set_imports(path, [])
+        else:
+            changed = [p for p, sha in files.items() if self.files.get(p) != sha]
+        self.updated = len(changed)
+        if changed:
+            resolver = ModuleResolver(files)
+            for path in changed:
+                entry = index.blobs.get(files[path])
+                names = entry.get('imports', []) if entry else []
+                self._set_imports(path, resolver.resolve_all(path, names))
+        self.files = files
+        self.commit = index.commit
+
+    def dependents(
+        self,
+        files: Iterable[str],
+        *,
+        max_depth: int | None = LISTED_DEPTH,
+        limit: int | None = LISTED_LIMIT,
+        symbols: Iterable[str] = (),
+        index: SymbolIndex | None = None,
+    ) -> list[Dependent]:
+        """Return files that (transitively) import ``files``, nearest first.
+
+        Files at the same distance that mention more of ``symbols`` (looked
+        up in ``index``) rank higher. ``None`` for ``max_depth`` or ``limit``
+        returns the whole reverse-import closure.
+        """
+        start = [f for f in files if f in self.files]
+        wanted = set(symbols)
+        seen = set(start)
+        queue = deque((f, 0) for f in start)
+        found: list[Dependent] = []
+        while queue:
+            path, depth = queue.popleft()
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for importer in self.imported_by.get(path, []):
+                if importer in seen:
+                    continue
+                seen.add(importer)
+                entry = index.entry(importer) if index is not None else None
+                mentions = (
+                    sorted(wanted.intersection(entry['identifiers'])) if entry else []
+                )
+                found.append(
+                    {
+                        'file': importer,
+                        'distance': depth + 1,
+                        'via': path,
+                        'mentions': mentions,
+                    }
+                )
+                queue.append((importer, depth + 1))
+        found.sort(key=lambda d: (d['distance'], -len(d['mentions']), d['file']))
+        return found if limit is None else found[:limit]
+
+
+def dependents_context(
+    dependents: list[Dependent],
+    *,
+    max_depth: int = LISTED_DEPTH,
+    limit: int = LISTED_LIMIT,
+) -> str:
+    """Render the nearest ranked dependents as a context section."""
+    listed = [d for d in dependents if d['distance'] <= max_depth][:limit]
+    if not listed:
+        return ''
+    lines = ['## Dependents of changed files']
+    for dep in listed:
+        line = f'{dep["file"]} (distance {dep["distance"]}, imports {dep["via"]}'
+        if dep['mentions']:
+            line += f'; uses {", ".join(dep["mentions"])}'
+        lines.append(line + ')')
+    return '\n'.join(lines)
@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+import os
+import re
+import subprocess
+import tempfile
+from pathlib import Path
+from typing import Any, Iterable, TypedDict, cast
+
+from .cache import MAX_FILE_BYTES, FileCache
+from .errors import RepoError
+
+INDEX_VERSION = 2
+_IDENTIFIER_RE = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+
+
+class SymbolSpan(TypedDict):
+    name: str
+    type: str
+    start_line: int
+    end_line: int
+
+
+class BlobEntry(TypedDict):
+    symbols: list[SymbolSpan]
+    identifiers: list[str]
+    # Imported module names; relative imports keep their leading dots.
+    imports: list[str]
+
+
+def _git(repo_path: str, *args: str) -> str:
+    try:
+        result = subprocess.run(
+            ['git', *args], cwd=repo_path, check=True, capture_output=True
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        stderr_bytes = cast(bytes | None, getattr(e, 'stderr', None))
+        stderr = stderr_bytes.decode() if stderr_bytes else ''
+        raise RepoError(f'Git command failed: {e}\nStderr: {stderr}') from e
+    return result.stdout.decode('utf-8', errors='replace')
+
+
+def _python_entry(code: str) -> tuple[list[SymbolSpan], list[str]]:
+    tree = ast.parse(code)
+    spans: list[SymbolSpan] = []
+    imports: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            imports.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = '.' * node.level + (node.module or '')
+            sep = '' if base.endswith('.') else '.'
+            imports.update(f'{base}{sep}{alias.name}' for alias in node.names)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            spans.append(
+                {
+                    'name': node.name,
+                    'type': 'class' if isinstance(node, ast.ClassDef) else 'function',
+                    'start_line': node.lineno,
+                    'end_line': node.end_lineno or node.lineno,
+                }
+            )
+    return spans, sorted(imports)
+
+
+def _tree_sitter_symbols(ext: str, code: str) -> list[SymbolSpan]:
+    from kit.tree_sitter_symbol_extractor import TreeSitterSymbolExtractor
+
+    languages = cast(set[str], TreeSitterSymbolExtractor.LANGUAGES)
+    if ext not in languages:
+        return []
+    spans: list[SymbolSpan] = []
+    for sym in TreeSitterSymbolExtractor.extract_symbols(ext, code):
+        start = cast(object, sym.get('start_line'))
+        end = cast(object, sym.get('end_line'))
+        if not isinstance(start, int) or not isinstance(end, int):
+            continue
+        # kit reports zero-based lines; spans are one-based like ``ast``.
+        spans.append(
+            {
+                'name': str(cast(object, sym.get('name', ''))),
+                'type': str(cast(object, sym.get('type', ''))),
+                'start_line': start + 1,
+                'end_line': end + 1,
+            }
+        )
+    return spans
+
+
+def extract_blob_entry(file_path: str, code: str) -> BlobEntry:
+    """Parse one file's source into its symbol spans, identifiers and imports."""
+    ext = Path(file_path).suffix.lower()
+    symbols: list[SymbolSpan] = []
+    imports: list[str] = []
+    try:
+        if ext == '.py':
+            symbols, imports = _python_entry(code)
+        else:
+            symbols = _tree_sitter_symbols(ext, code)
+    except Exception:
+        symbols, imports = [], []
+    identifiers = sorted(set(_IDENTIFIER_RE.findall(code)))
+    return {'symbols': symbols, 'identifiers': identifiers, 'imports': imports}
+
+
+def _repo_key(repo_path: str) -> str:
+    try:
+        origin = _git(repo_path, 'remote', 'get-url', 'origin').strip()
+    except RepoError:
+        origin = ''
+    return hashlib.sha1((origin or os.path.abspath(repo_path)).encode()).hexdigest()
+
+
+class SymbolIndex:
+    """On-disk symbol and identifier index for one repository.
+
+    Entries are keyed by git blob SHA, so a file whose content did not change
+    since the last indexed commit is never re-parsed, whichever PR or branch
+    is checked out.
+    """
+
+    def __init__(self, repo_path: str, index_path: str):
+        self.repo_path = repo_path
+        self.index_path = index_path
+        self.commit: str | None = None
+        self.files: dict[str, str] = {}
+        self.blobs: dict[str, BlobEntry] = {}
+        self.parsed = 0
+        self.reused = 0
+        self._load()
+
+    @classmethod
+    def open(cls, repo_path: str, cache_dir: str) -> SymbolIndex:
+        """Open (or create) the index for ``repo_path`` inside ``cache_dir``."""
+        return cls(repo_path, os.path.join(cache_dir, f'{_repo_key(repo_path)}.json'))
+
+    def _load(self) -> None:
+        try:
+            with open(self.index_path, encoding='utf-8') as fh:
+                data = cast(dict[str, Any], json.load(fh))
+        except (OSError, ValueError):
+            return
+        if data.get('version') != INDEX_VERSION:
+            return
+        self.commit = cast(str | None, data.get('commit'))
+        self.files = cast(dict[str, str], data.get('files', {}))
+        self.blobs = cast(dict[str, BlobEntry], data.get('blobs', {}))
+
+    def save(self) -> None:
+        """Atomically write the index to disk."""
+        directory = os.path.dirname(self.index_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        payload = {
+            'version': INDEX_VERSION,
+            'commit': self.commit,
+            'files': self.files,
+            'blobs': self.blobs,
+        }
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            json.dump(payload, fh, separators=(',', ':'))
+        os.replace(tmp_path, self.index_path)
+
+    def _tracked_blobs(self) -> dict[str, str]:
+        out = _git(self.repo_path, 'ls-tree', '-r', '-z', 'HEAD')
+        blobs: dict[str, str] = {}
+        for record in out.split('\0'):
+            if not record:
+                continue
+            meta, path = record.split('\t', 1)
+            _mode, obj_type, sha = meta.split()
+            if obj_type == 'blob':
+                blobs[path] = sha
+        return blobs
+
+    def refresh(self) -> None:
+        """Bring the index up to date with ``HEAD``, parsing only new blobs."""
+        self.parsed = 0
+        self.reused = 0
+        files = self._tracked_blobs()
+        for path, sha in files.items():
+            if sha in self.blobs:
+                self.reused += 1
+                continue
+            abs_path = os.path.join(self.repo_path, path)
+            try:
+                if os.path.getsize(abs_path) > MAX_FILE_BYTES:
+                    raw = b'\0'
+                else:
+                    with open(abs_path, 'rb') as fh:
+                        raw = fh.read()
+            except OSError:
+                continue
+            if b'\0' in raw:
+                # Remember large and binary blobs so they are not re-read.
+                self.blobs[sha] = {'symbols': [], 'identifiers': [], 'imports': []}
+            else:
+                code = raw.decode('utf-8', errors='ignore')
+                self.blobs[sha] = extract_blob_entry(path, code)
+            self.parsed += 1
+
+        # Keep blobs of the previous commit around so switching between two
+        # branches stays warm, but drop anything older.
+        live = set(files.values()) | set(self.files.values())
+        self.blobs = {sha: e for sha, e in self.blobs.items() if sha in live}
+        self.files = files
+        self.commit = _git(self.repo_path, 'rev-parse', 'HEAD').strip()
+
+    def entry(self, file_path: str) -> BlobEntry | None:
+        sha = self.files.get(file_path)
+        return self.blobs.get(sha) if sha else None
+
+    def enclosing_symbol(
+        self,
+        file_path: str,
+        one_based_line: int,
+        file_cache: FileCache | None = None,
+    ) -> dict[str, Any] | None:
+        """Return the innermost symbol spanning a line, like kit's extractor."""
+        entry = self.entry(file_path)
+        if entry is None:
+            return None
+        best: SymbolSpan | None = None
+        for span in entry['symbols']:
+            if not span['start_line'] <= one_based_line <= span['end_line']:
+                continue
+            if best is None:
+                best = span
+                continue
+            length = span['end_line'] - span['start_line']
+            best_length = best['end_line'] - best['start_line']
+            if length < best_length or (
+                length == best_length
+                and span['type'] == 'function'
+                and best['type'] == 'class'
+            ):
+                best = span
+        if best is None:
+            return None
+        if file_cache is not None:
+            text = file_cache.text(file_path)
+        else:
+            try:
+                with open(
+                    os.path.join(self.repo_path, file_path), encoding='utf-8'
+                ) as fh:
+                    text = fh.read()
+            except (OSError, UnicodeDecodeError):
+                text = None
+        if text is None:
+            return None
+        lines = text.splitlines(keepends=True)
+        code = ''.join(lines[best['start_line'] - 1 : best['end_line']])
+        return {
+            'name': best['name'],
+            'type': best['type'],
+            'code': code,
+            'start_line': best['start_line'],
+        }
+
+    def candidate_files(self, names: Iterable[str]) -> list[str]:
+        """Return the sorted files whose identifiers mention any of ``names``."""
+        wanted = set(names)
+        found: list[str] = []
+        for path, sha in self.files.items():
+            entry = self.blobs.get(sha)
+            if entry and not wanted.isdisjoint(entry['identifiers']):
+                found.append(path)
+        found.sort()
+        return found
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import hashlib
 import os
-from typing import cast
+from collections.abc import MutableMapping
+from typing import NamedTuple, cast
 
 from dotenv import load_dotenv
 from openai import OpenAI
+from openai.types.chat import ChatCompletionMessageParam
+
+from logkit import record
 
 from .errors import ConfigurationError
 
@@ -26,26 +31,181 @@ def setup_openai_client() -> OpenAI:
     return OpenAI(api_key=api_key)
 
 
-def create_review_prompts(
-    pr_title: str, pr_description: str, context_blob: str
-) -> tuple[str, str]:
-    """Create system and user prompts for review."""
-    system_prompt = (
-        'You are an expert software engineer performing a pull request review. '
-        'Focus on correctness, clarity, potential bugs, adherence to best practices, '
-        'and areas for improvement. Be concise and actionable.'
-    )
+SYSTEM_PROMPT = (
+    'You are an expert software engineer performing a pull request review. '
+    'Focus on correctness, clarity, potential bugs, adherence to best practices, '
+    'and areas for improvement. Be concise and actionable.'
+)
+
+REVIEW_GUIDELINES = (
+    'Review guidelines:\n'
+    '- Point out bugs, edge cases and regressions before style issues.\n'
+    '- Refer to code as `path:line` using the new line numbers from the diff.\n'
+    '- Only comment on code that the pull request changes or breaks.\n'
+    '- Group findings by file and say how to fix each one.\n'
+    '- If the change looks good, say so briefly.'
+)
+
+# Chunk size for very large contexts; each chunk is reviewed separately
+# behind the same cached prompt prefix.
+MAX_CONTEXT_CHARS = 400_000
+
+
+class PromptSegments(NamedTuple):
+    """A review prompt split by how often each part changes.
+
+    ``system`` and ``prefix`` are identical for every pull request of a
+    repository and every chunk of a pull request, so they form a prefix that
+    provider-side prompt caching can reuse. ``suffix`` holds the per-PR part.
+    """
+
+    system: str
+    prefix: str
+    suffix: str
+
 
-    user_prompt = (
+def create_prompt_prefix(repo: str = '', repo_context: str = '') -> str:
+    """Create the stable, repository-level user prompt prefix."""
+    parts = [REVIEW_GUIDELINES]
+    if repo:
+        parts.append(f'Repository: {repo}')
+    if repo_context:
+        parts.append(f'Repository context:\n```\n{repo_context}\n```')
+    return '\n\n'.join(parts)
+
+
+def create_prompt_suffix(
+    pr_title: str,
+    pr_description: str,
+    context_blob: str,
+    part: tuple[int, int] | None = None,
+) -> str:
+    """Create the per-PR user prompt: metadata, context and the request."""
+    heading = 'Context (Diff, changed files, and relevant symbols)'
+    if part is not None:
+        heading += f', part {part[0]} of {part[1]}'
+    return (
         f'Please review the following pull request.\n\n'
         f'PR Title: {pr_title}\n'
         f'PR Description:\n{pr_description or "No description provided."}\n\n'
-        f'Context (Diff, changed files, and relevant symbols):\n'
+        f'{heading}:\n'
         f'```\n{context_blob}\n```\n\n'
         f'Provide your review:'
     )
 
-    return system_prompt, user_prompt
+
+def create_prompt_segments(
+    pr_title: str,
+    pr_description: str,
+    context_blob: str,
+    *,
+    repo: str = '',
+    repo_context: str = '',
+    part: tuple[int, int] | None = None,
+) -> PromptSegments:
+    """Create the system prompt, stable prefix and per-PR suffix."""
+    return PromptSegments(
+        SYSTEM_PROMPT,
+        create_prompt_prefix(repo, repo_context),
+        create_prompt_suffix(pr_title, pr_description, context_blob, part),
+    )
+
+
+def create_review_prompts(
+    pr_title: str, pr_description: str, context_blob: str
+) -> tuple[str, str]:
+    """Create system and user prompts for review."""
+    segments = create_prompt_segments(pr_title, pr_description, context_blob)
+    return segments.system, f'{segments.prefix}\n\n{segments.suffix}'
+
+
+def _fence_after(fence: str, line: str) -> str:
+    """Return the opener of the code fence open after ``line``, or ``''``."""
+    if fence:
+        return '' if line.strip() == '```' else fence
+    return line.strip() if line.startswith('```') else ''
+
+
+def _context_sections(context_blob: str) -> list[str]:
+    """Split a context blob before each ``## `` header outside a code fence."""
+    sections: list[str] = []
+    current: list[str] = []
+    fence = ''
+    for line in context_blob.split('\n'):
+        if not fence and line.startswith('## ') and current:
+            sections.append('\n'.join(current).strip('\n'))
+            current = []
+        current.append(line)
+        fence = _fence_after(fence, line)
+    sections.append('\n'.join(current).strip('\n'))
+    return [section for section in sections if section]
+
+
+def _cut_section(section: str, max_chars: int) -> list[str]:
+    """Cut an oversized section at line boundaries.
+
+    A code fence left open by a cut is closed at the end of the piece and
+    re-opened at the start of the next, so every piece is valid markdown.
+    """
+    pieces: list[str] = []
+    current: list[str] = []
+    size = -1  # len('\n'.join(current))
+    fence = ''
+
+    def flush() -> None:
+        nonlocal current, size
+        if fence:
+            current.append('```')
+        piece = '\n'.join(current).strip('\n')
+        if piece and piece != fence + '\n```':
+            pieces.append(piece)
+        current = [fence] if fence else []
+        size = len(fence) if fence else -1
+
+    for line in section.split('\n'):
+        # Lines wider than an empty piece are cut into segments that fit.
+        width = max(1, max_chars - len(fence) - len('\n\n```'))
+        for start in range(0, len(line) or 1, width):
+            segment = line[start : start + width]
+            after = _fence_after(fence, segment)
+            closing = len('\n```') if after else 0
+            if current and size + 1 + len(segment) + closing > max_chars:
+                flush()
+            current.append(segment)
+            size += 1 + len(segment)
+            fence = after
+    fence = ''
+    flush()
+    return pieces
+
+
+def split_context(context_blob: str, max_chars: int = MAX_CONTEXT_CHARS) -> list[str]:
+    """Split a context blob into chunks of at most ``max_chars``.
+
+    Chunks break between the ``## `` sections written by the context
+    assembler, packing whole sections together where they fit. A single
+    oversized section is cut at line boundaries, closing and re-opening any
+    code fence that spans a cut.
+    """
+    if len(context_blob) <= max_chars:
+        return [context_blob]
+    pieces: list[str] = []
+    for section in _context_sections(context_blob):
+        if len(section) <= max_chars:
+            pieces.append(section)
+        else:
+            pieces.extend(_cut_section(section, max_chars))
+    chunks: list[str] = []
+    current = ''
+    for piece in pieces:
+        if current and len(current) + 2 + len(piece) > max_chars:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f'{current}\n\n{piece}' if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
 
 
 def generate_review(
@@ -55,22 +215,52 @@ def generate_review(
     model: str = 'gpt-4.1',
     temperature: float = 0.2,
     max_tokens: int = 2000,
+    *,
+    user_prefix: str | None = None,
+    prompt_cache_key: str | None = None,
 ) -> str:
-    """Generate review using LLM."""
+    """Generate review using LLM.
+
+    ``user_prefix`` is sent as its own message ahead of ``user_prompt`` so the
+    stable part of the prompt stays byte-identical between calls.
+    """
+    messages: list[ChatCompletionMessageParam] = [
+        {'role': 'system', 'content': system_prompt}
+    ]
+    if user_prefix:
+        messages.append({'role': 'user', 'content': user_prefix})
+    messages.append({'role': 'user', 'content': user_prompt})
     llm_response = client.chat.completions.create(
         model=model,
-        messages=[
-            {'role': 'system', 'content': system_prompt},
-            {'role': 'user', 'content': user_prompt},
-        ],
+        messages=messages,
         temperature=temperature,
         max_tokens=max_tokens,
+        # Sent as a raw body field so older openai clients accept it too.
+        extra_body={'prompt_cache_key': prompt_cache_key} if prompt_cache_key else None,
     )
 
+    usage = llm_response.usage
+    if usage is not None:
+        for key in ('prompt_tokens', 'completion_tokens', 'total_tokens'):
+            value = cast(object, getattr(usage, key, None))
+            if isinstance(value, int):
+                record(**{f'llm_{key}': value})
+        details = cast(object, getattr(usage, 'prompt_tokens_details', None))
+        cached = cast(object, getattr(details, 'cached_tokens', None))
+        if isinstance(cached, int):
+            record(llm_cached_tokens=cached)
+
     content = llm_response.choices[0].message.content
     return cast(str, content)
 
 
+def _chunk_key(model: str, temperature: float, *prompts: str) -> str:
+    digest = hashlib.sha256(f'{model}\0{temperature}'.encode())
+    for prompt in prompts:
+        digest.update(b'\0' + prompt.encode())
+    return digest.hexdigest()[:32]
+
+
 def review_with_llm(
     pr_title: str,
     pr_description: str,
@@ -78,22 +268,58 @@ def review_with_llm(
     model: str = 'gpt-4.1',
     temperature: float = 0.2,
     max_tokens: int = 2000,
+    *,
+    repo: str = '',
+    repo_context: str = '',
+    max_context_chars: int = MAX_CONTEXT_CHARS,
+    chunk_reviews: MutableMapping[str, str] | None = None,
 ) -> str:
-    """Full process to generate a review using LLM."""
-    # Set up OpenAI client
-    client = setup_openai_client()
+    """Full process to generate a review using LLM.
 
-    # Create prompts
-    system_prompt, user_prompt = create_review_prompts(
-        pr_title, pr_description, context_blob
-    )
+    Contexts larger than ``max_context_chars`` are reviewed in chunks, one
+    after another, so every chunk after the first reuses the cached prefix.
+    Chunk reviews already in ``chunk_reviews`` (keyed by a digest of the
+    model and prompt) are reused, and new ones are stored there as they
+    finish, so a failed run can resume after its last finished chunk.
+    """
+    client: OpenAI | None = None
 
-    # Generate and return review
-    return generate_review(
-        client,
-        system_prompt,
-        user_prompt,
-        model=model,
-        temperature=temperature,
-        max_tokens=max_tokens,
+    chunks = split_context(context_blob, max_context_chars)
+    cache_key = f'ai-pr-review:{repo}' if repo else None
+    reviews: list[str] = []
+    for i, chunk in enumerate(chunks, start=1):
+        system_prompt, prefix, suffix = create_prompt_segments(
+            pr_title,
+            pr_description,
+            chunk,
+            repo=repo,
+            repo_context=repo_context,
+            part=(i, len(chunks)) if len(chunks) > 1 else None,
+        )
+        key = _chunk_key(model, temperature, system_prompt, prefix, suffix)
+        if chunk_reviews is not None and key in chunk_reviews:
+            reviews.append(chunk_reviews[key])
+            record(llm_chunks_resumed=1)
+            continue
+        # Set up OpenAI client
+        client = client or setup_openai_client()
+        review = generate_review(
+            client,
+            system_prompt,
+            suffix,
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            user_prefix=prefix,
+            prompt_cache_key=cache_key,
+        )
+        if chunk_reviews is not None:
+            chunk_reviews[key] = review
+        reviews.append(review)
+    record(llm_chunks=len(chunks))
+    if len(reviews) == 1:
+        return reviews[0]
+    return '\n\n'.join(
+        f'## Part {i} of {len(reviews)}\n\n{review}'
+        for i, review in enumerate(reviews, start=1)
     )
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from whatthepatch import parse_patch
+from whatthepatch.patch import Change
+
+
+class _MiniHunk:
+    def __init__(self, target_start: int, target_end: int | None = None):
+        self.target_start = target_start
+        # Last new-side line of the hunk; lines in between can be commented on.
+        self.target_end = target_start if target_end is None else target_end
+
+
+class _MiniPatchFile:
+    def __init__(
+        self,
+        path: str,
+        removed: bool,
+        hunks: list[_MiniHunk],
+        changed_lines: int = 0,
+    ):
+        self.path = path
+        self.is_removed_file = removed
+        self._hunks = hunks
+        # Added plus removed lines.
+        self.changed_lines = changed_lines
+
+    def __iter__(self):
+        return iter(self._hunks)
+
+
+def parse_patchset(diff_text: str) -> list[_MiniPatchFile]:
+    """Parse a diff into its changed files, hunk target starts and changed-line counts."""
+    files: list[_MiniPatchFile] = []
+    for diff in parse_patch(diff_text):
+        if diff.header is None:
+            continue
+
+        new_path = diff.header.new_path
+        old_path = diff.header.old_path
+        file_path = new_path or old_path
+        removed = (new_path in (None, '/dev/null')) or (bool(old_path) and not new_path)
+
+        hunks: dict[int, list[Change]] = {}
+        changed_lines = 0
+        if diff.changes:
+            for ch in diff.changes:
+                hunks.setdefault(ch.hunk, []).append(ch)
+                if ch.old is None or ch.new is None:
+                    changed_lines += 1
+
+        parsed_hunks: list[_MiniHunk] = []
+        for changes in hunks.values():
+            new_lines = [ch.new for ch in changes if ch.new is not None]
+            if new_lines:
+                parsed_hunks.append(_MiniHunk(min(new_lines), max(new_lines)))
+
+        if file_path:
+            files.append(
+                _MiniPatchFile(file_path, removed, parsed_hunks, changed_lines)
+            )
+
+    return files
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType, TracebackType
+from typing import Callable, cast
+
+from logkit import active_spans, track_spans
+
+DEFAULT_INTERVAL_S = 0.005
+TOP_N = 10
+NO_SPAN = '(no span)'
+
+# CPython's documented (if underscored) way to read other threads' stacks.
+_current_frames = cast(Callable[[], dict[int, FrameType]], vars(sys)['_current_frames'])
+
+
+def _short_path(path: str) -> str:
+    """Trim a source path to its package-relative part."""
+    marker = f'site-packages{os.sep}'
+    if marker in path:
+        return path.rsplit(marker, 1)[1]
+    cwd = os.getcwd() + os.sep
+    return path.removeprefix(cwd)
+
+
+class SamplingProfiler:
+    """Wall-clock sampling profiler that attributes samples to ``capture`` spans.
+
+    A background thread samples, every ``interval_s``, the stack of each
+    thread that has a logkit span open. Each sample is keyed by the open span
+    names followed by the Python frames, outermost first, so stage time can be
+    split by function and written as collapsed stacks or a speedscope file.
+    Pool worker threads are sampled when their tasks are wrapped with
+    ``logkit.carry_spans``. Worker processes cannot be sampled, so the
+    context build stays in-process while span tracking is on.
+    """
+
+    def __init__(self, interval_s: float = DEFAULT_INTERVAL_S):
+        self.interval_s = interval_s
+        self.samples: Counter[tuple[tuple[str, ...], tuple[str, ...]]] = Counter()
+        self.duration_s = 0.0
+        self.ticks = 0
+        self._labels: dict[CodeType, str] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def __enter__(self) -> SamplingProfiler:
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        track_spans(True)
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name='ai-pr-review-profiler', daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        track_spans(False)
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            # ';' separates frames in the collapsed format.
+            label = self._labels[code] = (
+                f'{code.co_name} ({_short_path(code.co_filename)}'
+                f':{code.co_firstlineno})'
+            ).replace(';', ',')
+        return label
+
+    def _stack(self, frame: FrameType | None) -> tuple[str, ...]:
+        labels: list[str] = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return tuple(reversed(labels))
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        started = last = time.perf_counter()
+        while not self._stop.wait(self.interval_s):
+            frames = _current_frames()
+            for ident, spans in active_spans().items():
+                frame = frames.get(ident)
+                if ident != me and frame is not None:
+                    self.samples[(spans, self._stack(frame))] += 1
+            self.ticks += 1
+            last = time.perf_counter()
+        self.duration_s += last - started
+
+    @property
+    def sample_s(self) -> float:
+        """Average wall time one sample stands for."""
+        return self.duration_s / self.ticks if self.ticks else self.interval_s
+
+    def collapsed(self) -> str:
+        """Samples in the collapsed-stack format read by ``flamegraph.pl``."""
+        lines = [
+            f'{";".join(spans + stack)} {count}'
+            for (spans, stack), count in sorted(self.samples.items())
+        ]
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def speedscope(self, name: str = 'ai-pr-review') -> dict[str, object]:
+        """Samples as a speedscope ``sampled`` profile, weighted in seconds."""
+        index: dict[str, int] = {}
+        frames: list[dict[str, object]] = []
+        samples: list[list[int]] = []
+        weights: list[float] = []
+        for (spans, stack), count in sorted(self.samples.items()):
+            ids: list[int] = []
+            for label in spans + stack:
+                if label not in index:
+                    index[label] = len(frames)
+                    frames.append({'name': label})
+                ids.append(index[label])
+            samples.append(ids)
+            weights.append(round(count * self.sample_s, 6))
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'ai-pr-review',
+            'shared': {'frames': frames},
+            'profiles': [
+                {
+                    'type': 'sampled',
+                    'name': name,
+                    'unit': 'seconds',
+                    'startValue': 0,
+                    'endValue': round(sum(weights), 6),
+                    'samples': samples,
+                    'weights': weights,
+                }
+            ],
+        }
+
+    def write(self, path: str) -> None:
+        """Write speedscope JSON for a ``.json`` path, else collapsed stacks."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as fh:
+            if path.endswith('.json'):
+                json.dump(self.speedscope(), fh)
+            else:
+                _ = fh.write(self.collapsed())
+
+    def by_stage(self) -> dict[str, Counter[str]]:
+        """Samples per stage, split by the innermost (self-time) function.
+
+        A sample's stage is its innermost ``stage=`` span, or its innermost
+        span when no stage is open.
+        """
+        stages: dict[str, Counter[str]] = {}
+        for (spans, stack), count in self.samples.items():
+            named = [name for name in spans if name.startswith('stage=')]
+            stage = named[-1] if named else (spans[-1] if spans else NO_SPAN)
+            leaf = stack[-1] if stack else NO_SPAN
+            stages.setdefault(stage, Counter())[leaf] += count
+        return stages
+
+
+def hotspot_table(profiler: SamplingProfiler, top_n: int = TOP_N) -> str:
+    """The ``top_n`` self-time functions of each stage, busiest stage first."""
+    stages = profiler.by_stage()
+    totals = {stage: sum(leaves.values()) for stage, leaves in stages.items()}
+    lines: list[str] = []
+    for stage in sorted(stages, key=lambda name: (-totals[name], name)):
+        total = totals[stage]
+        lines.append(
+            f'{stage}: {total} samples, ~{total * profiler.sample_s:.2f} s wall'
+        )
+        for leaf, count in stages[stage].most_common(top_n):
+            lines.append(f'  {100 * count / total:5.1f}%  {count:6d}  {leaf}')
+    return '\n'.join(lines)
@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import re
+import threading
+import time
+import uuid
+from typing import Any, Callable, TypedDict, cast
+
+import requests
+from urllib3.exceptions import NewConnectionError
+
+from logkit import log, record
+
+from . import github
+from .errors import GitHubError
+from .patchset import parse_patchset
+
+MAX_ATTEMPTS = 4
+# Longest single wait for a rate-limit reset or Retry-After before giving up.
+MAX_RATE_LIMIT_WAIT_S = 300.0
+BACKOFF_S = 1.0
+MAX_INLINE_COMMENTS = 50
+_RETRY_STATUSES = frozenset({502, 503, 504})
+_IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+REVIEWS_PER_PAGE = 100
+# `path:line` or `path:start-end`, as the review guidelines ask for.
+_REF_RE = re.compile(r'`([^`\s:]+):(\d+)(?:-\d+)?`')
+_BULLET_RE = re.compile(r'^\s*(?:[-*+]|\d+[.)])\s+')
+
+
+class InlineComment(TypedDict):
+    path: str
+    line: int
+    side: str
+    body: str
+
+
+class PublishResult(TypedDict):
+    review_id: int | None
+    url: str | None
+    comments: int
+
+
+class RateLimit:
+    """GitHub's primary rate limit as last reported by response headers.
+
+    Before each request the caller waits until the reset time if the
+    previous response said no requests remain.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self.remaining: int | None = None
+        self.reset_at = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, response: requests.Response) -> None:
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        reset = response.headers.get('X-RateLimit-Reset')
+        with self._lock:
+            if remaining is not None and remaining.isdigit():
+                self.remaining = int(remaining)
+            if reset is not None and reset.isdigit():
+                self.reset_at = float(reset)
+
+    def wait_s(self) -> float:
+        """Seconds to wait before the next request may be sent."""
+        with self._lock:
+            if self.remaining == 0:
+                return max(0.0, self.reset_at - self.clock())
+            return 0.0
+
+
+rate_limit = RateLimit()
+
+
+def _retry_after_s(response: requests.Response, limits: RateLimit) -> float | None:
+    """How long to wait before retrying a rate-limited response, if it is one."""
+    if response.status_code not in (403, 429):
+        return None
+    retry_after = response.headers.get('Retry-After')
+    if retry_after is not None and retry_after.isdigit():
+        return float(retry_after)
+    if response.headers.get('X-RateLimit-Remaining') == '0':
+        return limits.wait_s()
+    # A 429 without hints is still a secondary rate limit.
+    return 60.0 if response.status_code == 429 else None
+
+
+def _never_sent(exc: requests.RequestException) -> bool:
+    """Whether a failed request certainly never reached GitHub."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    if not isinstance(exc, requests.ConnectionError) or not exc.args:
+        return False
+    # DNS failures and refused connections: MaxRetryError(NewConnectionError).
+    reason = cast(object, getattr(cast(object, exc.args[0]), 'reason', None))
+    return isinstance(reason, NewConnectionError)
+
+
+def send_with_retries(
+    method: str,
+    url: str,
+    *,
+    json: dict[str, Any] | None = None,
+    session: requests.Session | None = None,
+    limits: RateLimit | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+    find_existing: Callable[[], requests.Response | None] | None = None,
+) -> requests.Response:
+    """Send a GitHub API request, honouring rate limits and retrying failures.
+
+    Failures to connect are always retried with exponential backoff, and
+    rate-limited responses after ``Retry-After`` or the limit's reset time.
+    Read timeouts, dropped connections and 502/503/504 may come after GitHub
+    acted on the request, so a POST is retried only if ``find_existing``
+    finds no result of the earlier attempt; a result it finds is returned
+    instead. Idempotent methods are always retried. Other responses are
+    returned to the caller as they are.
+    """
+    session = session or github.github_session()
+    limits = limits or rate_limit
+    idempotent = method.upper() in _IDEMPOTENT_METHODS
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        wait = limits.wait_s()
+        if wait > MAX_RATE_LIMIT_WAIT_S:
+            raise GitHubError(f'GitHub rate limit exhausted for {wait:.0f}s')
+        if wait:
+            log.warning('waiting for github rate limit', wait_s=round(wait, 1))
+            sleep(wait)
+        backoff = BACKOFF_S * 2.0 ** (attempt - 1)
+        try:
+            response = session.request(method, url, json=json, timeout=30)
+        except (requests.ConnectionError, requests.Timeout) as exc:
+            if not (idempotent or _never_sent(exc)):
+                existing = find_existing() if find_existing else None
+                if existing is not None:
+                    return existing
+                if find_existing is None:
+                    raise GitHubError(f'Error contacting GitHub: {exc}') from exc
+            if attempt == MAX_ATTEMPTS:
+                raise GitHubError(f'Error contacting GitHub: {exc}') from exc
+            log.warning('github request failed, retrying', error=str(exc))
+            sleep(backoff)
+            continue
+        limits.update(response)
+        delay = _retry_after_s(response, limits)
+        if delay is None and response.status_code in _RETRY_STATUSES:
+            if not idempotent:
+                existing = find_existing() if find_existing else None
+                if existing is not None:
+                    return existing
+                if find_existing is None:
+                    return response
+            delay = backoff
+        if delay is None or attempt == MAX_ATTEMPTS:
+            return response
+        if delay > MAX_RATE_LIMIT_WAIT_S:
+            raise GitHubError(f'GitHub rate limit exhausted for {delay:.0f}s')
+        record(github_retries=1)
+        log.warning('github request retried', status=response.status_code, wait_s=delay)
+        sleep(delay)
+    raise AssertionError('unreachable')
+
+
+def _review_items(review_text: str) -> list[str]:
+    """Split a review into bullet items with their indented continuation lines."""
+    items: list[list[str]] = []
+    for line in review_text.splitlines():
+        if _BULLET_RE.match(line):
+            items.append([_BULLET_RE.sub('', line, count=1)])
+        elif items and line.startswith((' ', '\t')) and line.strip():
+            items[-1].append(line.strip())
+        elif line.strip():
+            items.append([line.strip()])
+    return ['\n'.join(item) for item in items]
+
+
+def inline_comments(review_text: str, diff_text: str) -> list[InlineComment]:
+    """Turn review items that cite ``path:line`` into inline comments.
+
+    Only lines inside a diff hunk can carry a comment, so references outside
+    the changed hunks stay in the review body only.
+    """
+    hunks: dict[str, list[tuple[int, int]]] = {}
+    for pfile in parse_patchset(diff_text):
+        if not pfile.is_removed_file:
+            hunks[pfile.path] = [(h.target_start, h.target_end) for h in pfile]
+    comments: list[InlineComment] = []
+    seen: set[tuple[str, int]] = set()
+    for item in _review_items(review_text):
+        match = _REF_RE.search(item)
+        if match is None:
+            continue
+        path, line = match.group(1), int(match.group(2))
+        ranges = hunks.get(path, [])
+        if (path, line) in seen or not any(a <= line <= b for a, b in ranges):
+            continue
+        seen.add((path, line))
+        comments.append({'path': path, 'line': line, 'side': 'RIGHT', 'body': item})
+    return comments[:MAX_INLINE_COMMENTS]
+
+
+def _find_review(
+    url: str,
+    head_sha: str,
+    marker: str,
+    session: requests.Session | None,
+    sleep: Callable[[float], None],
+) -> requests.Response | None:
+    """The review an earlier attempt created, found by commit and body marker."""
+    page = 1
+    while True:
+        listing = send_with_retries(
+            'GET',
+            f'{url}?per_page={REVIEWS_PER_PAGE}&page={page}',
+            session=session,
+            sleep=sleep,
+        )
+        if not listing.ok:
+            raise GitHubError(
+                f'Error listing reviews: HTTP {listing.status_code}: '
+                f'{listing.text[:500]}'
+            )
+        reviews = cast(list[dict[str, Any]], listing.json())
+        for review in reviews:
+            body = cast(str | None, review.get('body')) or ''
+            if review.get('commit_id') == head_sha and marker in body:
+                log.info('review was already posted', review_id=review.get('id'))
+                return send_with_retries(
+                    'GET', f'{url}/{review["id"]}', session=session, sleep=sleep
+                )
+        if len(reviews) < REVIEWS_PER_PAGE:
+            return None
+        page += 1
+
+
+def publish_review(
+    repo_owner: str,
+    repo_name: str,
+    pr_number: int,
+    head_sha: str,
+    review_text: str,
+    diff_text: str,
+    *,
+    inline: bool = True,
+    session: requests.Session | None = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> PublishResult:
+    """Post the review and its inline comments as one pull-request review.
+
+    If GitHub rejects the inline comments (422), the review is posted again
+    with its body only. The body carries a hidden marker, so a retry after
+    an ambiguous failure first looks for the review an earlier attempt may
+    have created instead of posting it twice.
+    """
+    url = (
+        f'{github.GITHUB_API_URL}/repos/{repo_owner}/{repo_name}'
+        f'/pulls/{pr_number}/reviews'
+    )
+    marker = f'<!-- ai-pr-review:{uuid.uuid4().hex} -->'
+    comments = inline_comments(review_text, diff_text) if inline else []
+    payload: dict[str, Any] = {
+        'commit_id': head_sha,
+        'body': f'{review_text}\n\n{marker}',
+        'event': 'COMMENT',
+        'comments': comments,
+    }
+
+    def find_existing() -> requests.Response | None:
+        return _find_review(url, head_sha, marker, session, sleep)
+
+    response = send_with_retries(
+        'POST',
+        url,
+        json=payload,
+        session=session,
+        sleep=sleep,
+        find_existing=find_existing,
+    )
+    if response.status_code == 422 and comments:
+        log.warning('inline comments rejected, posting body only', error=response.text)
+        payload['comments'] = comments = []
+        response = send_with_retries(
+            'POST',
+            url,
+            json=payload,
+            session=session,
+            sleep=sleep,
+            find_existing=find_existing,
+        )
+    if not response.ok:
+        raise GitHubError(
+            f'Error posting review: HTTP {response.status_code}: {response.text[:500]}'
+        )
+    record(review_comments=len(comments))
+    data = cast(dict[str, Any], response.json())
+    return {
+        'review_id': cast(int | None, data.get('id')),
+        'url': cast(str | None, data.get('html_url')),
+        'comments': len(comments),
+    }
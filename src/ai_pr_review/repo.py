@@ -4,54 +4,220 @@ import os
 import shutil
 import subprocess
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import cast
 
+from logkit import carry_spans
+
 from .errors import RepoError
 
 
-def clone_repo_to_temp_dir(
-    repo_owner: str, repo_name: str, keep_temp: bool = False
-) -> str:
-    """Clone the repository to a temporary directory."""
-    temp_dir = tempfile.mkdtemp(prefix=f'ai_pr_review_{repo_owner}_{repo_name}_')
-    repo_url = f'https://github.com/{repo_owner}/{repo_name}.git'
+def _run_git(args: list[str], cwd: str | None = None, stdin: bytes | None = None):
+    """Run git in ``cwd`` (never the process working directory)."""
     try:
-        subprocess.run(
-            ['git', 'clone', repo_url, temp_dir], check=True, capture_output=True
+        return subprocess.run(
+            ['git', *args], cwd=cwd, input=stdin, check=True, capture_output=True
         )
-        return temp_dir
     except subprocess.CalledProcessError as e:  # pragma: no cover - git
-        cleanup_temp_dir(temp_dir, keep_temp)
         stdout_bytes = cast(bytes | None, e.stdout)
         stderr_bytes = cast(bytes | None, e.stderr)
         stdout = stdout_bytes.decode() if stdout_bytes else ''
         stderr = stderr_bytes.decode() if stderr_bytes else ''
         raise RepoError(
-            f'Git clone failed: {e}\nStdout: {stdout}\nStderr: {stderr}'
+            f'Git command failed: {e}\nStdout: {stdout}\nStderr: {stderr}'
         ) from e
 
 
+def repo_url(repo_owner: str, repo_name: str) -> str:
+    """Clone URL of a repository under ``GITHUB_URL``."""
+    github_url = (os.getenv('GITHUB_URL') or 'https://github.com').rstrip('/')
+    return f'{github_url}/{repo_owner}/{repo_name}.git'
+
+
+def clone_repo_to_temp_dir(
+    repo_owner: str, repo_name: str, keep_temp: bool = False
+) -> str:
+    """Clone the repository to a temporary directory."""
+    temp_dir = tempfile.mkdtemp(prefix=f'ai_pr_review_{repo_owner}_{repo_name}_')
+    try:
+        _ = _run_git(['clone', repo_url(repo_owner, repo_name), temp_dir])
+    except RepoError:
+        cleanup_temp_dir(temp_dir, keep_temp)
+        raise
+    return temp_dir
+
+
 def checkout_pr_head(temp_dir: str, pr_head_sha: str) -> None:
     """Check out the PR head SHA in the cloned repository."""
-    cwd = os.getcwd()
-    os.chdir(temp_dir)
-    try:
-        subprocess.run(
-            ['git', 'fetch', 'origin', pr_head_sha], check=True, capture_output=True
-        )
-        subprocess.run(
-            ['git', 'checkout', pr_head_sha], check=True, capture_output=True
-        )
-    except subprocess.CalledProcessError as e:  # pragma: no cover - git
-        stdout_bytes = cast(bytes | None, e.stdout)
-        stderr_bytes = cast(bytes | None, e.stderr)
-        stdout = stdout_bytes.decode() if stdout_bytes else ''
-        stderr = stderr_bytes.decode() if stderr_bytes else ''
-        raise RepoError(
-            f'Git command failed: {e}\nStdout: {stdout}\nStderr: {stderr}'
-        ) from e
-    finally:
-        os.chdir(cwd)
+    _ = _run_git(['fetch', 'origin', pr_head_sha], cwd=temp_dir)
+    _ = _run_git(['checkout', pr_head_sha], cwd=temp_dir)
+
+
+class RepoWorkspace:
+    """One shared clone of a repository with a worktree per reviewed PR.
+
+    Head SHAs announced with :meth:`want` are fetched together: the first
+    :meth:`add_worktree` call that finds its SHA missing fetches every wanted
+    SHA that is still missing in a single ``git fetch``. If that fetch fails,
+    the caller's own SHAs are fetched alone and wanted SHAs that are still
+    missing are dropped. Callers whose SHAs are already present never wait
+    for a clone or fetch in progress. Worktrees are independent directories,
+    so reviews of one repository can run on several threads at once. All git
+    commands run with an explicit ``cwd``.
+    """
+
+    def __init__(self, repo_owner: str, repo_name: str):
+        self.repo_owner = repo_owner
+        self.repo_name = repo_name
+        self.path: str | None = None
+        self.fetches = 0
+        self._wanted: set[str] = set()
+        self._present: set[str] = set()
+        # ``_lock`` guards the SHA sets; ``_git_lock`` serialises the clone
+        # and fetches, which may take a while; ``_worktree_lock`` serialises
+        # changes to the worktree list.
+        self._lock = threading.Lock()
+        self._git_lock = threading.Lock()
+        self._worktree_lock = threading.Lock()
+
+    def want(self, *shas: str) -> None:
+        """Announce head SHAs that will be checked out later."""
+        with self._lock:
+            self._wanted.update(shas)
+
+    def _clone(self) -> str:
+        if self.path is None:
+            path = tempfile.mkdtemp(
+                prefix=f'ai_pr_review_{self.repo_owner}_{self.repo_name}_'
+            )
+            try:
+                _ = _run_git(
+                    [
+                        'clone',
+                        '--no-checkout',
+                        repo_url(self.repo_owner, self.repo_name),
+                        path,
+                    ]
+                )
+            except RepoError:
+                shutil.rmtree(path, ignore_errors=True)
+                raise
+            self.path = path
+        return self.path
+
+    def _missing(self, path: str, shas: set[str]) -> set[str]:
+        if not shas:
+            return set()
+        out = _run_git(
+            ['cat-file', '--batch-check'],
+            cwd=path,
+            stdin=''.join(f'{sha}^{{commit}}\n' for sha in sorted(shas)).encode(),
+        ).stdout.decode()
+        # Present objects are echoed as '<sha> commit <size>'.
+        found = {line.split()[0] for line in out.splitlines() if ' commit ' in line}
+        return shas - found
+
+    def _fetch_missing(self, path: str, shas: set[str]) -> bool:
+        try:
+            _ = _run_git(['fetch', 'origin', *sorted(shas)], cwd=path)
+        except RepoError:
+            return False
+        self.fetches += 1
+        return True
+
+    def fetch(self, *shas: str) -> str:
+        """Clone once, then fetch all wanted SHAs not yet present in one go.
+
+        Raises :class:`RepoError` if one of ``shas`` cannot be fetched.
+        """
+        own = set(shas)
+        with self._lock:
+            self._wanted |= own
+            if self.path is not None and own <= self._present:
+                return self.path
+        with self._git_lock:
+            path = self._clone()
+            with self._lock:
+                # Another caller may have fetched them while we waited.
+                pending = self._wanted - self._present
+                if own <= self._present:
+                    return path
+            missing = self._missing(path, pending)
+            if missing and not self._fetch_missing(path, missing):
+                # One unfetchable SHA fails the whole batch; retry our own.
+                own_missing = self._missing(path, own)
+                if own_missing:
+                    _ = self._fetch_missing(path, own_missing)
+            unavailable = self._missing(path, missing)
+            with self._lock:
+                self._present |= pending - unavailable
+                # Do not retry a failed batch with every later fetch; callers
+                # that still need these SHAs fetch them alone.
+                self._wanted -= unavailable
+        if own & unavailable:
+            raise RepoError(
+                f'Cannot fetch {", ".join(sorted(own & unavailable))} '
+                f'from {self.repo_owner}/{self.repo_name}'
+            )
+        return path
+
+    def add_worktree(self, sha: str) -> str:
+        """Create a detached worktree at ``sha`` and return its path."""
+        path = self.fetch(sha)
+        worktree = tempfile.mkdtemp(prefix=f'ai_pr_review_{sha[:12]}_')
+        # ``worktree add`` wants to create the directory itself.
+        os.rmdir(worktree)
+        # Concurrent ``worktree add`` calls read each other's half-written
+        # admin directories, so only registration is serialised; the files
+        # are checked out in parallel.
+        with self._worktree_lock:
+            _ = _run_git(
+                ['worktree', 'add', '--no-checkout', '--detach', worktree, sha],
+                cwd=path,
+            )
+        _ = _run_git(['reset', '--hard', '--quiet'], cwd=worktree)
+        return worktree
+
+    def add_worktrees(self, shas: list[str], max_workers: int = 4) -> list[str]:
+        """Fetch ``shas`` together, then create their worktrees in parallel."""
+        _ = self.fetch(*shas)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(carry_spans(self.add_worktree), shas))
+
+    def remove_worktree(self, worktree: str, keep_temp: bool = False) -> None:
+        if keep_temp:
+            print(f'Keeping temporary directory: {worktree}')
+            return
+        if self.path is not None:
+            try:
+                with self._worktree_lock:
+                    _ = _run_git(
+                        ['worktree', 'remove', '--force', worktree], cwd=self.path
+                    )
+            except RepoError:
+                pass
+        shutil.rmtree(worktree, ignore_errors=True)
+
+    def close(self) -> None:
+        """Delete the shared clone and any worktrees left behind."""
+        with self._git_lock, self._lock:
+            self._present.clear()
+            if self.path is None:
+                return
+            try:
+                out = _run_git(
+                    ['worktree', 'list', '--porcelain'], cwd=self.path
+                ).stdout.decode()
+            except RepoError:
+                out = ''
+            main = os.path.realpath(self.path)
+            for line in out.splitlines():
+                worktree = line.removeprefix('worktree ')
+                if line.startswith('worktree ') and os.path.realpath(worktree) != main:
+                    shutil.rmtree(worktree, ignore_errors=True)
+            shutil.rmtree(self.path, ignore_errors=True)
+            self.path = None
 
 
 def cleanup_temp_dir(temp_dir: str, keep_temp: bool) -> None:
@@ -1,14 +1,36 @@
 from __future__ import annotations
 
-from typing import Callable
+from typing import Any, Callable, cast
 
-from logkit import capture, log
+from logkit import capture, log, record
 
-from .context import process_pr_context
-from .github import fetch_pr_data
-from .llm import review_with_llm
+from .checkpoint import ReviewCheckpoint, stage_key
+from .errors import PublishError, ReviewError
+from .filters import FileFilter, FilteredDiff, filter_diff, skipped_summary
 from .repo import checkout_pr_head, cleanup_temp_dir, clone_repo_to_temp_dir
 
+# ``github`` and ``publish`` (requests), ``context`` (kit), ``llm`` (openai)
+# and ``triage`` (whatthepatch) are imported lazily by ``review_pr`` so that
+# ``import ai_pr_review.cli`` stays cheap.
+
+
+def _filter_diff(diff_text: str, repo_path: str | None) -> FilteredDiff:
+    """Drop generated and vendored files before anything parses the diff."""
+    with capture(stage='filter'):
+        filtered = filter_diff(diff_text, FileFilter.from_env(repo_path))
+        record(
+            skipped_files=len(filtered.skipped),
+            skipped_bytes=len(diff_text) - len(filtered.text),
+        )
+    if filtered.skipped:
+        log.info('skipped generated files', files=len(filtered.skipped))
+    return filtered
+
+
+def _with_skipped(context_blob: str, filtered: FilteredDiff) -> str:
+    summary = skipped_summary(filtered.skipped)
+    return '\n\n'.join(part for part in (context_blob, summary) if part)
+
 
 def review_pr(
     repo_owner: str,
@@ -17,43 +39,199 @@ def review_pr(
     keep_temp: bool = False,
     model: str = 'gpt-4.1',
     *,
-    fetch_pr_data_func: Callable[
-        [str, str, int], tuple[str, str, str, str]
-    ] = fetch_pr_data,
+    fetch_pr_data_func: Callable[[str, str, int], tuple[str, str, str, str]]
+    | None = None,
     clone_repo_func: Callable[[str, str, bool], str] = clone_repo_to_temp_dir,
     checkout_func: Callable[[str, str], None] = checkout_pr_head,
-    process_context_func: Callable[[str, str], str] = process_pr_context,
-    review_with_llm_func: Callable[..., str] = review_with_llm,
+    process_context_func: Callable[[str, str], str] | None = None,
+    repo_context_func: Callable[[str], str] | None = None,
+    review_with_llm_func: Callable[..., str] | None = None,
     cleanup_func: Callable[[str, bool], None] = cleanup_temp_dir,
+    fast_path: bool = True,
+    publish: bool = False,
+    publish_func: Callable[..., object] | None = None,
+    checkpoint_dir: str | None = None,
+    resume: bool = False,
 ) -> str:
-    """Generate an AI-based review for the pull request."""
+    """Generate an AI-based review for the pull request.
+
+    Stage functions default to the real GitHub, kit and OpenAI
+    implementations, which are only imported when no override is given.
+    With ``fast_path``, PRs that triage as trivial (docs, lockfiles,
+    generated files or a handful of lines) are reviewed from the diff alone,
+    skipping clone, checkout and context assembly. Either way, generated and
+    vendored files are dropped from the diff first and listed one per line.
+    On the full path, ``repo_context_func`` supplies the repository-level
+    overview that goes into the cached prompt prefix.
+    With ``publish``, the review is posted to the PR as one batched review
+    whose findings on changed lines become inline comments. If posting
+    fails, :class:`PublishError` carries the generated review.
+
+    With ``checkpoint_dir``, the fetched diff, triage, context, chunk
+    reviews and final review are saved there per PR and head SHA, the
+    context keyed by ``fast_path`` and the review by model and context. With
+    ``resume``, a rerun skips every stage that already finished. The
+    checkpoint is deleted once the review (and posting it) succeeds.
+    """
+    if fetch_pr_data_func is None:
+        from .github import fetch_pr_data
+
+        fetch_pr_data_func = fetch_pr_data
+    if review_with_llm_func is None:
+        from .llm import review_with_llm
+
+        review_with_llm_func = review_with_llm
+    if publish and publish_func is None:
+        from .publish import publish_review
+
+        publish_func = publish_review
+
     temp_dir: str | None = None
     review_text: str | None = None
+    checkpoint = (
+        ReviewCheckpoint(checkpoint_dir, repo_owner, repo_name, pr_number)
+        if checkpoint_dir
+        else None
+    )
     with capture(work='review_pr'):
         try:
             # Fetch PR data from GitHub
-            diff_text, head_sha, pr_title, pr_description = fetch_pr_data_func(
-                repo_owner, repo_name, pr_number
-            )
+            with capture(stage='fetch'):
+                diff_text, head_sha, pr_title, pr_description = fetch_pr_data_func(
+                    repo_owner, repo_name, pr_number
+                )
+                record(diff_bytes=len(diff_text), diff_lines=diff_text.count('\n'))
             log.info('fetched pr data', owner=repo_owner, repo=repo_name)
+            if checkpoint is not None:
+                checkpoint.start(head_sha, diff_text, resume=resume)
+
+            context_name = f'context-{stage_key(str(fast_path))}'
+            context_blob = (
+                checkpoint.load(f'{context_name}.txt') if checkpoint else None
+            )
+            repo_overview = (
+                checkpoint.load(f'{context_name}.repo.txt') or '' if checkpoint else ''
+            )
+            triage = None
+            if fast_path and context_blob is None:
+                from .triage import Triage, triage_patchset
+
+                with capture(stage='triage'):
+                    saved = checkpoint.load_json('triage.json') if checkpoint else None
+                    if isinstance(saved, list):
+                        triage = Triage(*cast(list[Any], saved))
+                    else:
+                        triage = triage_patchset(diff_text, FileFilter.from_env())
+                        if checkpoint is not None:
+                            checkpoint.save_json('triage.json', triage)
+                    record(files=triage.files, changed_lines=triage.changed_lines)
+
+            if context_blob is not None:
+                log.info('review path', path='checkpoint', reason='resumed')
+            elif triage is not None and triage.path == 'diff_only':
+                # Review from the diff alone; git is never touched.
+                from .triage import diff_only_context, estimated_saving_ms
 
-            # Clone repository and checkout PR head
-            temp_dir = clone_repo_func(repo_owner, repo_name, keep_temp)
-            log.info('cloned repo', path=temp_dir)
-            checkout_func(temp_dir, head_sha)
+                filtered = _filter_diff(diff_text, None)
+                with capture(stage='diff_only_context'):
+                    context_blob = _with_skipped(
+                        diff_only_context(filtered.text, triage), filtered
+                    )
+                    record(
+                        context_chars=len(context_blob),
+                        context_tokens_est=len(context_blob) // 4,
+                    )
+                saved_ms, saved_from = estimated_saving_ms(triage)
+                log.info(
+                    'review path',
+                    path=triage.path,
+                    reason=triage.reason,
+                    est_saved_ms=saved_ms,
+                    est_saved_from=saved_from,
+                )
+            else:
+                # kit is only imported once the full path is taken.
+                if process_context_func is None:
+                    from .context import process_pr_context
 
-            # Generate context from PR diff and files
-            context_blob = process_context_func(temp_dir, diff_text)
-            log.info('processed context')
+                    process_context_func = process_pr_context
+                if repo_context_func is None:
+                    from .context import repo_context
+
+                    repo_context_func = repo_context
+
+                # Clone repository and checkout PR head
+                with capture(stage='clone'):
+                    temp_dir = clone_repo_func(repo_owner, repo_name, keep_temp)
+                log.info('cloned repo', path=temp_dir)
+                with capture(stage='checkout'):
+                    checkout_func(temp_dir, head_sha)
+
+                # Generate context from PR diff and files
+                filtered = _filter_diff(diff_text, temp_dir)
+                with capture(stage='context'):
+                    context_blob = _with_skipped(
+                        process_context_func(temp_dir, filtered.text), filtered
+                    )
+                    repo_overview = repo_context_func(temp_dir)
+                    record(
+                        context_chars=len(context_blob),
+                        context_tokens_est=len(context_blob) // 4,
+                        repo_context_chars=len(repo_overview),
+                    )
+                log.info(
+                    'review path',
+                    path='full',
+                    reason=triage.reason if triage else 'fast path disabled',
+                )
+            if checkpoint is not None:
+                checkpoint.save(f'{context_name}.txt', context_blob)
+                checkpoint.save(f'{context_name}.repo.txt', repo_overview)
 
             # Generate PR review using LLM
-            review_text = review_with_llm_func(
-                pr_title,
-                pr_description,
-                context_blob,
-                model=model,
-            )
-            log.info('generated review')
+            review_name = f'review-{stage_key(model, context_blob, repo_overview)}.md'
+            review_text = checkpoint.load(review_name) if checkpoint else None
+            if review_text is None:
+                llm_options: dict[str, object] = {}
+                if repo_overview:
+                    llm_options['repo_context'] = repo_overview
+                if checkpoint is not None:
+                    llm_options['chunk_reviews'] = checkpoint.chunks
+                with capture(stage='llm'):
+                    review_text = review_with_llm_func(
+                        pr_title,
+                        pr_description,
+                        context_blob,
+                        model=model,
+                        repo=f'{repo_owner}/{repo_name}',
+                        **llm_options,
+                    )
+                if checkpoint is not None:
+                    checkpoint.save(review_name, review_text)
+                log.info('generated review')
+
+            if publish and publish_func is not None:
+                with capture(stage='publish'):
+                    try:
+                        posted = publish_func(
+                            repo_owner,
+                            repo_name,
+                            pr_number,
+                            head_sha,
+                            review_text,
+                            diff_text,
+                        )
+                    except ReviewError as exc:
+                        # The LLM stage is the costly one: hand its result back.
+                        raise PublishError(
+                            f'Review generated but not posted: {exc}', review_text
+                        ) from exc
+                log.info('published review', result=posted)
+            if checkpoint is not None:
+                if checkpoint.resumed:
+                    log.info('resumed from checkpoint', stages=checkpoint.resumed)
+                # Every stage finished: nothing is left to resume.
+                checkpoint.clear()
         finally:
             if temp_dir:
                 cleanup_func(temp_dir, keep_temp)
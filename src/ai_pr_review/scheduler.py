@@ -0,0 +1,327 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Iterable, TypedDict
+
+from logkit import capture, carry_spans, log, record
+
+from .filters import FileFilter, filter_diff
+from .repo import RepoWorkspace
+
+# Rough per-file cost in changed-line equivalents: context assembly, symbol
+# extraction and the usage scan run once per file regardless of hunk size.
+FILE_COST = 200
+SMALL_PR_COST = 2_000
+
+PRData = tuple[str, str, str, str]
+
+
+class ReviewCost(TypedDict):
+    lines: int
+    files: int
+    cost: int
+
+
+class LaneStats(TypedDict):
+    count: int
+    failed: int
+    wait_ms_avg: float
+    wait_ms_p50: float
+    wait_ms_max: float
+
+
+def estimate_review_cost(diff_text: str) -> ReviewCost:
+    """Estimate review cost from diff size and changed-file count.
+
+    Generated and vendored files are left out, as the review skips them.
+    """
+    from .patchset import parse_patchset
+
+    diff_text = filter_diff(diff_text, FileFilter.from_env()).text
+    lines = diff_text.count('\n')
+    files = len(parse_patchset(diff_text))
+    return {'lines': lines, 'files': files, 'cost': lines + FILE_COST * files}
+
+
+@dataclass
+class ReviewJob:
+    """One pull request moving through the batch scheduler."""
+
+    repo_owner: str
+    repo_name: str
+    pr_number: int
+    pr_data: PRData | None = None
+    cost: int = 0
+    lane: str = 'small'
+    submitted: float = 0.0
+    started: float | None = None
+    finished: float | None = None
+    review: str | None = None
+    error: Exception | None = None
+
+    @property
+    def repo(self) -> str:
+        return f'{self.repo_owner}/{self.repo_name}'
+
+    @property
+    def label(self) -> str:
+        return f'{self.repo}#{self.pr_number}'
+
+    @property
+    def wait_ms(self) -> float | None:
+        if self.started is None:
+            return None
+        return (self.started - self.submitted) * 1000
+
+
+class ReviewScheduler:
+    """Run review jobs on worker threads, cheapest first, per-repo limited.
+
+    Jobs whose cost is at most ``small_cost`` go to the small lane and are
+    taken shortest-first. ``large_workers`` of the ``workers`` threads prefer
+    the large lane, which is served in arrival order, so a huge PR neither
+    blocks small ones nor starves behind them. Idle workers take from the
+    other lane. At most ``per_repo_limit`` jobs of one repository run at once.
+    """
+
+    def __init__(
+        self,
+        run_job: Callable[[ReviewJob], str],
+        *,
+        workers: int = 4,
+        large_workers: int = 1,
+        per_repo_limit: int = 1,
+        small_cost: int = SMALL_PR_COST,
+        on_done: Callable[[ReviewJob], None] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if workers < 1 or per_repo_limit < 1:
+            raise ValueError('workers and per_repo_limit must be at least 1')
+        self.run_job = run_job
+        self.workers = workers
+        self.large_workers = min(large_workers, workers)
+        self.per_repo_limit = per_repo_limit
+        self.small_cost = small_cost
+        self.on_done = on_done
+        self.clock = clock
+        self.jobs: list[ReviewJob] = []
+        self._pending: dict[str, list[ReviewJob]] = {'small': [], 'large': []}
+        self._running: dict[str, int] = {}
+        self._closed = False
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+
+    def submit(self, job: ReviewJob) -> None:
+        """Queue a job; its cost must already be set."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('scheduler is closed')
+            job.lane = 'small' if job.cost <= self.small_cost else 'large'
+            job.submitted = self.clock()
+            self.jobs.append(job)
+            self._pending[job.lane].append(job)
+            self._cond.notify_all()
+        log.info('review queued', pr=job.label, cost=job.cost, lane=job.lane)
+
+    def add_finished(self, job: ReviewJob) -> None:
+        """Record a job that failed before it could be scheduled."""
+        with self._cond:
+            self.jobs.append(job)
+        if self.on_done is not None:
+            self.on_done(job)
+
+    def start(self) -> None:
+        for i in range(self.workers):
+            lane = 'large' if i < self.large_workers else 'small'
+            thread = threading.Thread(
+                target=self._work, args=(lane,), name=f'review-{lane}-{i}', daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def close(self) -> None:
+        """Stop accepting jobs; workers exit once the queue is drained."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def join(self) -> list[ReviewJob]:
+        for thread in self._threads:
+            thread.join()
+        return list(self.jobs)
+
+    def _pick(self, preferred: str) -> ReviewJob | None:
+        other = 'small' if preferred == 'large' else 'large'
+        for lane in (preferred, other):
+            queue = self._pending[lane]
+            if lane == 'small':
+                queue.sort(key=lambda j: j.cost)
+            for i, job in enumerate(queue):
+                if self._running.get(job.repo, 0) < self.per_repo_limit:
+                    return queue.pop(i)
+        return None
+
+    def _work(self, lane: str) -> None:
+        while True:
+            with self._cond:
+                job = self._pick(lane)
+                while job is None:
+                    if self._closed and not any(self._pending.values()):
+                        return
+                    self._cond.wait()
+                    job = self._pick(lane)
+                self._running[job.repo] = self._running.get(job.repo, 0) + 1
+                job.started = self.clock()
+            try:
+                with capture(batch=job.lane):
+                    record(queue_wait_ms=job.wait_ms or 0.0, cost=job.cost)
+                    job.review = self.run_job(job)
+            except Exception as exc:  # keep the batch going
+                job.error = exc
+            finally:
+                job.finished = self.clock()
+                with self._cond:
+                    self._running[job.repo] -= 1
+                    self._cond.notify_all()
+            if self.on_done is not None:
+                self.on_done(job)
+
+
+def parse_pr_ref(ref: str) -> tuple[str, str, int]:
+    """Parse ``owner/name#123`` or ``owner name 123``."""
+    parts = ref.replace('#', ' ').replace('/', ' ').split()
+    if len(parts) != 3 or not parts[2].isdigit():
+        raise ValueError(f'invalid pull request reference: {ref!r}')
+    return parts[0], parts[1], int(parts[2])
+
+
+def review_batch(
+    refs: Iterable[tuple[str, str, int]],
+    *,
+    model: str = 'gpt-4.1',
+    workers: int = 4,
+    large_workers: int = 1,
+    per_repo_limit: int = 1,
+    small_cost: int = SMALL_PR_COST,
+    on_done: Callable[[ReviewJob], None] | None = None,
+    publish: bool = False,
+    fetch_pr_data_func: Callable[[str, str, int], PRData] | None = None,
+    review_pr_func: Callable[..., str] | None = None,
+) -> list[ReviewJob]:
+    """Review many pull requests, scheduling them by estimated cost.
+
+    PR data is fetched concurrently as ``refs`` is consumed (it may be a
+    live stream); each PR is queued as soon as its cost is known and reviewed
+    with the already-fetched data. PRs of one repository share a single
+    clone: their head SHAs are fetched together and each review gets its own
+    worktree. With ``publish``, each review is posted back to its PR.
+    """
+    if fetch_pr_data_func is None:
+        from .github import fetch_pr_data
+
+        fetch_pr_data_func = fetch_pr_data
+    if review_pr_func is None:
+        from .review import review_pr
+
+        review_pr_func = review_pr
+    fetch = fetch_pr_data_func
+    review = review_pr_func
+    workspaces: dict[str, RepoWorkspace] = {}
+    workspaces_lock = threading.Lock()
+
+    def workspace(job: ReviewJob) -> RepoWorkspace:
+        with workspaces_lock:
+            found = workspaces.get(job.repo)
+            if found is None:
+                found = workspaces[job.repo] = RepoWorkspace(
+                    job.repo_owner, job.repo_name
+                )
+            return found
+
+    def run_job(job: ReviewJob) -> str:
+        pr_data = job.pr_data
+        assert pr_data is not None
+        shared = workspace(job)
+
+        def prefetched(_owner: str, _name: str, _number: int) -> PRData:
+            return pr_data
+
+        def add_worktree(_owner: str, _name: str, _keep_temp: bool) -> str:
+            return shared.add_worktree(pr_data[1])
+
+        def at_head(_worktree: str, _sha: str) -> None:
+            pass
+
+        return review(
+            job.repo_owner,
+            job.repo_name,
+            job.pr_number,
+            model=model,
+            publish=publish,
+            fetch_pr_data_func=prefetched,
+            clone_repo_func=add_worktree,
+            checkout_func=at_head,
+            cleanup_func=shared.remove_worktree,
+        )
+
+    scheduler = ReviewScheduler(
+        run_job,
+        workers=workers,
+        large_workers=large_workers,
+        per_repo_limit=per_repo_limit,
+        small_cost=small_cost,
+        on_done=on_done,
+    )
+
+    def prepare(owner: str, name: str, number: int) -> None:
+        job = ReviewJob(owner, name, number)
+        try:
+            job.pr_data = fetch(owner, name, number)
+            job.cost = estimate_review_cost(job.pr_data[0])['cost']
+            # Reviews of this repository share one fetch of all head SHAs.
+            workspace(job).want(job.pr_data[1])
+        except Exception as exc:
+            job.lane = 'fetch'
+            job.error = exc
+            scheduler.add_finished(job)
+            return
+        scheduler.submit(job)
+
+    scheduler.start()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            prepare_job = carry_spans(prepare)
+            for owner, name, number in refs:
+                _ = pool.submit(prepare_job, owner, name, number)
+    finally:
+        scheduler.close()
+        jobs = scheduler.join()
+        for shared in workspaces.values():
+            shared.close()
+    log.info(
+        'batch finished',
+        jobs=len(jobs),
+        failed=sum(1 for job in jobs if job.error is not None),
+    )
+    return jobs
+
+
+def queue_stats(jobs: Iterable[ReviewJob]) -> dict[str, LaneStats]:
+    """Summarise job counts, failures and queue wait times per lane."""
+    lanes: dict[str, list[ReviewJob]] = {}
+    for job in jobs:
+        lanes.setdefault(job.lane, []).append(job)
+    stats: dict[str, LaneStats] = {}
+    for lane, lane_jobs in sorted(lanes.items()):
+        waits = sorted(j.wait_ms for j in lane_jobs if j.wait_ms is not None)
+        stats[lane] = {
+            'count': len(lane_jobs),
+            'failed': sum(1 for j in lane_jobs if j.error is not None),
+            'wait_ms_avg': round(sum(waits) / len(waits), 1) if waits else 0.0,
+            'wait_ms_p50': round(waits[len(waits) // 2], 1) if waits else 0.0,
+            'wait_ms_max': round(waits[-1], 1) if waits else 0.0,
+        }
+    return stats
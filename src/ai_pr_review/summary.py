@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import tempfile
+from typing import Any, Iterable, TypedDict, cast
+
+from .graph import ModuleResolver, module_parts
+from .index import SymbolIndex, SymbolSpan
+
+SUMMARY_VERSION = 1
+# Summaries of this many recent commits are kept next to the symbol index.
+KEEP_SUMMARIES = 8
+MAX_SYMBOLS_PER_MODULE = 30
+_SOURCE_ROOTS = ('src', 'lib')
+
+
+class ModuleSummary(TypedDict):
+    module: str
+    symbols: list[str]
+    imports: list[str]
+
+
+class RepoSummary(TypedDict):
+    version: int
+    commit: str
+    modules: dict[str, ModuleSummary]
+
+
+def module_name(path: str) -> str:
+    """Return the dotted module name of a Python file path."""
+    parts = module_parts(path)
+    if len(parts) > 1 and parts[0] in _SOURCE_ROOTS:
+        parts = parts[1:]
+    return '.'.join(parts)
+
+
+def _top_level_symbols(spans: list[SymbolSpan]) -> list[str]:
+    """Names of the spans that are not nested inside another span."""
+    ordered = sorted(spans, key=lambda s: (s['start_line'], -s['end_line']))
+    names: list[str] = []
+    outer_end = 0
+    for span in ordered:
+        if span['start_line'] > outer_end:
+            names.append(f'{span["type"]} {span["name"]}')
+            outer_end = span['end_line']
+    return names
+
+
+def build_repo_summary(index: SymbolIndex) -> RepoSummary:
+    """Derive the module map, top-level symbols and import graph from ``index``."""
+    py_files = {p: sha for p, sha in index.files.items() if p.endswith('.py')}
+    resolver = ModuleResolver(py_files)
+    modules: dict[str, ModuleSummary] = {}
+    for path, sha in sorted(py_files.items()):
+        entry = index.blobs.get(sha)
+        if entry is None:
+            continue
+        modules[path] = {
+            'module': module_name(path),
+            'symbols': _top_level_symbols(entry['symbols'])[:MAX_SYMBOLS_PER_MODULE],
+            'imports': resolver.resolve_all(path, entry.get('imports', [])),
+        }
+    return {
+        'version': SUMMARY_VERSION,
+        'commit': index.commit or '',
+        'modules': modules,
+    }
+
+
+def _summary_prefix(index: SymbolIndex) -> str:
+    return index.index_path.removesuffix('.json') + '.summary-'
+
+
+def _summary_path(index: SymbolIndex, commit: str) -> str:
+    return f'{_summary_prefix(index)}{commit}.json'
+
+
+def load_repo_summary(index: SymbolIndex) -> RepoSummary | None:
+    """Return the stored summary for the index's current commit, if any."""
+    if not index.commit:
+        return None
+    try:
+        with open(_summary_path(index, index.commit), encoding='utf-8') as fh:
+            data = cast(dict[str, Any], json.load(fh))
+    except (OSError, ValueError):
+        return None
+    if data.get('version') != SUMMARY_VERSION:
+        return None
+    return cast(RepoSummary, data)
+
+
+def save_repo_summary(index: SymbolIndex, summary: RepoSummary) -> None:
+    """Atomically store ``summary`` and prune summaries of older commits."""
+    path = _summary_path(index, summary['commit'])
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+        json.dump(summary, fh, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+    pattern = glob.escape(_summary_prefix(index)) + '*.json'
+    stored = sorted(glob.glob(pattern), key=os.path.getmtime, reverse=True)
+    for old in stored[KEEP_SUMMARIES:]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+
+def repo_summary(index: SymbolIndex) -> RepoSummary:
+    """Load the summary for the index's commit, building and storing it once.
+
+    ``index`` must already be refreshed; the per-file data comes from its
+    blob-keyed entries, so only files changed since the last indexed commit
+    were parsed to produce it.
+    """
+    summary = load_repo_summary(index)
+    if summary is None:
+        summary = build_repo_summary(index)
+        save_repo_summary(index, summary)
+    return summary
+
+
+def architecture_context(
+    summary: RepoSummary, changed_files: Iterable[str], max_chars: int = 4000
+) -> str:
+    """Describe where the changed files sit in the repository.
+
+    For each changed Python module: its top-level symbols and the repository
+    modules it imports, with their top-level symbols.
+    """
+    modules = summary['modules']
+    lines: list[str] = []
+    seen: set[str] = set()
+    for path in changed_files:
+        mod = modules.get(path)
+        if mod is None or path in seen:
+            continue
+        seen.add(path)
+        lines.append(f'{mod["module"]} ({path})')
+        if mod['symbols']:
+            lines.append(f'  defines: {", ".join(mod["symbols"])}')
+        for target in mod['imports']:
+            dep = modules.get(target)
+            if dep is None:
+                continue
+            symbols = ', '.join(dep['symbols'][:10])
+            lines.append(
+                f'  imports {dep["module"]}' + (f': {symbols}' if symbols else '')
+            )
+    if not lines:
+        return ''
+    text = '## Repository architecture\n' + '\n'.join(lines)
+    if len(text) > max_chars:
+        text = text[: text.rfind('\n', 0, max_chars)] + '\n  ...'
+    return text
+
+
+def repo_overview(summary: RepoSummary, max_chars: int = 12_000) -> str:
+    """List every Python module with its top-level symbols, in path order.
+
+    The text depends only on the repository, not on the pull request, so it
+    belongs in the cached prompt prefix.
+    """
+    lines = [
+        f'{mod["module"]}: {", ".join(mod["symbols"])}'
+        if mod['symbols']
+        else mod['module']
+        for _path, mod in sorted(summary['modules'].items())
+    ]
+    if not lines:
+        return ''
+    text = '## Repository modules\n' + '\n'.join(lines)
+    if len(text) > max_chars:
+        text = text[: text.rfind('\n', 0, max_chars)] + '\n...'
+    return text
+
+
+def main(cli_args: list[str] | None = None) -> None:
+    """Refresh the symbol index and precompute the summary for a checkout."""
+    parser = argparse.ArgumentParser(
+        description='Precompute the repository summary used to enrich reviews'
+    )
+    parser.add_argument('repo_path', help='Path to a git checkout')
+    parser.add_argument(
+        '--index-dir',
+        default=os.getenv('AI_PR_REVIEW_INDEX_DIR'),
+        help='Index directory (defaults to AI_PR_REVIEW_INDEX_DIR)',
+    )
+    args = parser.parse_args(cli_args)
+    index_dir = cast(str | None, args.index_dir)
+    if not index_dir:
+        parser.error('--index-dir or AI_PR_REVIEW_INDEX_DIR is required')
+    index = SymbolIndex.open(cast(str, args.repo_path), index_dir)
+    index.refresh()
+    index.save()
+    summary = repo_summary(index)
+    print(
+        f'{summary["commit"]}: {len(summary["modules"])} modules '
+        f'({index.parsed} files parsed, {index.reused} reused)'
+    )
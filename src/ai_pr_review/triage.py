@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import fnmatch
+import posixpath
+from typing import Literal, NamedTuple, cast
+
+from logkit import metrics
+
+from .filters import FileFilter, split_diff
+
+# PRs at or under both limits are reviewed from the diff alone, whatever
+# they touch.
+TINY_PR_LINES = 20
+TINY_PR_FILES = 2
+
+DOC_EXTENSIONS = frozenset({'.md', '.rst', '.txt', '.adoc'})
+# ``.txt`` files that are build inputs rather than prose, matched by
+# lower-cased file name; files under a ``requirements/`` directory count too.
+BUILD_TXT_NAMES = ('requirements*.txt', 'constraints*.txt', 'cmakelists.txt')
+
+# Stages the diff-only path skips.
+SKIPPED_STAGES = ('stage=clone', 'stage=checkout', 'stage=context')
+# Their cost before any full review has run in this process: importing kit
+# (~0.5 s, benchmarks/bench_import_time.py), a local clone and checkout
+# (~60 ms, benchmarks/bench_e2e.py) and ~16 ms per file section
+# (benchmarks/bench_context_pool.py). Network clones cost more.
+SKIPPED_BASE_MS = 560.0
+SKIPPED_PER_FILE_MS = 16.0
+
+
+class Triage(NamedTuple):
+    path: Literal['diff_only', 'full']
+    reason: str
+    files: int
+    changed_lines: int
+    kinds: dict[str, int]
+
+
+def _kind(path: str, reason: str | None) -> str:
+    if reason == 'lockfile':
+        return 'lockfile'
+    if reason is not None:
+        return 'generated'
+    name = posixpath.basename(path).lower()
+    if posixpath.splitext(name)[1] not in DOC_EXTENSIONS:
+        return 'code'
+    if name.endswith('.txt') and (
+        any(fnmatch.fnmatchcase(name, pattern) for pattern in BUILD_TXT_NAMES)
+        or posixpath.basename(posixpath.dirname(path)) == 'requirements'
+    ):
+        return 'code'
+    return 'docs'
+
+
+def file_kind(path: str, file_filter: FileFilter | None = None) -> str:
+    """Classify a changed path as docs, lockfile, generated or code."""
+    file_filter = file_filter or FileFilter.from_env()
+    return _kind(path, file_filter.path_reason(path))
+
+
+def triage_patchset(diff_text: str, file_filter: FileFilter | None = None) -> Triage:
+    """Decide whether a PR needs repository context or only its diff.
+
+    Empty PRs, PRs touching only docs, lockfiles or generated files, and PRs
+    with a tiny code change take the ``diff_only`` path. Files are classified
+    with ``file_filter`` (``FileFilter.from_env()`` by default), so anything
+    the review would skip, by glob or by heuristic, counts as generated.
+    """
+    file_filter = file_filter or FileFilter.from_env()
+    _preamble, files = split_diff(diff_text)
+    kinds: dict[str, int] = {}
+    code_lines = changed_lines = 0
+    for file_diff in files:
+        kind = _kind(file_diff.path, file_filter.reason(file_diff))
+        kinds[kind] = kinds.get(kind, 0) + 1
+        lines = file_diff.added + file_diff.removed
+        changed_lines += lines
+        if kind == 'code':
+            code_lines += lines
+
+    def result(path: Literal['diff_only', 'full'], reason: str) -> Triage:
+        return Triage(path, reason, len(files), changed_lines, kinds)
+
+    if not files:
+        return result('diff_only', 'empty')
+    if 'code' not in kinds:
+        only = f'{next(iter(kinds))}-only' if len(kinds) == 1 else 'non-code'
+        return result('diff_only', only)
+    # Lockfile and generated churn does not make a code change less tiny.
+    if code_lines <= TINY_PR_LINES and kinds['code'] <= TINY_PR_FILES:
+        return result('diff_only', 'tiny')
+    return result('full', 'code')
+
+
+def diff_only_context(diff_text: str, triage: Triage) -> str:
+    """Context for a diff-only review: the diff and a note on its scope."""
+    sections: list[str] = []
+    if diff_text.strip():
+        sections.append('## Diff\n```diff\n' + diff_text.strip() + '\n```')
+    sections.append(
+        f'## Review scope\nDiff-only review ({triage.reason} change): the '
+        'repository was not checked out, so surrounding code is not shown.'
+    )
+    return '\n\n'.join(sections)
+
+
+def estimated_saving_ms(triage: Triage) -> tuple[float, str]:
+    """Estimate the clone, checkout and context time a diff-only review saves.
+
+    Returns the estimate and its source: ``'observed'`` when earlier full
+    reviews in this process (e.g. a batch run) timed those stages, else
+    ``'diff size'`` for the benchmark-based cost of ``triage.files`` files.
+    """
+    summary = metrics.summary()
+    observed = [summary[name] for name in SKIPPED_STAGES if name in summary]
+    if observed:
+        total = sum(cast(float, stats['dur_ms_avg']) for stats in observed)
+        return round(total, 1), 'observed'
+    return SKIPPED_BASE_MS + SKIPPED_PER_FILE_MS * triage.files, 'diff size'
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from typing import Any, Iterable
+
+from logkit import carry_spans, span
+
+from .cache import MAX_FILE_BYTES, FileCache
+
+MAX_USAGES_PER_SYMBOL = 20
+
+
+def _iter_repo_files(repo_path: str) -> list[str]:
+    """Return repo-relative paths of candidate text files, sorted."""
+    paths: list[str] = []
+    for root, dirs, files in os.walk(repo_path):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in files:
+            if name.startswith('.'):
+                continue
+            rel = os.path.relpath(os.path.join(root, name), repo_path)
+            paths.append(rel.replace(os.sep, '/'))
+    paths.sort()
+    return paths
+
+
+def _compile_matcher(names: Iterable[str]) -> re.Pattern[str]:
+    # Longest names first so the alternation never stops at a shorter prefix.
+    ordered = sorted(set(names), key=lambda n: (-len(n), n))
+    alternation = '|'.join(re.escape(n) for n in ordered)
+    return re.compile(rf'(?<![\w])(?:{alternation})(?![\w])')
+
+
+def _read_text(repo_path: str, rel_path: str) -> str | None:
+    abs_path = os.path.join(repo_path, rel_path)
+    try:
+        if os.path.getsize(abs_path) > MAX_FILE_BYTES:
+            return None
+        with open(abs_path, 'rb') as fh:
+            raw = fh.read()
+    except OSError:
+        return None
+    if b'\0' in raw:
+        return None
+    return raw.decode('utf-8', errors='ignore')
+
+
+def _scan_file(
+    repo_path: str,
+    rel_path: str,
+    matcher: re.Pattern[str],
+    file_cache: FileCache | None,
+) -> list[tuple[str, int, str]]:
+    """Return (symbol, line_number, line) hits for every matcher hit in a file."""
+    with span(step='usage_scan'):
+        return _match_file(repo_path, rel_path, matcher, file_cache)
+
+
+def _match_file(
+    repo_path: str,
+    rel_path: str,
+    matcher: re.Pattern[str],
+    file_cache: FileCache | None,
+) -> list[tuple[str, int, str]]:
+    if file_cache is not None:
+        text = file_cache.text(rel_path)
+    else:
+        text = _read_text(repo_path, rel_path)
+    if text is None:
+        return []
+    if matcher.search(text) is None:
+        return []
+
+    hits: list[tuple[str, int, str]] = []
+    for line_no, line in enumerate(text.splitlines(), 1):
+        seen: set[str] = set()
+        for match in matcher.finditer(line):
+            name = match.group(0)
+            if name not in seen:
+                seen.add(name)
+                hits.append((name, line_no, line))
+    return hits
+
+
+def find_symbol_usages_batch(
+    repo_path: str,
+    symbol_names: Iterable[str],
+    *,
+    max_per_symbol: int = MAX_USAGES_PER_SYMBOL,
+    files: Iterable[str] | None = None,
+    file_cache: FileCache | None = None,
+    max_workers: int | None = None,
+) -> dict[str, list[dict[str, Any]]]:
+    """Find usages of many symbols with a single pass over the repository.
+
+    All names are folded into one whole-word regex, files are scanned in a
+    thread pool and hits are grouped per symbol in (file, line) order. Each
+    usage has the ``file``/``line_number``/``line`` keys returned by kit's text
+    search, capped at ``max_per_symbol`` per name. Pass ``files`` to restrict
+    the scan to known candidates instead of walking the whole tree, and
+    ``file_cache`` to reuse file contents already read for this review.
+    """
+    names = {n for n in symbol_names if n}
+    usages: dict[str, list[dict[str, Any]]] = {n: [] for n in names}
+    if not names:
+        return usages
+
+    matcher = _compile_matcher(names)
+    paths = _iter_repo_files(repo_path) if files is None else sorted(files)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # ``map`` yields in submission order, so output is deterministic.
+        results = pool.map(
+            carry_spans(_scan_file),
+            repeat(repo_path),
+            paths,
+            repeat(matcher),
+            repeat(file_cache),
+        )
+        for rel_path, hits in zip(paths, results, strict=True):
+            for name, line_no, line in hits:
+                bucket = usages[name]
+                if len(bucket) < max_per_symbol:
+                    bucket.append(
+                        {'file': rel_path, 'line_number': line_no, 'line': line}
+                    )
+    return usages
@@ -6,18 +6,30 @@
 #   "structlog>=24.1",
 # ]
 
-import asyncio
+import atexit
 import contextvars
+import copy
+import datetime
 import functools
+import itertools
+import json
 import logging
+import logging.handlers
+import math
 import os
 import pathlib
+import queue
+import sys
+import threading
 import time
 import uuid
 from logging.handlers import RotatingFileHandler
 from typing import Any, Callable
 
-import structlog
+try:  # resource is POSIX-only; metrics degrade gracefully without it
+    import resource
+except ImportError:  # pragma: no cover - windows
+    resource = None
 
 # ---------------------------------------------------------------- context plumbing
 _CTX: contextvars.ContextVar[dict[str, Any] | None] = contextvars.ContextVar(
@@ -32,17 +44,167 @@ def _merge_ctx(_, __, event):  # inject current ContextVars into every event
     return event
 
 
-# ---------------------------------------------------------------- file handler (offline-friendly)
-def _attach_file_handler(path: str | os.PathLike, rotate_mb: int) -> None:
+# ---------------------------------------------------------------- sinks (offline-friendly)
+def _record_timestamp(
+    _, __, event
+):  # stdlib records: stamp with emit time, not render time
+    created = event['_record'].created
+    event['timestamp'] = (
+        datetime.datetime.fromtimestamp(created, datetime.timezone.utc)
+        .isoformat()
+        .replace('+00:00', 'Z')
+    )
+    return event
+
+
+class _BatchEmitMixin:
+    """Write a whole batch of records with one write + one flush."""
+
+    def emit_batch(self, records: list[logging.LogRecord]) -> None:
+        lines = []
+        for record in records:
+            if record.levelno < self.level:
+                continue
+            try:
+                lines.append(self.format(record))
+            except Exception:
+                self.handleError(record)
+        if not lines:
+            return
+        chunk = self.terminator.join(lines) + self.terminator
+        with self.lock:
+            try:
+                self._write_chunk(chunk)
+                self.flush()
+            except Exception:
+                self.handleError(records[-1])
+
+    def _write_chunk(self, chunk: str) -> None:
+        self.stream.write(chunk)
+
+
+class _BatchStreamHandler(_BatchEmitMixin, logging.StreamHandler):
+    pass
+
+
+class _BatchRotatingFileHandler(_BatchEmitMixin, RotatingFileHandler):
+    def _write_chunk(self, chunk: str) -> None:
+        if self.stream is None:
+            self.stream = self._open()
+        # one rollover check per batch instead of one per record
+        if self.maxBytes > 0 and self.stream.tell() + len(chunk) >= self.maxBytes:
+            self.doRollover()
+        self.stream.write(chunk)
+
+
+class _QueueSink(logging.handlers.QueueHandler):
+    """
+    Caller-side half of the async sink: enqueue the record and return.
+    * `policy='drop'`  - never block; count records lost when the queue is full.
+    * `policy='block'` - apply backpressure to callers until the writer catches up.
+    Rendering and I/O happen on the writer thread (`_SinkWriter`).
+    """
+
+    def __init__(self, q: queue.Queue, policy: str):
+        super().__init__(q)
+        self.policy = policy
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # keep the structlog event dict intact; the writer's formatter renders it
+        return copy.copy(record)
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.policy == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _SinkWriter(threading.Thread):
+    """Drain the queue in batches of up to `batch` records per write/flush."""
+
+    _STOP = object()
+
+    def __init__(self, q: queue.Queue, handlers: list[logging.Handler], batch: int):
+        super().__init__(name='logkit-sink', daemon=True)
+        self.queue = q
+        self.handlers = handlers
+        self.batch = batch
+
+    def run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            records = []
+            while True:
+                if item is self._STOP:
+                    stopping = True
+                else:
+                    records.append(item)
+                if stopping or len(records) >= self.batch:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            for handler in self.handlers:
+                handler.emit_batch(records)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.queue.put(self._STOP)
+        self.join(timeout)
+        for handler in self.handlers:
+            handler.close()
+
+
+def _make_file_handler(path: str | os.PathLike, rotate_mb: int, batched: bool):
     path = pathlib.Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
-    handler = RotatingFileHandler(path, maxBytes=rotate_mb * 1_048_576, backupCount=5)
-    handler.setFormatter(logging.Formatter('%(message)s'))
-    logging.getLogger().addHandler(handler)
+    cls = _BatchRotatingFileHandler if batched else RotatingFileHandler
+    return cls(path, maxBytes=rotate_mb * 1_048_576, backupCount=5)
+
+
+def _start_async_sink(handlers: list[logging.Handler]):
+    """Start the writer thread; return the queue handler and its shutdown."""
+    size = int(os.getenv('LOG_QUEUE_SIZE', 10_000))
+    policy = os.getenv('LOG_QUEUE_POLICY', 'drop').lower()  # drop | block
+    batch = int(os.getenv('LOG_QUEUE_BATCH', 256))
+    q: queue.Queue = queue.Queue(maxsize=size)
+    sink = _QueueSink(q, policy)
+    writer = _SinkWriter(q, handlers, batch)
+    writer.start()
+
+    def _shutdown() -> None:
+        writer.stop()
+        if sink.dropped:
+            print(
+                f'logkit: dropped {sink.dropped} log records (queue full)',
+                file=sys.stderr,
+            )
+
+    return sink, _shutdown
 
 
 # ---------------------------------------------------------------- global configure
+def _level_sampler(rate: float, drop: type[Exception]):
+    """Keep only `rate` of DEBUG/INFO events; warnings and errors always pass."""
+    import random
+
+    def sample(_, method_name, event):
+        if method_name in ('debug', 'info') and random.random() >= rate:
+            raise drop
+        return event
+
+    return sample
+
+
 def _configure_once() -> None:
+    import structlog
+
     profile = os.getenv('LOG_PROFILE', 'dev').lower()  # dev | prod
     base_lvl = getattr(
         logging, os.getenv('LOG_LEVEL', 'DEBUG' if profile == 'dev' else 'INFO').upper()
@@ -50,6 +212,7 @@ def _configure_once() -> None:
     sample = float(os.getenv('LOG_SAMPLE', 1))  # 1 = keep all
     log_file = os.getenv('LOG_FILE', 'run.log')  # JSONL sink for offline agents
     rotate_mb = int(os.getenv('LOG_ROTATE_MB', 10))
+    use_async = os.getenv('LOG_ASYNC', '1') != '0'  # 0 = write inline in the caller
 
     processors = [
         structlog.contextvars.merge_contextvars,
@@ -57,23 +220,31 @@ def _configure_once() -> None:
         structlog.processors.TimeStamper(fmt='iso'),
         structlog.stdlib.add_log_level,
     ]
-    try:
-        sample_proc = structlog.processors.SampleByLevel(
-            lower=logging.DEBUG,
-            upper=logging.INFO,
-            sample_rate=sample,
-        )
-        processors.append(sample_proc)
-    except AttributeError:
-        pass
+    if sample < 1:
+        processors.append(_level_sampler(sample, structlog.DropEvent))
     processors.extend(
         [
             structlog.processors.format_exc_info,
-            structlog.dev.ConsoleRenderer()
-            if profile == 'dev'
-            else structlog.processors.JSONRenderer(),
+            # rendering is deferred to the handlers' formatter (writer thread if async)
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
         ]
     )
+    renderer = (
+        structlog.dev.ConsoleRenderer()
+        if profile == 'dev'
+        else structlog.processors.JSONRenderer()
+    )
+    formatter = structlog.stdlib.ProcessorFormatter(
+        processors=[
+            structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+            renderer,
+        ],
+        foreign_pre_chain=[
+            _record_timestamp,
+            structlog.stdlib.add_log_level,
+            structlog.processors.format_exc_info,
+        ],
+    )
 
     structlog.configure(
         processors=processors,
@@ -82,20 +253,385 @@ def _configure_once() -> None:
         cache_logger_on_first_use=True,
     )
 
-    logging.basicConfig(
-        level=base_lvl, handlers=[logging.StreamHandler()]
-    )  # std-lib parity
-
+    handlers: list[logging.Handler] = [
+        _BatchStreamHandler() if use_async else logging.StreamHandler()
+    ]
     if log_file:  # local JSONL file so agents can read after the run
-        _attach_file_handler(log_file, rotate_mb)
+        handlers.append(_make_file_handler(log_file, rotate_mb, batched=use_async))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if use_async:
+        sink, shutdown = _start_async_sink(handlers)
+        installed = [sink]
+    else:
+        installed = handlers
+
+        def shutdown() -> None:
+            for handler in handlers:
+                handler.close()
+
+    root = logging.getLogger()  # std-lib parity: foreign records use the same sinks
+    root.setLevel(base_lvl)
+    for handler in installed:
+        root.addHandler(handler)
+    _INSTALLED.extend(installed)
+    _SHUTDOWN.append(shutdown)
+    atexit.register(shutdown)
+
+
+def _teardown() -> None:
+    """Remove the root handlers logkit installed and stop their writer."""
+    root = logging.getLogger()
+    for handler in _INSTALLED:
+        root.removeHandler(handler)
+    _INSTALLED.clear()
+    for shutdown in _SHUTDOWN:
+        atexit.unregister(shutdown)
+        shutdown()
+    _SHUTDOWN.clear()
+
+
+# Root handlers installed by the last configure() and how to stop them.
+_INSTALLED: list[logging.Handler] = []
+_SHUTDOWN: list[Callable[[], None]] = []
+_CONFIGURED = False
+_CONFIG_LOCK = threading.Lock()
+# Default `span` sample rate; read once here and on configure(), not per span.
+_SPAN_SAMPLE = float(os.getenv('LOG_SPAN_SAMPLE', 0))
+
+
+def configure(force: bool = False) -> None:
+    """
+    Wire structlog + std-lib sinks from the LOG_* env vars. Idempotent.
+    Called implicitly by the first log call, so importing logkit costs nothing;
+    call it explicitly to configure early (e.g. after loading a .env file).
+    `force=True` re-reads the variables, replacing the handlers and writer
+    thread installed by the previous call.
+    """
+    global _CONFIGURED, _SPAN_SAMPLE
+    if _CONFIGURED and not force:
+        return
+    with _CONFIG_LOCK:
+        if _CONFIGURED and not force:
+            return
+        _SPAN_SAMPLE = float(os.getenv('LOG_SPAN_SAMPLE', 0))
+        _teardown()
+        _configure_once()
+        # Drop the logger bound under the old configuration.
+        _LazyLogger._logger = None
+        _CONFIGURED = True
+
+
+class _LazyLogger:
+    """Stand-in for the structlog logger that configures logkit on first use."""
+
+    _logger = None
+
+    def __getattr__(self, name: str):
+        if self._logger is None:
+            configure()
+            import structlog
+
+            self._logger = structlog.get_logger()
+        return getattr(self._logger, name)
+
+
+log = _LazyLogger()  # ← every import gets the same logger, wired on first call
+
+
+# ---------------------------------------------------------------- metrics
+_BUCKETS_MS = (
+    5,
+    10,
+    25,
+    50,
+    100,
+    250,
+    500,
+    1000,
+    2500,
+    5000,
+    10000,
+    30000,
+    60000,
+    120000,
+)
+
+
+def _usage() -> tuple[float, float, int]:
+    """
+    Return (calling thread's cpu s, waited-children cpu s, peak rss KiB).
+    Only the first is per thread: children cpu and peak RSS are process totals,
+    so under concurrent spans they include other threads' children and memory.
+    """
+    if resource is None:
+        return time.thread_time(), 0.0, 0
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    kids = resource.getrusage(resource.RUSAGE_CHILDREN)
+    rss = own.ru_maxrss // 1024 if os.uname().sysname == 'Darwin' else own.ru_maxrss
+    return time.thread_time(), kids.ru_utime + kids.ru_stime, rss
+
+
+class Metrics:
+    """
+    Thread-safe per-span-name aggregates fed by every `capture` exit.
+    * duration histogram (ms), cpu time of the span's thread;
+    * child-cpu time and peak RSS high-water mark, both process-wide;
+    * free-form counters added with `record()` (bytes, lines, tokens, ...).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: dict[str, dict[str, Any]] = {}
+
+    def observe(
+        self,
+        name: str,
+        dur_ms: float,
+        *,
+        error: bool = False,
+        cpu_ms: float = 0.0,
+        child_cpu_ms: float = 0.0,
+        max_rss_kb: int = 0,
+        counters: dict[str, float] | None = None,
+    ) -> None:
+        with self._lock:
+            st = self._spans.get(name)
+            if st is None:
+                st = self._spans[name] = {
+                    'count': 0,
+                    'errors': 0,
+                    'dur_ms_sum': 0.0,
+                    'dur_ms_max': 0.0,
+                    'buckets': [0] * (len(_BUCKETS_MS) + 1),
+                    'cpu_ms_sum': 0.0,
+                    'child_cpu_ms_sum': 0.0,
+                    'max_rss_kb': 0,
+                    'counters': {},
+                }
+            st['count'] += 1
+            st['errors'] += int(error)
+            st['dur_ms_sum'] += dur_ms
+            st['dur_ms_max'] = max(st['dur_ms_max'], dur_ms)
+            st['buckets'][_bucket_index(dur_ms)] += 1
+            st['cpu_ms_sum'] += cpu_ms
+            st['child_cpu_ms_sum'] += child_cpu_ms
+            st['max_rss_kb'] = max(st['max_rss_kb'], max_rss_kb)
+            for key, value in (counters or {}).items():
+                st['counters'][key] = st['counters'].get(key, 0) + value
+
+    def summary(self) -> dict[str, dict[str, Any]]:
+        """JSON-friendly snapshot: one entry per span name."""
+        with self._lock:
+            out = {}
+            for name, st in sorted(self._spans.items()):
+                out[name] = {
+                    'count': st['count'],
+                    'errors': st['errors'],
+                    'dur_ms_sum': round(st['dur_ms_sum'], 3),
+                    'dur_ms_avg': round(st['dur_ms_sum'] / st['count'], 3),
+                    'dur_ms_max': round(st['dur_ms_max'], 3),
+                    'dur_ms_buckets': dict(
+                        zip(
+                            [*map(str, _BUCKETS_MS), '+Inf'], st['buckets'], strict=True
+                        )
+                    ),
+                    'cpu_ms_sum': round(st['cpu_ms_sum'], 3),
+                    'child_cpu_ms_sum': round(st['child_cpu_ms_sum'], 3),
+                    'max_rss_kb': st['max_rss_kb'],
+                    'counters': dict(st['counters']),
+                }
+            return out
+
+    def prometheus(self, prefix: str = 'logkit') -> str:
+        """Render the aggregates in the Prometheus text exposition format."""
+        snap = self.summary()
+        lines = [
+            f'# TYPE {prefix}_span_duration_ms histogram',
+        ]
+        for name, st in snap.items():
+            label = _prom_label(name)
+            cumulative = 0
+            for le, n in st['dur_ms_buckets'].items():
+                cumulative += n
+                lines.append(
+                    f'{prefix}_span_duration_ms_bucket{{span="{label}",le="{le}"}} {cumulative}'
+                )
+            lines.append(
+                f'{prefix}_span_duration_ms_sum{{span="{label}"}} {st["dur_ms_sum"]}'
+            )
+            lines.append(
+                f'{prefix}_span_duration_ms_count{{span="{label}"}} {st["count"]}'
+            )
+        for metric, key, kind, help_text in (
+            ('span_errors_total', 'errors', 'counter', ''),
+            (
+                'span_cpu_ms_total',
+                'cpu_ms_sum',
+                'counter',
+                'CPU time of the span thread',
+            ),
+            (
+                'span_child_cpu_ms_total',
+                'child_cpu_ms_sum',
+                'counter',
+                'Process-wide CPU time of children reaped during the span',
+            ),
+            (
+                'span_max_rss_kb',
+                'max_rss_kb',
+                'gauge',
+                'Process-wide peak RSS at span exit',
+            ),
+        ):
+            if help_text:
+                lines.append(f'# HELP {prefix}_{metric} {help_text}')
+            lines.append(f'# TYPE {prefix}_{metric} {kind}')
+            for name, st in snap.items():
+                lines.append(
+                    f'{prefix}_{metric}{{span="{_prom_label(name)}"}} {st[key]}'
+                )
+        lines.append(f'# TYPE {prefix}_span_counter_total counter')
+        for name, st in snap.items():
+            for key, value in sorted(st['counters'].items()):
+                lines.append(
+                    f'{prefix}_span_counter_total{{span="{_prom_label(name)}",counter="{_prom_label(key)}"}} {value}'
+                )
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
 
+def _bucket_index(dur_ms: float) -> int:
+    for i, upper in enumerate(_BUCKETS_MS):
+        if dur_ms <= upper:
+            return i
+    return len(_BUCKETS_MS)
 
-_CONFIG_FLAG = '_LOGKIT_CONFIGURED'
-if _CONFIG_FLAG not in globals():
-    _configure_once()
-    globals()[_CONFIG_FLAG] = True
 
-log = structlog.get_logger()  # ← every import gets the same, fully wired logger
+def _prom_label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics()
+_SPAN: contextvars.ContextVar['capture | None'] = contextvars.ContextVar(
+    'span', default=None
+)
+
+
+# Thread id -> names of the spans open on that thread, outermost first.
+# Only maintained while `track_spans(True)` is on (e.g. under a profiler).
+_ACTIVE_SPANS: dict[int, list[str]] = {}
+_TRACK_SPANS = False
+
+
+def track_spans(enabled: bool) -> None:
+    """Start or stop recording which spans are open on each thread."""
+    global _TRACK_SPANS
+    _TRACK_SPANS = enabled
+    if not enabled:
+        _ACTIVE_SPANS.clear()
+
+
+def spans_tracked() -> bool:
+    """Whether `track_spans` is on, i.e. a sampling profiler is running."""
+    return _TRACK_SPANS
+
+
+def active_spans() -> dict[int, tuple[str, ...]]:
+    """Snapshot of the open span names per thread id (see `track_spans`)."""
+    return {
+        ident: tuple(names) for ident, names in list(_ACTIVE_SPANS.items()) if names
+    }
+
+
+def _push_active(name: str) -> bool:
+    if not _TRACK_SPANS:
+        return False
+    _ACTIVE_SPANS.setdefault(threading.get_ident(), []).append(name)
+    return True
+
+
+def _pop_active() -> None:
+    names = _ACTIVE_SPANS.get(threading.get_ident())
+    if names:
+        names.pop()
+
+
+def carry_spans(fn):
+    """
+    Wrap `fn` to run under the spans open on the calling thread.
+
+    Pool worker threads open no spans of their own, so a profiler would not
+    see their work; wrap the callable before handing it to the pool. Without
+    `track_spans(True)`, `fn` is returned unchanged.
+    """
+    names = _ACTIVE_SPANS.get(threading.get_ident()) if _TRACK_SPANS else None
+    if not names:
+        return fn
+    carried = list(names)
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        stack = _ACTIVE_SPANS.setdefault(threading.get_ident(), [])
+        depth = len(stack)
+        stack.extend(carried)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            del stack[depth:]
+
+    return run
+
+
+# Keyword arguments of the END record itself; counters may not reuse them.
+_RESERVED_COUNTERS = frozenset({'event', 'dur_ms', 'status', 'exc_info'})
+
+
+def record(**counters: float) -> None:
+    """
+    Add numeric counters (bytes, lines, tokens, ...) to the innermost active `capture`.
+    They are summed per span name in `metrics` and attached to the span's END record.
+    No-op outside a span. Raises ValueError for the END record's own field names.
+    """
+    reserved = _RESERVED_COUNTERS.intersection(counters)
+    if reserved:
+        raise ValueError(f'reserved counter names: {", ".join(sorted(reserved))}')
+    span = _SPAN.get()
+    if span is None:
+        return
+    for key, value in counters.items():
+        if (
+            isinstance(value, (int, float))
+            and not isinstance(value, bool)
+            and math.isfinite(value)
+        ):
+            span._counters[key] = span._counters.get(key, 0) + value
+
+
+def write_metrics(json_path: str | None = None, prom_path: str | None = None) -> None:
+    """Write the metrics summary as JSON and/or Prometheus text (textfile-collector style)."""
+    for path, render in (
+        (json_path, lambda: json.dumps(metrics.summary(), indent=2)),
+        (prom_path, metrics.prometheus),
+    ):
+        if path:
+            p = pathlib.Path(path)
+            p.parent.mkdir(parents=True, exist_ok=True)
+            p.write_text(render())
+
+
+def _write_metrics_at_exit() -> None:
+    json_path = os.getenv('LOG_METRICS_FILE')
+    prom_path = os.getenv('LOG_METRICS_PROM_FILE')
+    if (json_path or prom_path) and metrics.summary():
+        write_metrics(json_path, prom_path)
+
+
+atexit.register(_write_metrics_at_exit)
 
 
 # ---------------------------------------------------------------- public helpers
@@ -104,6 +640,8 @@ def new_context(**kv: Any) -> str:
     Clear any stale context, start (or continue) a trace and bind user-supplied keys.
     Returns the active trace_id so callers can forward it across process boundaries.
     """
+    import structlog
+
     structlog.contextvars.clear_contextvars()
     trace_id = kv.pop('trace_id', uuid.uuid4().hex)
     all_kv = {'trace_id': trace_id, **kv}
@@ -115,20 +653,24 @@ def new_context(**kv: Any) -> str:
 class capture:
     """
     Decorator *and* context-manager.
-    * Adds span_id, logs one END record with dur_ms + status.
+    * Adds span_id, logs one END record with dur_ms + status (+ any `record()` counters).
+    * Feeds `metrics` under the span name (first key=value, e.g. ``stage=fetch``).
     * Works on sync and async functions.
     """
 
     def __init__(self, **kv):
         self._kv = kv
+        self.name = _span_name(kv)
 
     # -- decorator -----------------------------------------------------------
     def __call__(self, fn: Callable):
-        if asyncio.iscoroutinefunction(fn):
+        import inspect
+
+        if inspect.iscoroutinefunction(fn):
 
             @functools.wraps(fn)
             async def awrapper(*a, **kw):
-                with self.__class__(fn=fn.__qualname__, **self._kv):
+                with self._spawn(fn=fn.__qualname__):
                     return await fn(*a, **kw)
 
             return awrapper
@@ -136,31 +678,194 @@ class capture:
 
             @functools.wraps(fn)
             def swrapper(*a, **kw):
-                with self.__class__(fn=fn.__qualname__, **self._kv):
+                with self._spawn(fn=fn.__qualname__):
                     return fn(*a, **kw)
 
             return swrapper
 
+    def _spawn(self, **extra):
+        return self.__class__(**extra, **self._kv)
+
     # -- context-manager -----------------------------------------------------
     def __enter__(self):
+        self._counters: dict[str, float] = {}
+        self._cpu0, self._child_cpu0, _ = _usage()
         self._t0 = time.perf_counter()
-        self._span = {'span_id': uuid.uuid4().hex, **self._kv}
-        structlog.contextvars.bind_contextvars(**self._span)
+        self._span = {'span_id': _next_span_id(), **self._kv}
+        self._token = _SPAN.set(self)
+        self._tracked = _push_active(self.name)
+        _bind_contextvars(**self._span)
         return self
 
     def __exit__(self, exc_type, exc, __):
-        dur_ms = int((time.perf_counter() - self._t0) * 1000)
+        dur = (time.perf_counter() - self._t0) * 1000
+        cpu, child_cpu, rss = _usage()
+        metrics.observe(
+            self.name,
+            dur,
+            error=exc is not None,
+            cpu_ms=(cpu - self._cpu0) * 1000,
+            child_cpu_ms=(child_cpu - self._child_cpu0) * 1000,
+            max_rss_kb=rss,
+            counters=self._counters,
+        )
         logger = log.exception if exc else log.info
-        logger('END', dur_ms=dur_ms, status='error' if exc else 'success', exc_info=exc)
-        structlog.contextvars.unbind_contextvars(*self._span.keys())
+        logger(
+            'END',
+            dur_ms=int(dur),
+            status='error' if exc else 'success',
+            exc_info=exc,
+            **self._counters,
+        )
+        _unbind_contextvars(*self._span.keys())
+        _SPAN.reset(self._token)
+        if self._tracked:
+            _pop_active()
         return False  # re-raise exceptions
 
 
+class span(capture):
+    """
+    Low-overhead `capture` for high-frequency work (per file, per hunk, ...).
+    * Only duration and `record()` counters are kept, aggregated into `metrics`:
+      no per-call END record, no contextvars binding, no rusage syscalls.
+    * Every 1/`sample`-th call per span name (default `LOG_SPAN_SAMPLE`, 0 = never)
+      is promoted to a full `capture`, so individual calls stay traceable.
+    * `log_span_summary()` logs one aggregated record per span name instead.
+    """
+
+    def __init__(self, *, sample: float | None = None, **kv):
+        super().__init__(**kv)
+        self.sample = _SPAN_SAMPLE if sample is None else sample
+        _FAST_SPANS.add(self.name)
+
+    def _spawn(self, **extra):
+        return self.__class__(sample=self.sample, **extra, **self._kv)
+
+    def __enter__(self):
+        self._full = self.sample > 0 and _sampled(self.name, self.sample)
+        if self._full:
+            return super().__enter__()
+        self._counters = {}
+        self._token = _SPAN.set(self)
+        self._tracked = _push_active(self.name)
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._full:
+            return super().__exit__(exc_type, exc, tb)
+        dur = (time.perf_counter() - self._t0) * 1000
+        _SPAN.reset(self._token)
+        if self._tracked:
+            _pop_active()
+        metrics.observe(self.name, dur, error=exc is not None, counters=self._counters)
+        return False
+
+
+_FAST_SPANS: set[str] = set()
+_SAMPLE_SEQ: dict[str, int] = {}
+_SAMPLE_LOCK = threading.Lock()
+_SUMMARY_SEEN: dict[str, dict[str, Any]] = {}
+_SUMMARY_LOCK = threading.Lock()
+
+
+def _sampled(name: str, rate: float) -> bool:
+    with _SAMPLE_LOCK:
+        n = _SAMPLE_SEQ.get(name, 0)
+        _SAMPLE_SEQ[name] = n + 1
+    return n % max(1, round(1 / rate)) == 0
+
+
+def log_span_summary() -> None:
+    """
+    Log one SPAN_SUMMARY record per `span` name covering the calls made since the
+    previous summary: count, errors, total/avg duration and summed counters.
+    The aggregates are process-wide, so call it from the entry point (once per
+    run or batch), not per unit of work that may run concurrently with others.
+    """
+    with _SUMMARY_LOCK:
+        _log_span_summary()
+
+
+def _log_span_summary() -> None:
+    snap = metrics.summary()
+    for name in sorted(_FAST_SPANS):
+        st = snap.get(name)
+        if st is None:
+            continue
+        prev = _SUMMARY_SEEN.get(name)
+        # first summary for this span, or metrics were reset since the last one
+        if prev is None or prev['count'] > st['count']:
+            prev = {'count': 0, 'errors': 0, 'dur_ms_sum': 0.0, 'counters': {}}
+        count = st['count'] - prev['count']
+        if count <= 0:
+            continue
+        dur_ms_sum = st['dur_ms_sum'] - prev['dur_ms_sum']
+        counters = {
+            k: v - prev['counters'].get(k, 0)
+            for k, v in st['counters'].items()
+            if v != prev['counters'].get(k, 0)
+        }
+        log.info(
+            'SPAN_SUMMARY',
+            span=name,
+            count=count,
+            errors=st['errors'] - prev['errors'],
+            dur_ms_sum=round(dur_ms_sum, 3),
+            dur_ms_avg=round(dur_ms_sum / count, 3),
+            **counters,
+        )
+        _SUMMARY_SEEN[name] = st
+
+
+def _new_proc_tag() -> None:
+    global _PROC_TAG, _SPAN_SEQ
+    _PROC_TAG = os.urandom(4).hex()
+    _SPAN_SEQ = itertools.count(1)
+
+
+_PROC_TAG = ''
+_SPAN_SEQ = itertools.count(1)
+_new_proc_tag()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_new_proc_tag)
+
+
+def _next_span_id() -> str:
+    """Monotonic per-process span id; far cheaper than uuid4 and still unique across forks."""
+    return f'{_PROC_TAG}-{next(_SPAN_SEQ):x}'
+
+
+def _bind_contextvars(**kv: Any) -> None:
+    # Spans can open on several threads before anything has logged; importing
+    # structlog concurrently can trip over its partially initialised modules,
+    # so let configure() import it once under its lock.
+    configure()
+    from structlog.contextvars import bind_contextvars
+
+    bind_contextvars(**kv)
+
+
+def _unbind_contextvars(*keys: str) -> None:
+    from structlog.contextvars import unbind_contextvars
+
+    unbind_contextvars(*keys)
+
+
+def _span_name(kv: dict[str, Any]) -> str:
+    for key, value in kv.items():
+        return f'{key}={value}'
+    return 'span'
+
+
 # ---------------------------------------------------------------- optional async helper
 def ctx_task(coro):
     """
     Schedule an asyncio Task that inherits the *current* ContextVars snapshot.
     Use instead of `asyncio.create_task` to avoid the “spawn-before-bind” foot-gun.
     """
+    import asyncio
+
     ctx = contextvars.copy_context()
     return asyncio.create_task(ctx.run(coro))
@@ -1,17 +1,53 @@
-from typing import Any, Callable, Coroutine
+from typing import Any, Callable, Coroutine, Literal, TypeVar
 
 from structlog.typing import FilteringBoundLogger
 
+_F = TypeVar('_F', bound=Callable[..., Any])
+
 log: FilteringBoundLogger
 
+class Metrics:
+    def observe(
+        self,
+        name: str,
+        dur_ms: float,
+        *,
+        error: bool = ...,
+        cpu_ms: float = ...,
+        child_cpu_ms: float = ...,
+        max_rss_kb: int = ...,
+        counters: dict[str, float] | None = ...,
+    ) -> None: ...
+    def summary(self) -> dict[str, dict[str, Any]]: ...
+    def prometheus(self, prefix: str = ...) -> str: ...
+    def reset(self) -> None: ...
+
+metrics: Metrics
+
+def record(**counters: float) -> None: ...
+def track_spans(enabled: bool) -> None: ...
+def spans_tracked() -> bool: ...
+def active_spans() -> dict[int, tuple[str, ...]]: ...
+def carry_spans(fn: _F) -> _F: ...
+def write_metrics(
+    json_path: str | None = None, prom_path: str | None = None
+) -> None: ...
+def configure(force: bool = False) -> None: ...
 def new_context(**kv: object) -> str: ...
 
 class capture:
+    name: str
     def __init__(self, **kv: object) -> None: ...
     def __call__(self, fn: Callable[..., object]) -> Callable[..., object]: ...
     def __enter__(self) -> 'capture': ...
     def __exit__(
         self, exc_type: type | None, exc: BaseException | None, tb: object
-    ) -> bool: ...
+    ) -> Literal[False]: ...
+
+class span(capture):
+    sample: float
+    def __init__(self, *, sample: float | None = None, **kv: object) -> None: ...
+    def __enter__(self) -> 'span': ...
 
+def log_span_summary() -> None: ...
 def ctx_task(coro: Coroutine[Any, Any, Any]) -> None: ...
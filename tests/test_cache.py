@@ -0,0 +1,68 @@
+"""Tests for the per-run file cache."""
+
+from ai_pr_review.cache import FileCache
+from ai_pr_review.context import process_pr_context
+
+
+def test_text_and_tree_are_cached(tmp_path):
+    (tmp_path / 'a.py').write_text('def f():\n    return 1\n')
+    cache = FileCache(str(tmp_path))
+
+    assert cache.text('a.py') == 'def f():\n    return 1\n'
+    assert cache.text('a.py') is cache.text('a.py')
+    tree = cache.python_tree('a.py')
+    assert tree is not None
+    assert cache.python_tree('a.py') is tree
+
+    stats = cache.stats()
+    assert stats['text_misses'] == 1
+    assert stats['text_hits'] == 3
+    assert stats['tree_misses'] == 1
+    assert stats['tree_hits'] == 1
+    assert stats['text_hit_rate'] == 0.75
+
+
+def test_lru_evicts_by_bytes(tmp_path):
+    for name in 'abc':
+        (tmp_path / name).write_text(name * 40)
+    cache = FileCache(str(tmp_path), max_bytes=100)
+
+    cache.text('a')
+    cache.text('b')
+    cache.text('a')  # refresh a, so b is now least recently used
+    cache.text('c')
+
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['bytes'] == 80
+    cache.text('a')
+    assert cache.stats()['text_misses'] == 3
+
+
+def test_missing_binary_and_escaping_paths(tmp_path):
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    (repo / 'bin').write_bytes(b'\0\1')
+    (tmp_path / 'secret').write_text('nope')
+    cache = FileCache(str(repo))
+
+    assert cache.text('missing.py') is None
+    assert cache.text('bin') is None
+    assert cache.text('../secret') is None
+    assert cache.python_tree('missing.py') is None
+
+
+def test_process_pr_context_reuses_cached_reads():
+    diff_text = (
+        'diff --git a/src/whatthepatch/patch.py b/src/whatthepatch/patch.py\n'
+        'index 0000000..1111111 100644\n'
+        '--- a/src/whatthepatch/patch.py\n'
+        '+++ b/src/whatthepatch/patch.py\n'
+        '@@ -30,1 +30,2 @@\n'
+        '+# touched\n'
+    )
+    cache = FileCache('vendor/whatthepatch')
+
+    process_pr_context('vendor/whatthepatch', diff_text, file_cache=cache)
+
+    assert cache.stats()['text_hits'] > 0
+    assert cache.stats()['tree_misses'] == 1
@@ -0,0 +1,89 @@
+"""Tests for persisted review stage checkpoints."""
+
+import os
+import stat
+
+import pytest
+
+from ai_pr_review.checkpoint import ReviewCheckpoint, default_checkpoint_dir
+from ai_pr_review.errors import ConfigurationError
+
+
+def test_checkpoint_round_trip_and_resume(tmp_path):
+    checkpoint = ReviewCheckpoint(str(tmp_path), 'o', 'r', 5)
+    checkpoint.start('sha1', 'diff', resume=False)
+    checkpoint.save('context.txt', 'ctx')
+    checkpoint.save_json('triage.json', ['full', 'code'])
+    checkpoint.chunks['abc'] = 'chunk review'
+
+    again = ReviewCheckpoint(str(tmp_path), 'o', 'r', 5)
+    again.start('sha1', 'diff', resume=True)
+
+    assert again.load('context.txt') == 'ctx'
+    assert again.load_json('triage.json') == ['full', 'code']
+    assert dict(again.chunks) == {'abc': 'chunk review'}
+    assert again.load('review.md') is None
+    assert again.resumed == ['context.txt', 'triage.json']
+
+
+def test_checkpoint_discarded_without_resume_or_on_new_diff(tmp_path):
+    checkpoint = ReviewCheckpoint(str(tmp_path), 'o', 'r', 5)
+    checkpoint.start('sha1', 'diff', resume=False)
+    checkpoint.save('context.txt', 'ctx')
+
+    checkpoint.start('sha1', 'diff', resume=False)
+    assert checkpoint.load('context.txt') is None
+
+    checkpoint.save('context.txt', 'ctx')
+    checkpoint.start('sha1', 'rebased diff', resume=True)
+    assert checkpoint.load('context.txt') is None
+
+
+def test_checkpoint_prunes_older_heads(tmp_path):
+    checkpoint = ReviewCheckpoint(str(tmp_path), 'o', 'r', 5)
+    checkpoint.start('sha1', 'diff', resume=False)
+    checkpoint.start('sha2', 'diff 2', resume=True)
+
+    assert sorted(p.name for p in (tmp_path / 'o' / 'r' / '5').iterdir()) == ['sha2']
+
+    checkpoint.clear()
+    assert not (tmp_path / 'o' / 'r' / '5').exists()
+
+
+def test_checkpoint_root_is_private(tmp_path):
+    root = tmp_path / 'checkpoints'
+    checkpoint = ReviewCheckpoint(str(root), 'o', 'r', 5)
+    checkpoint.start('sha1', 'diff', resume=False)
+    assert stat.S_IMODE(os.stat(root).st_mode) == 0o700
+
+
+def test_checkpoint_refuses_shared_root(tmp_path, monkeypatch):
+    root = tmp_path / 'checkpoints'
+    root.mkdir(mode=0o755)
+    os.chmod(root, 0o755)
+    checkpoint = ReviewCheckpoint(str(root), 'o', 'r', 5)
+    with pytest.raises(ConfigurationError, match='chmod 700'):
+        checkpoint.start('sha1', 'diff', resume=False)
+
+    os.chmod(root, 0o700)
+    monkeypatch.setattr(os, 'getuid', lambda: os.stat(root).st_uid + 1)
+    with pytest.raises(ConfigurationError, match='owned by another user'):
+        checkpoint.start('sha1', 'diff', resume=False)
+    assert not (root / 'o').exists()
+
+
+def test_default_checkpoint_dir_is_per_user(tmp_path, monkeypatch):
+    monkeypatch.delenv('AI_PR_REVIEW_CHECKPOINT_DIR', raising=False)
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    assert default_checkpoint_dir() == str(
+        tmp_path / 'cache' / 'ai-pr-review' / 'checkpoints'
+    )
+
+    monkeypatch.delenv('XDG_CACHE_HOME')
+    monkeypatch.setenv('HOME', str(tmp_path / 'home'))
+    assert default_checkpoint_dir() == str(
+        tmp_path / 'home' / '.cache' / 'ai-pr-review' / 'checkpoints'
+    )
+
+    monkeypatch.setenv('AI_PR_REVIEW_CHECKPOINT_DIR', str(tmp_path / 'mine'))
+    assert default_checkpoint_dir() == str(tmp_path / 'mine')
@@ -1,10 +1,14 @@
+import time
+
 from ai_pr_review.cli import main as cli_main
 
 
-def test_cli_parses_model(monkeypatch):
+def test_cli_parses_model(monkeypatch, tmp_path):
     calls = {}
+    monkeypatch.setenv('AI_PR_REVIEW_CHECKPOINT_DIR', str(tmp_path))
 
-    def fake_review_pr(owner, name, pr_number, keep_temp, model):
+    def fake_review_pr(owner, name, pr_number, keep_temp, model, **options):
+        calls.update(options)
         calls['owner'] = owner
         calls['name'] = name
         calls['pr_number'] = pr_number
@@ -16,3 +20,78 @@ def test_cli_parses_model(monkeypatch):
     cli_main(['o', 'r', '1', '--model', 'test-model'])
 
     assert calls['model'] == 'test-model'
+    assert calls['publish'] is False
+    assert calls['checkpoint_dir'] == str(tmp_path)
+    assert calls['resume'] is False
+
+
+def test_cli_force_clears_checkpoints(monkeypatch, tmp_path):
+    monkeypatch.setenv('AI_PR_REVIEW_CHECKPOINT_DIR', str(tmp_path))
+    stale = tmp_path / 'o' / 'r' / '1' / 'sha' / 'context.txt'
+    stale.parent.mkdir(parents=True)
+    stale.write_text('old')
+    seen = {}
+
+    def fake_review_pr(*_args, **options):
+        seen.update(options)
+        return 'ok'
+
+    monkeypatch.setattr('ai_pr_review.cli.review_pr', fake_review_pr)
+    cli_main(['o', 'r', '1', '--force'])
+
+    assert not stale.exists()
+    assert seen['resume'] is False
+
+
+def test_batch_main_reads_refs(monkeypatch, tmp_path, capsys):
+    from ai_pr_review.cli import batch_main
+    from ai_pr_review.scheduler import SMALL_PR_COST, ReviewJob
+
+    seen = {}
+
+    def fake_review_batch(refs, **kwargs):
+        seen['refs'] = list(refs)
+        seen.update(kwargs)
+        job = ReviewJob('o', 'r', 1, review='looks good')
+        job.started = job.submitted
+        kwargs['on_done'](job)
+        return [job]
+
+    monkeypatch.setattr('ai_pr_review.scheduler.review_batch', fake_review_batch)
+    prs = tmp_path / 'prs.txt'
+    prs.write_text('# queue\no/r#1\n\nbad line\nx y 2\n')
+    batch_main([str(prs), '--workers', '3', '--per-repo', '2', '--post'])
+
+    out, err = capsys.readouterr()
+    assert seen['refs'] == [('o', 'r', 1), ('x', 'y', 2)]
+    assert seen['workers'] == 3
+    assert seen['per_repo_limit'] == 2
+    assert seen['publish'] is True
+    assert seen['small_cost'] == SMALL_PR_COST
+    assert 'looks good' in out
+    assert 'invalid pull request reference' in err
+    assert 'small: 1 PRs, 0 failed' in err
+
+    # Zero is a valid threshold, not a request for the default.
+    batch_main([str(prs), '--small-cost', '0'])
+    assert seen['small_cost'] == 0
+
+
+def test_cli_profile_writes_stacks_and_hotspots(monkeypatch, tmp_path, capsys):
+    from logkit import capture
+
+    monkeypatch.setenv('AI_PR_REVIEW_CHECKPOINT_DIR', str(tmp_path))
+
+    def fake_review_pr(*_args, **_options):
+        with capture(stage='context'):
+            time.sleep(0.05)
+        return 'ok'
+
+    monkeypatch.setattr('ai_pr_review.cli.review_pr', fake_review_pr)
+    out = tmp_path / 'profile.txt'
+    cli_main(['o', 'r', '1', '--profile', str(out), '--profile-top', '3'])
+
+    assert 'cli=run;stage=context;' in out.read_text()
+    err = capsys.readouterr().err
+    assert f'--- Profile ({out}) ---' in err
+    assert 'stage=context: ' in err
@@ -5,6 +5,8 @@ from unittest.mock import MagicMock
 import pytest
 
 from ai_pr_review.context import _safe_parent_context, process_pr_context
+from ai_pr_review.profiling import SamplingProfiler
+from logkit import capture
 
 
 @pytest.mark.parametrize(
@@ -47,3 +49,43 @@ def test_process_pr_context_integration():
     result = process_pr_context('vendor/whatthepatch', diff_text)
     assert 'VERSION = "0.0.0"' in result
     assert diff_text.splitlines()[0] in result
+
+
+FILES = ['__init__.py', 'apply.py', 'exceptions.py', 'snippets.py']
+DIFF = ''.join(
+    f'diff --git a/src/whatthepatch/{name} b/src/whatthepatch/{name}\n'
+    'index 0000000..1111111 100644\n'
+    f'--- a/src/whatthepatch/{name}\n'
+    f'+++ b/src/whatthepatch/{name}\n'
+    '@@ -1,1 +1,2 @@\n'
+    '+# touched\n'
+    for name in FILES
+)
+
+
+def test_process_pr_context_pool_matches_sequential(monkeypatch):
+    files, diff_text = FILES, DIFF
+    sequential = process_pr_context('vendor/whatthepatch', diff_text, max_workers=1)
+    monkeypatch.setattr('ai_pr_review.context.PARALLEL_MIN_FILES', 1)
+    pooled = process_pr_context('vendor/whatthepatch', diff_text, max_workers=2)
+
+    assert pooled == sequential
+    positions = [sequential.index(f'## src/whatthepatch/{name}') for name in files]
+    assert positions == sorted(positions)
+
+
+def test_process_pr_context_stays_in_process_under_profiler(monkeypatch):
+    def no_pool(*_args, **_kwargs):
+        raise AssertionError('worker processes are not sampled')
+
+    monkeypatch.setattr('ai_pr_review.context.PARALLEL_MIN_FILES', 1)
+    monkeypatch.setattr('ai_pr_review.context.ProcessPoolExecutor', no_pool)
+    with SamplingProfiler(interval_s=0.002) as profiler:
+        with capture(stage='context'):
+            result = process_pr_context('vendor/whatthepatch', DIFF, max_workers=2)
+
+    assert all(f'## src/whatthepatch/{name}' in result for name in FILES)
+    assert any(
+        spans == ('stage=context', 'step=file_section')
+        for spans, _stack in profiler.samples
+    )
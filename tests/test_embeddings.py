@@ -0,0 +1,222 @@
+"""Tests for the local embedding index."""
+
+import os
+import subprocess
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from ai_pr_review.cache import FileCache  # noqa: E402
+from ai_pr_review.context import process_pr_context  # noqa: E402
+from ai_pr_review.embeddings import (  # noqa: E402
+    MAX_CHUNK_LINES,
+    EmbeddingIndex,
+    HashingEmbedder,
+    hunk_queries,
+    symbol_chunks,
+)
+from ai_pr_review.index import SymbolIndex  # noqa: E402
+
+DIFF = (
+    'diff --git a/pkg/orders.py b/pkg/orders.py\n'
+    'index 1111111..2222222 100644\n'
+    '--- a/pkg/orders.py\n'
+    '+++ b/pkg/orders.py\n'
+    '@@ -1,2 +1,2 @@\n'
+    ' def submit_order(order):\n'
+    '-    return charge_card(order)\n'
+    '+    return charge_card(order, retry=True)\n'
+)
+
+
+class CountingEmbedder(HashingEmbedder):
+    def __init__(self):
+        super().__init__(dim=64)
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(len(texts))
+        return super().__call__(texts)
+
+
+def _git(repo, *args):
+    subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True)
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    repo = tmp_path / 'repo'
+    pkg = repo / 'pkg'
+    pkg.mkdir(parents=True)
+    (pkg / 'orders.py').write_text(
+        'def submit_order(order):\n    return charge_card(order)\n'
+    )
+    (pkg / 'billing.py').write_text(
+        'def charge_card(order, retry=False):\n'
+        '    return order.card.charge(order.total)\n\n'
+        'def refund_card(order):\n'
+        '    return order.card.refund(order.total)\n'
+    )
+    (pkg / 'users.py').write_text(
+        'class UserProfile:\n    def display_name(self):\n        return self.name\n'
+    )
+    (repo / 'NOTES.txt').write_text('shipping notes\n')
+    _git(repo, 'init', '-q')
+    _git(repo, 'config', 'user.email', 'test@example.com')
+    _git(repo, 'config', 'user.name', 'Test')
+    _git(repo, 'add', '.')
+    _git(repo, 'commit', '-q', '-m', 'initial')
+    return repo
+
+
+def _index(repo, cache):
+    index = SymbolIndex.open(str(repo), str(cache))
+    index.refresh()
+    index.save()
+    return index
+
+
+def test_hashing_embedder_is_deterministic():
+    first = HashingEmbedder()(['charge_card(order)', ''])
+    second = HashingEmbedder()(['charge_card(order)', ''])
+    assert first.shape == (2, 256)
+    assert np.array_equal(first, second)
+    assert np.isclose(np.linalg.norm(first[0]), 1.0)
+    assert not first[1].any()
+
+
+def test_symbol_chunks():
+    spans = [
+        {'name': 'Big', 'type': 'class', 'start_line': 1, 'end_line': 200},
+        {'name': 'a', 'type': 'function', 'start_line': 2, 'end_line': 10},
+        {'name': 'inner', 'type': 'function', 'start_line': 3, 'end_line': 5},
+        {'name': 'b', 'type': 'function', 'start_line': 12, 'end_line': 20},
+    ]
+    text = 'class Big:\n' + 'x = 1\n' * 9 + '\n' + 'y = 2\n' * 189
+    assert symbol_chunks(spans, 200, text=text) == [
+        ('Big lines 1-1', 1, 1),
+        ('a', 2, 10),
+        ('b', 12, 20),
+        ('Big lines 21-100', 21, 100),
+        ('Big lines 101-180', 101, 180),
+        ('Big lines 181-200', 181, 200),
+    ]
+    # Module-level code between symbols is kept too.
+    top = [{'name': 'f', 'type': 'function', 'start_line': 3, 'end_line': 4}]
+    assert symbol_chunks(top, 6) == [
+        ('lines 1-2', 1, 2),
+        ('f', 3, 4),
+        ('lines 5-6', 5, 6),
+    ]
+    windows = symbol_chunks([], MAX_CHUNK_LINES + 5)
+    assert windows[-1] == (
+        f'lines {MAX_CHUNK_LINES + 1}-{MAX_CHUNK_LINES + 5}',
+        MAX_CHUNK_LINES + 1,
+        MAX_CHUNK_LINES + 5,
+    )
+
+
+def test_hunk_queries():
+    (query,) = hunk_queries(DIFF)
+    assert 'charge_card(order, retry=True)' in query
+    assert 'def submit_order(order):' in query
+
+
+def test_search_ranks_related_code(git_repo, tmp_path):
+    index = _index(git_repo, tmp_path / 'cache')
+    file_cache = FileCache(str(git_repo))
+    store = EmbeddingIndex.open(index, HashingEmbedder())
+    store.update(index, file_cache)
+
+    hits = store.search(hunk_queries(DIFF), file_cache, exclude=['pkg/orders.py'])
+    assert hits[0]['file'] == 'pkg/billing.py'
+    assert hits[0]['name'] == 'charge_card'
+    assert hits[0]['code'].startswith('def charge_card(order, retry=False):')
+    assert all(hit['file'] != 'pkg/orders.py' for hit in hits)
+    assert [h['score'] for h in hits] == sorted(
+        (h['score'] for h in hits), reverse=True
+    )
+
+    budgeted = store.search(hunk_queries(DIFF), file_cache, token_budget=20)
+    assert sum(len(h['code']) for h in budgeted) <= 80
+    assert store.search(hunk_queries(DIFF), file_cache, top_k=1)[0]['name'] == (
+        'submit_order'
+    )
+
+
+def test_index_is_persisted_and_updated_incrementally(git_repo, tmp_path):
+    cache = tmp_path / 'cache'
+    embedder = CountingEmbedder()
+    store = EmbeddingIndex.open(_index(git_repo, cache), embedder)
+    store.update(_index(git_repo, cache), FileCache(str(git_repo)))
+    store.save()
+    # orders, billing x2, users, NOTES.txt window
+    assert embedder.calls == [5]
+
+    (git_repo / 'pkg' / 'users.py').write_text('def greet(user):\n    return 1\n')
+    _git(git_repo, 'commit', '-q', '-am', 'change users')
+    index = _index(git_repo, cache)
+    store = EmbeddingIndex.open(index, embedder)
+    assert store.vectors.shape == (5, 64)
+    store.update(index, FileCache(str(git_repo)))
+    assert embedder.calls == [5, 1]
+    assert store.embedded == 1
+
+    hits = store.search(['greet user'], FileCache(str(git_repo)))
+    assert hits[0]['name'] == 'greet'
+
+    # A different embedder does not reuse incompatible vectors.
+    assert EmbeddingIndex.open(index, HashingEmbedder()).blobs == {}
+
+
+def test_index_is_one_file_and_checked_on_load(git_repo, tmp_path):
+    cache = tmp_path / 'cache'
+    index = _index(git_repo, cache)
+    store = EmbeddingIndex.open(index, HashingEmbedder())
+    store.update(index, FileCache(str(git_repo)))
+    store.save()
+    assert sorted(p.name for p in cache.rglob('*.embed.*')) == [
+        os.path.basename(store.path)
+    ]
+    assert EmbeddingIndex.open(index, HashingEmbedder()).vectors.shape == (5, 256)
+
+    # Row offsets that do not match the vectors are not trusted.
+    store.vectors = store.vectors[:3]
+    store.save()
+    reopened = EmbeddingIndex.open(index, HashingEmbedder())
+    assert reopened.blobs == {}
+    assert reopened.vectors.size == 0
+
+    with open(store.path, 'wb') as fh:
+        fh.write(b'not an archive')
+    assert EmbeddingIndex.open(index, HashingEmbedder()).blobs == {}
+
+
+def test_process_pr_context_adds_related_code(git_repo, tmp_path):
+    result = process_pr_context(
+        str(git_repo),
+        DIFF,
+        index_dir=str(tmp_path / 'cache'),
+        embedder=HashingEmbedder(),
+    )
+    assert '## Semantically related code' in result
+    assert '# pkg/billing.py:1-2 charge_card (similarity' in result
+
+    plain = process_pr_context(str(git_repo), DIFF, index_dir=str(tmp_path / 'c2'))
+    assert 'Semantically related code' not in plain
+
+
+def test_process_pr_context_survives_search_errors(git_repo, tmp_path, monkeypatch):
+    def broken_search(self, *args, **kwargs):
+        raise ValueError('shapes not aligned')
+
+    monkeypatch.setattr(EmbeddingIndex, 'search', broken_search)
+    result = process_pr_context(
+        str(git_repo),
+        DIFF,
+        index_dir=str(tmp_path / 'cache'),
+        embedder=HashingEmbedder(),
+    )
+    assert 'Semantically related code' not in result
+    assert 'submit_order' in result
@@ -0,0 +1,127 @@
+"""Tests for generated and vendored file filtering."""
+
+from ai_pr_review.filters import (
+    MAX_LINE_LENGTH,
+    FileFilter,
+    SkippedFile,
+    filter_diff,
+    path_matches,
+    read_gitattributes,
+    skipped_summary,
+    split_diff,
+)
+from ai_pr_review.patchset import parse_patchset
+from ai_pr_review.triage import triage_patchset
+
+
+def _diff(path, *added):
+    return (
+        f'diff --git a/{path} b/{path}\n'
+        'index 1111111..2222222 100644\n'
+        f'--- a/{path}\n'
+        f'+++ b/{path}\n'
+        f'@@ -1,1 +1,{len(added)} @@\n'
+        '-old\n' + ''.join(f'+{line}\n' for line in added)
+    )
+
+
+BINARY = (
+    'diff --git a/logo.png b/logo.png\n'
+    'new file mode 100644\n'
+    'index 0000000..3333333\n'
+    'Binary files /dev/null and b/logo.png differ\n'
+)
+
+
+def test_path_matches():
+    assert path_matches('yarn.lock', 'web/yarn.lock')
+    assert path_matches('*.min.js', 'static/js/app.min.js')
+    assert path_matches('vendor/', 'pkg/vendor/lib/a.go')
+    assert not path_matches('vendor/', 'vendor.py')
+    assert path_matches('/docs/api/*.md', 'docs/api/x.md')
+    assert path_matches('**/gen/*.py', 'gen/a.py')
+    assert not path_matches('docs/*.md', 'src/docs/x.md')
+
+
+def test_split_diff():
+    preamble, files = split_diff('From abc\n\n' + _diff('a.py', 'x', 'y') + BINARY)
+    assert preamble == 'From abc\n\n'
+    assert [(f.path, f.added, f.removed, f.binary) for f in files] == [
+        ('a.py', 2, 1, False),
+        ('logo.png', 0, 0, True),
+    ]
+    assert split_diff('--- a\n+++ b\n')[1] == []
+
+
+def test_filter_diff_keeps_code_and_summarises_the_rest():
+    diff_text = (
+        _diff('src/app.py', 'x = 1')
+        + _diff('package-lock.json', *['"dep": 1'] * 500)
+        + _diff('static/bundle.js', 'a' * 5000)
+        + _diff('third_party/lib/util.c', 'int x;')
+        + BINARY
+    )
+    filtered = filter_diff(diff_text, FileFilter())
+
+    assert filtered.text == _diff('src/app.py', 'x = 1')
+    assert [p.path for p in parse_patchset(filtered.text)] == ['src/app.py']
+    assert filtered.skipped == [
+        SkippedFile('package-lock.json', 'lockfile', 500, 1),
+        SkippedFile('static/bundle.js', 'minified', 1, 1),
+        SkippedFile('third_party/lib/util.c', 'vendored', 1, 1),
+        SkippedFile('logo.png', 'binary', 0, 0),
+    ]
+    assert skipped_summary(filtered.skipped).splitlines()[:2] == [
+        '## Skipped files (not reviewed)',
+        'package-lock.json: lockfile, +500 -1 lines',
+    ]
+    unchanged = _diff('src/app.py', 'x = 1')
+    assert filter_diff(unchanged, FileFilter()) == (unchanged, [])
+
+
+def test_configured_globs_and_size_limit(monkeypatch):
+    monkeypatch.setenv('AI_PR_REVIEW_SKIP_GLOBS', 'migrations/, *.sql')
+    file_filter = FileFilter.from_env()
+    assert file_filter.path_reason('app/migrations/0001_init.py') == 'configured'
+    assert file_filter.path_reason('schema.sql') == 'configured'
+
+    small = FileFilter(max_diff_bytes=100)
+    skipped = filter_diff(_diff('big.py', *['x = 1'] * 50), small).skipped
+    assert skipped[0].reason == 'oversized'
+
+
+def test_gitattributes(tmp_path):
+    (tmp_path / '.gitattributes').write_text(
+        '# generated code\n'
+        'api/client/** linguist-generated=true\n'
+        'lib/vendor/ours/** -linguist-vendored\n'
+        '*.txt text\n'
+    )
+    rules = read_gitattributes(str(tmp_path))
+    assert rules == {'api/client/**': True, 'lib/vendor/ours/**': False}
+
+    file_filter = FileFilter.from_env(str(tmp_path))
+    assert file_filter.path_reason('api/client/models.py') == (
+        'generated (gitattributes)'
+    )
+    assert file_filter.path_reason('lib/vendor/ours/x.py') is None
+    assert file_filter.path_reason('vendor/theirs/x.py') == 'vendored'
+    assert read_gitattributes(str(tmp_path / 'missing')) == {}
+
+
+def test_triage_ignores_lockfile_churn_for_tiny_changes():
+    triage = triage_patchset(
+        _diff('src/app.py', 'x = 1') + _diff('uv.lock', *['x'] * 400)
+    )
+    assert (triage.path, triage.reason) == ('diff_only', 'tiny')
+
+
+def test_triage_uses_configured_filter(monkeypatch):
+    minified = _diff('static/bundle.js', 'x' * (MAX_LINE_LENGTH + 1))
+    assert triage_patchset(minified).reason == 'generated-only'
+
+    monkeypatch.setenv('AI_PR_REVIEW_SKIP_GLOBS', 'gen/*')
+    generated = _diff('gen/models.py', *['x = 1'] * 100)
+    triage = triage_patchset(generated + _diff('src/app.py', 'x = 1'))
+    assert (triage.path, triage.reason) == ('diff_only', 'tiny')
+    assert triage.kinds == {'generated': 1, 'code': 1}
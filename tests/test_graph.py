@@ -0,0 +1,151 @@
+"""Tests for the persisted import graph."""
+
+import subprocess
+
+import pytest
+
+from ai_pr_review.context import process_pr_context
+from ai_pr_review.graph import ImportGraph, ModuleResolver, dependents_context
+from ai_pr_review.index import SymbolIndex
+
+
+def _git(repo, *args):
+    subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True)
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    repo = tmp_path / 'repo'
+    pkg = repo / 'pkg'
+    pkg.mkdir(parents=True)
+    (pkg / '__init__.py').write_text('')
+    (pkg / 'core.py').write_text('def run():\n    return 1\n')
+    (pkg / 'api.py').write_text(
+        'from .core import run\n\ndef serve():\n    return run()\n'
+    )
+    (pkg / 'other.py').write_text('import pkg.core\n\nVALUE = 1\n')
+    (pkg / 'cli.py').write_text('from pkg import api\n\ndef main():\n    api.serve()\n')
+    (repo / 'unrelated.py').write_text('def run():\n    return 2\n\nrun()\n')
+    _git(repo, 'init', '-q')
+    _git(repo, 'config', 'user.email', 'test@example.com')
+    _git(repo, 'config', 'user.name', 'Test')
+    _git(repo, 'add', '.')
+    _git(repo, 'commit', '-q', '-m', 'initial')
+    return repo
+
+
+def _index(repo, cache):
+    index = SymbolIndex.open(str(repo), str(cache))
+    index.refresh()
+    index.save()
+    return index
+
+
+def _graph(index):
+    graph = ImportGraph.open(index)
+    graph.update(index)
+    graph.save()
+    return graph
+
+
+def test_module_resolver():
+    resolver = ModuleResolver(['src/pkg/__init__.py', 'src/pkg/a.py', 'src/pkg/b.py'])
+    assert resolver.resolve('src/pkg/a.py', '.b') == 'src/pkg/b.py'
+    assert resolver.resolve('src/pkg/a.py', 'pkg.b.helper') == 'src/pkg/b.py'
+    assert resolver.resolve('src/pkg/a.py', 'os') is None
+    assert resolver.resolve_all('src/pkg/a.py', ['os', '.b', '.a']) == ['src/pkg/b.py']
+
+
+def test_dependents_ranked_by_distance(git_repo, tmp_path):
+    index = _index(git_repo, tmp_path / 'cache')
+    graph = _graph(index)
+
+    assert graph.imported_by['pkg/core.py'] == ['pkg/api.py', 'pkg/other.py']
+    deps = graph.dependents(['pkg/core.py'], symbols=['run'], index=index)
+    assert [(d['file'], d['distance'], d['via']) for d in deps] == [
+        ('pkg/api.py', 1, 'pkg/core.py'),
+        ('pkg/other.py', 1, 'pkg/core.py'),
+        ('pkg/cli.py', 2, 'pkg/api.py'),
+    ]
+    assert deps[0]['mentions'] == ['run']
+    assert graph.dependents(['pkg/core.py'], max_depth=1, limit=1)[0]['file'] == (
+        'pkg/api.py'
+    )
+    assert dependents_context(deps).splitlines()[:2] == [
+        '## Dependents of changed files',
+        'pkg/api.py (distance 1, imports pkg/core.py; uses run)',
+    ]
+
+
+def test_graph_updates_incrementally(git_repo, tmp_path):
+    cache = tmp_path / 'cache'
+    graph = _graph(_index(git_repo, cache))
+    assert graph.updated == 6
+
+    reopened = _graph(_index(git_repo, cache))
+    assert reopened.updated == 0
+    assert reopened.imported_by == graph.imported_by
+
+    (git_repo / 'pkg' / 'other.py').write_text('VALUE = 1\n')
+    _git(git_repo, 'commit', '-q', '-am', 'drop import')
+    graph = _graph(_index(git_repo, cache))
+    assert graph.updated == 1
+    assert graph.imported_by['pkg/core.py'] == ['pkg/api.py']
+    assert 'pkg/other.py' not in graph.imports
+
+    (git_repo / 'pkg' / 'api.py').unlink()
+    _git(git_repo, 'commit', '-q', '-am', 'remove api')
+    graph = _graph(_index(git_repo, cache))
+    assert 'pkg/core.py' not in graph.imported_by
+    assert graph.dependents(['pkg/core.py']) == []
+
+
+def test_process_pr_context_scans_dependents_only(git_repo, tmp_path):
+    diff_text = (
+        'diff --git a/pkg/core.py b/pkg/core.py\n'
+        'index 1111111..2222222 100644\n'
+        '--- a/pkg/core.py\n'
+        '+++ b/pkg/core.py\n'
+        '@@ -1,2 +1,2 @@\n'
+        ' def run():\n'
+        '-    return 0\n'
+        '+    return 1\n'
+    )
+    result = process_pr_context(
+        str(git_repo), diff_text, index_dir=str(tmp_path / 'cache')
+    )
+
+    assert 'pkg/api.py (distance 1, imports pkg/core.py; uses run)' in result
+    assert 'Usage of `run` at pkg/api.py:4' in result
+    # Same name, but the module does not import pkg.core.
+    assert 'unrelated.py' not in result
+
+
+def test_usage_scan_covers_far_importers(git_repo, tmp_path):
+    # A chain pkg/core.py <- pkg/api.py <- pkg/cli.py <- pkg/far.py.
+    (git_repo / 'pkg' / 'far.py').write_text(
+        'from pkg import cli\n\ndef run_far():\n    return cli.main() or run\n'
+    )
+    _git(git_repo, 'add', '.')
+    _git(git_repo, 'commit', '-q', '-m', 'far importer')
+    index = _index(git_repo, tmp_path / 'cache')
+    graph = _graph(index)
+
+    deps = graph.dependents(['pkg/core.py'], max_depth=None, limit=None)
+    assert ('pkg/far.py', 3) in [(d['file'], d['distance']) for d in deps]
+    assert 'pkg/far.py' not in dependents_context(deps)
+
+    diff_text = (
+        'diff --git a/pkg/core.py b/pkg/core.py\n'
+        'index 1111111..2222222 100644\n'
+        '--- a/pkg/core.py\n'
+        '+++ b/pkg/core.py\n'
+        '@@ -1,2 +1,2 @@\n'
+        ' def run():\n'
+        '-    return 0\n'
+        '+    return 1\n'
+    )
+    result = process_pr_context(
+        str(git_repo), diff_text, index_dir=str(tmp_path / 'cache')
+    )
+    assert 'Usage of `run` at pkg/far.py:4' in result
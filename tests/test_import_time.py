@@ -0,0 +1,71 @@
+"""Import-time gate: the CLI must start without loading the heavy stages."""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / 'src'
+HEAVY_MODULES = {'openai', 'kit', 'requests', 'whatthepatch', 'structlog'}
+# Generous ceiling so slow CI machines do not flake; the real number is ~50ms.
+CLI_IMPORT_BUDGET_US = 500_000
+
+
+def _run(args, cwd):
+    env = {**os.environ, 'PYTHONPATH': str(SRC)}
+    return subprocess.run(
+        [sys.executable, *args], cwd=cwd, env=env, capture_output=True, text=True
+    )
+
+
+def _importtime(stderr):
+    """Map module name -> cumulative import time in microseconds."""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _self_us, cumulative, name = line[len('import time:') :].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_cli_import_is_lazy(tmp_path):
+    result = _run(['-X', 'importtime', '-c', 'import ai_pr_review.cli'], tmp_path)
+    assert result.returncode == 0, result.stderr
+
+    times = _importtime(result.stderr)
+    loaded = {name.split('.')[0] for name in times}
+    assert not HEAVY_MODULES & loaded
+    assert times['ai_pr_review.cli'] < CLI_IMPORT_BUDGET_US
+    assert not (tmp_path / 'run.log').exists()
+
+
+def test_help_does_not_configure_logging(tmp_path):
+    result = _run(['-m', 'ai_pr_review', '--help'], tmp_path)
+
+    assert result.returncode == 0
+    assert 'repo_owner' in result.stdout
+    assert not (tmp_path / 'run.log').exists()
+
+
+FAST_PATH_REVIEW = """
+import sys
+from ai_pr_review.review import review_pr
+
+diff = 'diff --git a/README.md b/README.md\\n--- a/README.md\\n+++ b/README.md\\n'
+review_pr(
+    'o',
+    'r',
+    1,
+    fetch_pr_data_func=lambda *_: (diff + '@@ -1,0 +1 @@\\n+docs\\n', 's', 't', 'd'),
+    review_with_llm_func=lambda *_a, **_kw: 'ok',
+)
+print('kit' in sys.modules)
+"""
+
+
+def test_fast_path_review_does_not_import_kit(tmp_path):
+    result = _run(['-c', FAST_PATH_REVIEW], tmp_path)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'False'
@@ -0,0 +1,103 @@
+"""Tests for the persistent symbol index."""
+
+import subprocess
+
+import pytest
+
+from ai_pr_review.context import process_pr_context
+from ai_pr_review.errors import RepoError
+from ai_pr_review.index import SymbolIndex
+
+
+def _git(repo, *args):
+    subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True)
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    repo = tmp_path / 'repo'
+    repo.mkdir()
+    _git(repo, 'init', '-q')
+    _git(repo, 'config', 'user.email', 'test@example.com')
+    _git(repo, 'config', 'user.name', 'Test')
+    (repo / 'a.py').write_text(
+        'class A:\n    def run(self):\n        return helper()\n'
+    )
+    (repo / 'b.py').write_text('def helper():\n    return 1\n')
+    _git(repo, 'add', '.')
+    _git(repo, 'commit', '-q', '-m', 'initial')
+    return repo
+
+
+def test_refresh_reuses_unchanged_blobs(git_repo, tmp_path):
+    cache = tmp_path / 'cache'
+    index = SymbolIndex.open(str(git_repo), str(cache))
+    index.refresh()
+    index.save()
+    assert (index.parsed, index.reused) == (2, 0)
+
+    (git_repo / 'b.py').write_text('def helper():\n    return 2\n')
+    _git(git_repo, 'commit', '-q', '-am', 'change b')
+
+    warm = SymbolIndex.open(str(git_repo), str(cache))
+    warm.refresh()
+    assert (warm.parsed, warm.reused) == (1, 1)
+
+
+def test_enclosing_symbol_and_candidates(git_repo, tmp_path):
+    index = SymbolIndex.open(str(git_repo), str(tmp_path / 'cache'))
+    index.refresh()
+
+    ctx = index.enclosing_symbol('a.py', 3)
+    assert ctx is not None
+    assert ctx['name'] == 'run'
+    assert ctx['code'].startswith('    def run(self):')
+    assert index.enclosing_symbol('missing.py', 1) is None
+    assert index.candidate_files(['helper']) == ['a.py', 'b.py']
+    assert index.candidate_files(['A']) == ['a.py']
+
+
+def test_refresh_outside_git_raises(tmp_path):
+    index = SymbolIndex.open(str(tmp_path), str(tmp_path / 'cache'))
+    with pytest.raises(RepoError):
+        index.refresh()
+
+
+def test_process_pr_context_uses_index(git_repo, tmp_path):
+    diff_text = (
+        'diff --git a/a.py b/a.py\n'
+        'index 1111111..2222222 100644\n'
+        '--- a/a.py\n'
+        '+++ b/a.py\n'
+        '@@ -2,2 +2,2 @@\n'
+        '     def run(self):\n'
+        '-        return helper(0)\n'
+        '+        return helper()\n'
+    )
+    result = process_pr_context(
+        str(git_repo), diff_text, index_dir=str(tmp_path / 'cache')
+    )
+    assert 'Usage of `run` at a.py:2' in result
+    assert list((tmp_path / 'cache').glob('*.json'))
+
+
+def test_process_pr_context_same_with_and_without_index(git_repo, tmp_path):
+    diff_text = (
+        'diff --git a/a.py b/a.py\n'
+        'index 1111111..2222222 100644\n'
+        '--- a/a.py\n'
+        '+++ b/a.py\n'
+        '@@ -2,2 +2,2 @@\n'
+        '     def run(self):\n'
+        '-        return helper(0)\n'
+        '+        return helper()\n'
+    )
+    without = process_pr_context(str(git_repo), diff_text)
+    with_index = process_pr_context(
+        str(git_repo), diff_text, index_dir=str(tmp_path / 'cache')
+    )
+    # The index only adds the architecture section; everything else matches.
+    sections = with_index.split('\n\n## ')
+    assert sections[1].startswith('Repository architecture')
+    assert '\n\n## '.join(sections[:1] + sections[2:]) == without
+    assert 'Usage of `run` at a.py:2' in without
@@ -6,11 +6,14 @@ import pytest
 from openai import OpenAI
 
 from ai_pr_review.llm import (
+    create_prompt_segments,
     create_review_prompts,
     generate_review,
     review_with_llm,
     setup_openai_client,
+    split_context,
 )
+from logkit import capture, metrics
 
 
 @pytest.fixture
@@ -104,13 +107,11 @@ def test_review_with_llm():
     """Test the complete LLM review workflow."""
     with (
         patch('ai_pr_review.llm.setup_openai_client') as mock_setup,
-        patch('ai_pr_review.llm.create_review_prompts') as mock_prompts,
         patch('ai_pr_review.llm.generate_review') as mock_generate,
     ):
         # Setup mocks
         mock_client = MagicMock()
         mock_setup.return_value = mock_client
-        mock_prompts.return_value = ('system prompt', 'user prompt')
         mock_generate.return_value = 'review content'
 
         # Test function
@@ -125,17 +126,128 @@ def test_review_with_llm():
             model='test-model',
             temperature=0.3,
             max_tokens=1500,
+            repo='o/r',
         )
 
         # Assertions
         mock_setup.assert_called_once()
-        mock_prompts.assert_called_once_with(pr_title, pr_description, context_blob)
+        system, prefix, suffix = create_prompt_segments(
+            pr_title, pr_description, context_blob, repo='o/r'
+        )
         mock_generate.assert_called_once_with(
             mock_client,
-            'system prompt',
-            'user prompt',
+            system,
+            suffix,
             model='test-model',
             temperature=0.3,
             max_tokens=1500,
+            user_prefix=prefix,
+            prompt_cache_key='ai-pr-review:o/r',
         )
         assert result == 'review content'
+
+
+def test_prompt_prefix_is_stable_across_prs():
+    first = create_prompt_segments('Title A', 'Body A', 'diff A', repo='o/r')
+    second = create_prompt_segments('Title B', 'Body B', 'diff B', repo='o/r')
+
+    assert (first.system, first.prefix) == (second.system, second.prefix)
+    assert 'o/r' in first.prefix
+    for value in ('Title A', 'Body A', 'diff A'):
+        assert value not in first.prefix
+        assert value in first.suffix
+
+
+def test_split_context_keeps_sections_together():
+    sections = [
+        '## Diff\n```diff\n+a\n\n-b\n```',
+        '## a.py (full)\n```python\n' + 'a\n' * 12 + '```',
+        '## Semantic search for: q\n### b.py\n```\nb\n```',
+        '## c.py (full)\n```python\n' + 'c = 1\n' * 40 + '## not a header\n```',
+    ]
+    chunks = split_context('\n\n'.join(sections), max_chars=90)
+
+    # Blank lines inside a section do not split it; whole sections are packed.
+    assert chunks[0] == f'{sections[0]}\n\n{sections[1]}'
+    assert chunks[1] == sections[2]
+    assert all(len(chunk) <= 90 for chunk in chunks)
+    # The oversized section is cut with its fence closed and re-opened.
+    rest = chunks[2:]
+    assert len(rest) > 1
+    assert rest[0].startswith('## c.py (full)\n```python\n')
+    for chunk in rest:
+        assert chunk.endswith('\n```')
+    for chunk in rest[1:]:
+        assert chunk.startswith('```python\n')
+    assert sum(chunk.count('c = 1') for chunk in rest) == 40
+    assert rest[-1].endswith('## not a header\n```')
+    assert split_context('small', max_chars=90) == ['small']
+
+
+def test_generate_review_sends_prefix_and_records_cached_tokens(
+    mock_openai_client,
+):
+    response = MagicMock()
+    response.choices = [MagicMock(message=MagicMock(content='ok'))]
+    response.usage.prompt_tokens = 1200
+    response.usage.completion_tokens = 10
+    response.usage.total_tokens = 1210
+    response.usage.prompt_tokens_details.cached_tokens = 1024
+    mock_openai_client.chat.completions.create.return_value = response
+    metrics.reset()
+
+    with capture(stage='llm'):
+        generate_review(
+            mock_openai_client,
+            'system',
+            'suffix',
+            user_prefix='prefix',
+            prompt_cache_key='ai-pr-review:o/r',
+        )
+
+    call_args = mock_openai_client.chat.completions.create.call_args[1]
+    assert [m['content'] for m in call_args['messages']] == [
+        'system',
+        'prefix',
+        'suffix',
+    ]
+    assert call_args['extra_body'] == {'prompt_cache_key': 'ai-pr-review:o/r'}
+    counters = metrics.summary()['stage=llm']['counters']
+    assert counters['llm_cached_tokens'] == 1024
+
+
+def test_review_with_llm_reviews_chunks_behind_one_prefix():
+    with (
+        patch('ai_pr_review.llm.setup_openai_client'),
+        patch('ai_pr_review.llm.generate_review') as mock_generate,
+    ):
+        mock_generate.side_effect = ['first', 'second']
+        result = review_with_llm(
+            'T', 'D', 'x' * 50 + '\n\n' + 'y' * 50, repo='o/r', max_context_chars=60
+        )
+
+    prefixes = {c.kwargs['user_prefix'] for c in mock_generate.call_args_list}
+    assert len(prefixes) == 1
+    assert 'part 2 of 2' in mock_generate.call_args_list[1].args[2]
+    assert result == '## Part 1 of 2\n\nfirst\n\n## Part 2 of 2\n\nsecond'
+
+
+def test_review_with_llm_resumes_finished_chunks():
+    context = 'x' * 50 + '\n\n' + 'y' * 50
+    done = {}
+    with (
+        patch('ai_pr_review.llm.setup_openai_client'),
+        patch('ai_pr_review.llm.generate_review') as mock_generate,
+    ):
+        mock_generate.side_effect = ['first', RuntimeError('timeout')]
+        with pytest.raises(RuntimeError):
+            review_with_llm('T', 'D', context, max_context_chars=60, chunk_reviews=done)
+        assert list(done.values()) == ['first']
+
+        mock_generate.side_effect = ['second']
+        result = review_with_llm(
+            'T', 'D', context, max_context_chars=60, chunk_reviews=done
+        )
+
+    assert mock_generate.call_count == 3
+    assert result == '## Part 1 of 2\n\nfirst\n\n## Part 2 of 2\n\nsecond'
@@ -0,0 +1,208 @@
+"""Tests for logkit spans and metrics."""
+
+import json
+import logging
+import queue
+import threading
+
+import pytest
+
+import logkit
+from logkit import capture, log_span_summary, metrics, record, span, write_metrics
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_capture_aggregates_per_span_name():
+    for size in (10, 32):
+        with capture(stage='fetch'):
+            record(bytes_downloaded=size, ignored='x')
+    with pytest.raises(ValueError):
+        with capture(stage='fetch'):
+            raise ValueError('boom')
+    record(outside_span=1)
+
+    summary = metrics.summary()
+    fetch = summary['stage=fetch']
+    assert fetch['count'] == 3
+    assert fetch['errors'] == 1
+    assert fetch['counters'] == {'bytes_downloaded': 42}
+    assert sum(fetch['dur_ms_buckets'].values()) == 3
+    assert fetch['cpu_ms_sum'] >= 0
+    assert list(summary) == ['stage=fetch']
+
+
+def test_record_targets_innermost_span():
+    with capture(work='outer'):
+        with capture(stage='inner'):
+            record(lines=3)
+        record(lines=1)
+
+    summary = metrics.summary()
+    assert summary['stage=inner']['counters'] == {'lines': 3}
+    assert summary['work=outer']['counters'] == {'lines': 1}
+
+
+def test_prometheus_and_json_export(tmp_path):
+    with capture(stage='llm'):
+        record(llm_total_tokens=7)
+
+    text = metrics.prometheus()
+    assert 'logkit_span_duration_ms_count{span="stage=llm"} 1' in text
+    assert 'logkit_span_duration_ms_bucket{span="stage=llm",le="+Inf"} 1' in text
+    assert (
+        'logkit_span_counter_total{span="stage=llm",counter="llm_total_tokens"} 7'
+        in text
+    )
+
+    json_path = tmp_path / 'metrics.json'
+    prom_path = tmp_path / 'metrics.prom'
+    write_metrics(str(json_path), str(prom_path))
+    assert json.loads(json_path.read_text())['stage=llm']['count'] == 1
+    assert prom_path.read_text() == text
+
+
+class _FakeLog:
+    def __init__(self):
+        self.events = []
+
+    def info(self, event, **kw):
+        self.events.append((event, kw))
+
+    exception = info
+
+
+@pytest.fixture
+def fake_log(monkeypatch):
+    fake = _FakeLog()
+    monkeypatch.setattr(logkit, 'log', fake)
+    monkeypatch.setattr(logkit, '_SUMMARY_SEEN', {})
+    monkeypatch.setattr(logkit, '_SAMPLE_SEQ', {})
+    return fake
+
+
+def test_span_aggregates_without_per_call_records(fake_log):
+    for _ in range(3):
+        with span(step='file_section'):
+            record(lines=2)
+
+    assert fake_log.events == []
+    stats = metrics.summary()['step=file_section']
+    assert stats['count'] == 3
+    assert stats['counters'] == {'lines': 6}
+    assert stats['cpu_ms_sum'] == 0
+
+
+def test_span_sampling_promotes_to_full_capture(fake_log):
+    for _ in range(4):
+        with span(step='hunk', sample=0.5):
+            pass
+
+    ends = [kw for event, kw in fake_log.events if event == 'END']
+    assert len(ends) == 2
+    assert metrics.summary()['step=hunk']['count'] == 4
+
+
+def test_log_span_summary_reports_deltas(fake_log):
+    for _ in range(2):
+        with span(step='scan'):
+            record(files=1)
+    log_span_summary()
+    with span(step='scan'):
+        record(files=1)
+    log_span_summary()
+    log_span_summary()
+
+    summaries = [kw for event, kw in fake_log.events if event == 'SPAN_SUMMARY']
+    assert [(s['count'], s['files']) for s in summaries] == [(2, 2), (1, 1)]
+    assert summaries[0]['span'] == 'step=scan'
+
+
+def test_span_ids_are_unique():
+    ids = {logkit._next_span_id() for _ in range(1000)}
+    assert len(ids) == 1000
+
+
+def _record(msg):
+    return logging.LogRecord('t', logging.INFO, __file__, 1, msg, None, None)
+
+
+def test_queue_sink_drops_when_full():
+    sink = logkit._QueueSink(queue.Queue(maxsize=2), policy='drop')
+    for i in range(5):
+        sink.handle(_record(f'm{i}'))
+
+    assert sink.queue.qsize() == 2
+    assert sink.dropped == 3
+
+
+def test_sink_writer_flushes_batches_to_file(tmp_path):
+    path = tmp_path / 'out.log'
+    handler = logkit._make_file_handler(path, rotate_mb=1, batched=True)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    q = queue.Queue()
+    sink = logkit._QueueSink(q, policy='block')
+    writer = logkit._SinkWriter(q, [handler], batch=4)
+    writer.start()
+
+    for i in range(10):
+        sink.handle(_record(f'line {i}'))
+    writer.stop()
+
+    assert path.read_text().splitlines() == [f'line {i}' for i in range(10)]
+
+
+def test_active_spans_tracked_only_when_enabled():
+    me = threading.get_ident()
+    with capture(stage='untracked'):
+        assert logkit.active_spans() == {}
+    logkit.track_spans(True)
+    try:
+        with capture(stage='outer'), span(file='inner'):
+            assert logkit.active_spans()[me] == ('stage=outer', 'file=inner')
+        assert logkit.active_spans() == {}
+    finally:
+        logkit.track_spans(False)
+
+
+def test_record_rejects_end_record_field_names():
+    with capture(stage='reserved'):
+        with pytest.raises(ValueError, match='dur_ms, status'):
+            record(status=1, dur_ms=2)
+        record(lines=1)
+
+    assert metrics.summary()['stage=reserved']['counters'] == {'lines': 1}
+
+
+def test_span_sample_default_not_read_per_span(monkeypatch):
+    monkeypatch.setenv('LOG_SPAN_SAMPLE', '0.25')
+    assert span(step='env').sample == 0
+
+    monkeypatch.setattr(logkit, '_SPAN_SAMPLE', 0.5)
+    assert span(step='configured').sample == 0.5
+
+
+def test_forced_configure_replaces_handlers(monkeypatch, tmp_path):
+    path = tmp_path / 'run.log'
+    monkeypatch.setenv('LOG_FILE', str(path))
+    monkeypatch.setenv('LOG_PROFILE', 'prod')
+    try:
+        logkit.configure(force=True)
+        logkit.configure(force=True)
+        root = logging.getLogger()
+        assert len([h for h in root.handlers if h in logkit._INSTALLED]) == 1
+        sinks = [t for t in threading.enumerate() if t.name == 'logkit-sink']
+        assert len(sinks) == 1
+
+        logkit.log.info('written once')
+        logkit._teardown()  # stops the writer, flushing the file
+        lines = path.read_text().splitlines()
+        assert len([line for line in lines if 'written once' in line]) == 1
+    finally:
+        monkeypatch.undo()
+        logkit.configure(force=True)
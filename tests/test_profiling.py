@@ -0,0 +1,71 @@
+"""Tests for the sampling profiler."""
+
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_pr_review.profiling import SamplingProfiler, hotspot_table
+from logkit import capture, carry_spans
+
+
+def _busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+def _slow_parse():
+    _busy(0.15)
+
+
+def test_profiler_attributes_samples_to_stages(tmp_path):
+    with SamplingProfiler(interval_s=0.002) as profiler:
+        _busy(0.02)  # outside any span: not sampled
+        with capture(cli='run'):
+            with capture(stage='context'):
+                _slow_parse()
+            with capture(stage='llm'):
+                _busy(0.05)
+
+    stages = profiler.by_stage()
+    assert set(stages) <= {'stage=context', 'stage=llm', 'cli=run'}
+    context = stages['stage=context']
+    assert sum(context.values()) > sum(stages['stage=llm'].values())
+    assert any(leaf.startswith('_busy (') for leaf in context)
+
+    table = hotspot_table(profiler, top_n=3)
+    assert table.startswith('stage=context: ')
+    assert '_busy (tests/test_profiling.py:' in table
+
+    collapsed = tmp_path / 'out.collapsed'
+    profiler.write(str(collapsed))
+    line = next(
+        line for line in collapsed.read_text().splitlines() if '_slow_parse' in line
+    )
+    stack, count = line.rsplit(' ', 1)
+    assert stack.startswith('cli=run;stage=context;')
+    assert int(count) > 0
+
+    speedscope = tmp_path / 'out.json'
+    profiler.write(str(speedscope))
+    data = json.loads(speedscope.read_text())
+    profile = data['profiles'][0]
+    assert profile['type'] == 'sampled'
+    assert len(profile['samples']) == len(profile['weights'])
+    names = [frame['name'] for frame in data['shared']['frames']]
+    assert names[0] == 'cli=run'
+    assert 0 < profile['endValue'] < 1
+
+
+def test_profiler_samples_pool_workers_under_caller_spans():
+    with SamplingProfiler(interval_s=0.002) as profiler:
+        with capture(stage='context'):
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                list(pool.map(carry_spans(_busy), [0.1, 0.1]))
+
+    workers = [
+        count
+        for (spans, stack), count in profiler.samples.items()
+        if spans == ('stage=context',) and any('_worker' in f for f in stack)
+    ]
+    assert sum(workers) > 0
@@ -0,0 +1,232 @@
+"""Tests for posting reviews back to GitHub."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from ai_pr_review import github
+from ai_pr_review.errors import GitHubError
+from ai_pr_review.publish import (
+    RateLimit,
+    inline_comments,
+    publish_review,
+    send_with_retries,
+)
+
+DIFF = """diff --git a/app.py b/app.py
+index 1111111..2222222 100644
+--- a/app.py
++++ b/app.py
+@@ -1,3 +1,4 @@
+ import os
+-x = 1
++x = 2
++y = x * 2
+ print(x)
+diff --git a/old.py b/old.py
+deleted file mode 100644
+index 3333333..0000000
+--- a/old.py
++++ /dev/null
+@@ -1 +0,0 @@
+-gone = True
+"""
+
+REVIEW = """Overall this looks fine.
+
+- `app.py:3` doubles `x` without a name that says why.
+  Consider a constant.
+- `app.py:40` is outside the diff.
+- `old.py:1` was deleted.
+- `app.py:3` repeated finding.
+"""
+
+
+def test_inline_comments_map_to_hunks():
+    comments = inline_comments(REVIEW, DIFF)
+
+    assert comments == [
+        {
+            'path': 'app.py',
+            'line': 3,
+            'side': 'RIGHT',
+            'body': '`app.py:3` doubles `x` without a name that says why.\n'
+            'Consider a constant.',
+        }
+    ]
+
+
+class _Stub:
+    """A local GitHub API that answers with a queue of canned responses."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append((self.path, None))
+                self._respond()
+
+            def do_POST(self):
+                length = int(self.headers['Content-Length'])
+                stub.requests.append((self.path, json.loads(self.rfile.read(length))))
+                self._respond()
+
+            def _respond(self):
+                status, headers, body = stub.responses.pop(0)
+                if callable(body):
+                    body = body()
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    monkeypatch.setattr('ai_pr_review.publish.rate_limit', RateLimit())
+    return []
+
+
+def _publish(stub, sleeps, monkeypatch):
+    monkeypatch.setattr(github, 'GITHUB_API_URL', stub.url)
+    return publish_review(
+        'o',
+        'r',
+        7,
+        'abc123',
+        REVIEW,
+        DIFF,
+        session=requests.Session(),
+        sleep=sleeps.append,
+    )
+
+
+def test_publish_posts_one_review_after_rate_limit(monkeypatch, sleeps):
+    created = {'id': 42, 'html_url': 'https://example.com/r/42'}
+    with _Stub(
+        [
+            (429, {'Retry-After': '2'}, {'message': 'slow down'}),
+            (200, {'X-RateLimit-Remaining': '10'}, created),
+        ]
+    ) as stub:
+        result = _publish(stub, sleeps, monkeypatch)
+
+    assert result == {'review_id': 42, 'url': created['html_url'], 'comments': 1}
+    assert sleeps == [2.0]
+    assert len(stub.requests) == 2
+    path, body = stub.requests[-1]
+    assert path == '/repos/o/r/pulls/7/reviews'
+    assert body['commit_id'] == 'abc123'
+    assert body['event'] == 'COMMENT'
+    assert body['body'].startswith(REVIEW + '\n\n<!-- ai-pr-review:')
+    assert [(c['path'], c['line']) for c in body['comments']] == [('app.py', 3)]
+
+
+def test_publish_falls_back_to_body_when_comments_rejected(monkeypatch, sleeps):
+    with _Stub(
+        [
+            (422, {}, {'message': 'Unprocessable'}),
+            (200, {}, {'id': 1}),
+        ]
+    ) as stub:
+        result = _publish(stub, sleeps, monkeypatch)
+
+    assert result['comments'] == 0
+    assert [len(body['comments']) for _, body in stub.requests] == [1, 0]
+
+
+def test_publish_retries_server_errors_then_gives_up(monkeypatch, sleeps):
+    # Each 502 is followed by a check that the review was not created anyway.
+    with _Stub([(502, {}, {}), (200, {}, [])] * 4) as stub:
+        with pytest.raises(GitHubError, match='HTTP 502'):
+            _publish(stub, sleeps, monkeypatch)
+
+    assert [path for path, _ in stub.requests] == [
+        '/repos/o/r/pulls/7/reviews',
+        '/repos/o/r/pulls/7/reviews?per_page=100&page=1',
+    ] * 4
+    assert sleeps == [1.0, 2.0, 4.0]
+
+
+def test_publish_does_not_repost_after_ambiguous_failure(monkeypatch, sleeps):
+    def listing_for(stub):
+        _, body = stub.requests[0]
+        return [
+            {'id': 5, 'commit_id': 'abc123', 'body': 'a human review'},
+            {'id': 9, 'commit_id': 'abc123', 'body': body['body']},
+        ]
+
+    created = {'id': 9, 'html_url': 'https://example.com/r/9'}
+    with _Stub([(504, {}, {})]) as stub:
+        stub.responses.append((200, {}, lambda: listing_for(stub)))
+        stub.responses.append((200, {}, created))
+        result = _publish(stub, sleeps, monkeypatch)
+
+    assert result == {'review_id': 9, 'url': created['html_url'], 'comments': 1}
+    assert [body is None for _, body in stub.requests] == [False, True, True]
+    assert stub.requests[-1][0] == '/repos/o/r/pulls/7/reviews/9'
+    assert sleeps == []
+
+
+class _Session:
+    def __init__(self, error):
+        self.error = error
+        self.calls = 0
+
+    def request(self, *args, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+def test_send_with_retries_only_retries_unsent_posts(sleeps):
+    timeout = _Session(requests.ReadTimeout('read timed out'))
+    with pytest.raises(GitHubError, match='read timed out'):
+        send_with_retries(
+            'POST', 'http://x', json={}, session=timeout, sleep=sleeps.append
+        )
+    assert timeout.calls == 1
+
+    refused = requests.Session()
+    with pytest.raises(GitHubError):
+        send_with_retries(
+            'POST', 'http://127.0.0.1:1', json={}, session=refused, sleep=sleeps.append
+        )
+    assert sleeps == [1.0, 2.0, 4.0]
+
+    sleeps.clear()
+    with pytest.raises(GitHubError):
+        send_with_retries('GET', 'http://x', session=timeout, sleep=sleeps.append)
+    assert timeout.calls == 1 + 4
+
+
+def test_rate_limit_waits_for_reset():
+    limits = RateLimit(clock=lambda: 100.0)
+    response = requests.Response()
+    response.headers.update({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '130'})
+    limits.update(response)
+
+    assert limits.wait_s() == 30.0
@@ -0,0 +1,148 @@
+"""Tests for shared clones and per-PR worktrees."""
+
+import os
+import subprocess
+import threading
+
+import pytest
+
+from ai_pr_review.errors import RepoError
+from ai_pr_review.repo import RepoWorkspace
+from ai_pr_review.scheduler import review_batch
+
+
+def _git(repo, *args):
+    return subprocess.run(
+        ['git', *args], cwd=repo, check=True, capture_output=True, text=True
+    ).stdout.strip()
+
+
+@pytest.fixture
+def remote(tmp_path, monkeypatch):
+    """A served repository whose PR heads are only reachable via refs/pull."""
+    work = tmp_path / 'work'
+    work.mkdir()
+    _git(work, 'init', '-q', '-b', 'main')
+    _git(work, 'config', 'user.email', 'test@example.com')
+    _git(work, 'config', 'user.name', 'Test')
+    (work / 'app.py').write_text('x = 0\n')
+    _git(work, 'add', '.')
+    _git(work, 'commit', '-q', '-m', 'initial')
+    heads = []
+    for number in range(1, 4):
+        _git(work, 'checkout', '-q', '-b', f'pr{number}', 'main')
+        (work / 'app.py').write_text(f'x = {number}\n')
+        _git(work, 'commit', '-q', '-am', f'pr {number}')
+        heads.append(_git(work, 'rev-parse', 'HEAD'))
+    _git(work, 'checkout', '-q', 'main')
+
+    served = tmp_path / 'served' / 'o'
+    served.mkdir(parents=True)
+    bare = served / 'r.git'
+    _git(tmp_path, 'clone', '-q', '--bare', '--single-branch', str(work), str(bare))
+    for number, sha in enumerate(heads, start=1):
+        _git(bare, 'update-ref', f'refs/pull/{number}/head', sha)
+    monkeypatch.setenv('GITHUB_URL', (tmp_path / 'served').as_uri())
+    return heads
+
+
+def test_worktrees_share_one_fetch(remote):
+    workspace = RepoWorkspace('o', 'r')
+    workspace.want(*remote)
+    try:
+        worktrees = workspace.add_worktrees(remote, max_workers=3)
+        assert workspace.fetches == 1
+        for number, worktree in enumerate(worktrees, start=1):
+            with open(os.path.join(worktree, 'app.py')) as fh:
+                assert fh.read() == f'x = {number}\n'
+            assert _git(worktree, 'rev-parse', 'HEAD') == remote[number - 1]
+
+        # Already present: no second fetch.
+        again = workspace.add_worktree(remote[0])
+        assert workspace.fetches == 1
+        workspace.remove_worktree(again)
+        assert not os.path.exists(again)
+    finally:
+        path = workspace.path
+        workspace.close()
+    assert not os.path.exists(path)
+    assert not any(os.path.exists(w) for w in worktrees)
+
+
+def test_concurrent_add_worktree_is_safe(remote):
+    workspace = RepoWorkspace('o', 'r')
+    workspace.want(*remote)
+    results, errors = {}, []
+
+    def add(sha):
+        try:
+            results[sha] = workspace.add_worktree(sha)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=add, args=(sha,)) for sha in remote * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    try:
+        assert errors == []
+        assert workspace.fetches == 1
+        assert os.getcwd() != workspace.path
+    finally:
+        workspace.close()
+
+
+def test_unknown_sha_raises_repo_error(remote):
+    workspace = RepoWorkspace('o', 'r')
+    try:
+        with pytest.raises(RepoError):
+            workspace.add_worktree('0' * 40)
+    finally:
+        workspace.close()
+
+
+def test_review_batch_uses_shared_worktrees(remote):
+    seen = []
+
+    def fake_fetch(owner, name, number):
+        return 'diff', remote[number - 1], 't', 'd'
+
+    def fake_review(owner, name, number, *, model, fetch_pr_data_func, **stages):
+        worktree = stages['clone_repo_func'](owner, name, False)
+        stages['checkout_func'](worktree, remote[number - 1])
+        with open(os.path.join(worktree, 'app.py')) as fh:
+            seen.append(fh.read())
+        stages['cleanup_func'](worktree, False)
+        return 'ok'
+
+    jobs = review_batch(
+        [('o', 'r', 1), ('o', 'r', 2), ('o', 'r', 3)],
+        workers=2,
+        per_repo_limit=2,
+        fetch_pr_data_func=fake_fetch,
+        review_pr_func=fake_review,
+    )
+
+    assert [job.error for job in jobs] == [None] * 3
+    assert sorted(seen) == ['x = 1\n', 'x = 2\n', 'x = 3\n']
+
+
+def test_unfetchable_sha_does_not_block_the_batch(remote):
+    bad = '0' * 40
+    workspace = RepoWorkspace('o', 'r')
+    workspace.want(bad, *remote)
+    try:
+        worktree = workspace.add_worktree(remote[0])
+        assert _git(worktree, 'rev-parse', 'HEAD') == remote[0]
+        # The batch failed, then the caller's SHA was fetched alone.
+        assert workspace.fetches == 1
+        assert bad not in workspace._wanted
+        assert remote[1] not in workspace._present
+
+        workspace.add_worktree(remote[1])
+        assert workspace.fetches == 2
+        with pytest.raises(RepoError, match='Cannot fetch'):
+            workspace.fetch(bad)
+    finally:
+        workspace.close()
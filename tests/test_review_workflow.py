@@ -1,5 +1,9 @@
+import pytest
+
 from ai_pr_review.context import process_pr_context
+from ai_pr_review.errors import GitHubError, PublishError
 from ai_pr_review.review import review_pr
+from logkit import metrics
 
 
 def test_review_pr_allows_dependency_injection():
@@ -20,7 +24,8 @@ def test_review_pr_allows_dependency_injection():
         calls.append('context')
         return 'ctx'
 
-    def fake_review(title, desc, ctx, model):
+    def fake_review(title, desc, ctx, model, repo):
+        assert repo == 'o/r'
         calls.append('review')
         return 'result'
 
@@ -39,6 +44,7 @@ def test_review_pr_allows_dependency_injection():
         process_context_func=fake_context,
         review_with_llm_func=fake_review,
         cleanup_func=fake_cleanup,
+        fast_path=False,
     )
 
     assert result == 'result'
@@ -52,6 +58,29 @@ def test_review_pr_allows_dependency_injection():
     ]
 
 
+def test_review_pr_records_stage_metrics():
+    metrics.reset()
+
+    review_pr(
+        'o',
+        'r',
+        1,
+        fetch_pr_data_func=lambda *_: ('line1\nline2\n', 'sha', 't', 'd'),
+        clone_repo_func=lambda *_: '/tmp/repo',
+        checkout_func=lambda *_: None,
+        process_context_func=lambda *_: 'x' * 40,
+        review_with_llm_func=lambda *_a, **_kw: 'ok',
+        cleanup_func=lambda *_: None,
+        fast_path=False,
+    )
+
+    summary = metrics.summary()
+    for stage in ('fetch', 'clone', 'checkout', 'context', 'llm'):
+        assert summary[f'stage={stage}']['count'] == 1
+    assert summary['stage=fetch']['counters']['diff_lines'] == 2
+    assert summary['stage=context']['counters']['context_tokens_est'] == 10
+
+
 def test_review_pr_with_local_repo(tmp_path):
     """Run the review workflow using a local git repo."""
     import shutil
@@ -101,7 +130,8 @@ def test_review_pr_with_local_repo(tmp_path):
         contexts['value'] = context
         return context
 
-    def fake_review(title, desc, ctx, model):
+    def fake_review(title, desc, ctx, model, repo):
+        assert repo == 'o/r'
         return 'ok'
 
     result = review_pr(
@@ -113,7 +143,255 @@ def test_review_pr_with_local_repo(tmp_path):
         checkout_func=local_checkout,
         process_context_func=capture_context,
         review_with_llm_func=fake_review,
+        fast_path=False,
     )
 
     assert result == 'ok'
     assert contexts['value']
+
+
+def _code_diff(lines):
+    return (
+        'diff --git a/app.py b/app.py\n'
+        '--- a/app.py\n'
+        '+++ b/app.py\n'
+        f'@@ -1,0 +1,{lines} @@\n' + '+x = 1\n' * lines
+    )
+
+
+def test_review_pr_fast_path_skips_git_for_docs_only_pr():
+    metrics.reset()
+    diff_text = (
+        'diff --git a/README.md b/README.md\n'
+        '--- a/README.md\n'
+        '+++ b/README.md\n'
+        '@@ -1,0 +1,300 @@\n' + '+docs\n' * 300
+    )
+    contexts = []
+
+    def fail(*_args):
+        raise AssertionError('git stage should be skipped')
+
+    def fake_review(title, desc, ctx, model, repo):
+        contexts.append(ctx)
+        return 'ok'
+
+    result = review_pr(
+        'o',
+        'r',
+        1,
+        fetch_pr_data_func=lambda *_: (diff_text, 'sha', 't', 'd'),
+        clone_repo_func=fail,
+        checkout_func=fail,
+        process_context_func=fail,
+        review_with_llm_func=fake_review,
+        cleanup_func=fail,
+    )
+
+    assert result == 'ok'
+    assert contexts[0].startswith('## Diff\n```diff\ndiff --git a/README.md')
+    assert 'Diff-only review (docs-only change)' in contexts[0]
+    summary = metrics.summary()
+    assert summary['stage=triage']['counters'] == {
+        'files': 1,
+        'changed_lines': 300,
+    }
+    assert 'stage=clone' not in summary
+
+
+def test_review_pr_fast_path_routes_code_by_size():
+    calls = []
+
+    def run(diff_text):
+        calls.clear()
+        review_pr(
+            'o',
+            'r',
+            1,
+            fetch_pr_data_func=lambda *_: (diff_text, 'sha', 't', 'd'),
+            clone_repo_func=lambda *_: calls.append('clone') or '/tmp/repo',
+            checkout_func=lambda *_: None,
+            process_context_func=lambda *_: 'ctx',
+            review_with_llm_func=lambda *_a, **_kw: 'ok',
+            cleanup_func=lambda *_: None,
+        )
+        return list(calls)
+
+    assert run(_code_diff(5)) == []
+    assert run(_code_diff(50)) == ['clone']
+
+
+def test_review_pr_drops_generated_files_before_context():
+    diff_text = _code_diff(30) + (
+        'diff --git a/yarn.lock b/yarn.lock\n'
+        '--- a/yarn.lock\n'
+        '+++ b/yarn.lock\n'
+        '@@ -1,0 +1,2 @@\n'
+        '+a\n'
+        '+b\n'
+    )
+    seen = {}
+
+    def fake_context(temp_dir, diff):
+        seen['diff'] = diff
+        return 'ctx'
+
+    def fake_review(title, desc, ctx, model, repo):
+        seen['ctx'] = ctx
+        return 'ok'
+
+    review_pr(
+        'o',
+        'r',
+        1,
+        fetch_pr_data_func=lambda *_: (diff_text, 'sha', 't', 'd'),
+        clone_repo_func=lambda *_: '/nonexistent',
+        checkout_func=lambda *_: None,
+        process_context_func=fake_context,
+        review_with_llm_func=fake_review,
+        cleanup_func=lambda *_: None,
+    )
+
+    assert seen['diff'] == _code_diff(30)
+    assert seen['ctx'] == (
+        'ctx\n\n## Skipped files (not reviewed)\nyarn.lock: lockfile, +2 -0 lines'
+    )
+
+
+def test_review_pr_publishes_after_llm():
+    posted = []
+
+    def run(publish):
+        return review_pr(
+            'o',
+            'r',
+            3,
+            fetch_pr_data_func=lambda *_: (_code_diff(2), 'sha', 't', 'd'),
+            review_with_llm_func=lambda *_a, **_kw: 'ok',
+            publish=publish,
+            publish_func=lambda *args: posted.append(args),
+        )
+
+    assert run(False) == 'ok'
+    assert posted == []
+    assert run(True) == 'ok'
+    assert posted == [('o', 'r', 3, 'sha', 'ok', _code_diff(2))]
+
+
+def test_review_pr_keeps_review_when_publish_fails():
+    def failing_publish(*_args):
+        raise GitHubError('HTTP 502')
+
+    with pytest.raises(PublishError, match='HTTP 502') as excinfo:
+        review_pr(
+            'o',
+            'r',
+            3,
+            fetch_pr_data_func=lambda *_: (_code_diff(2), 'sha', 't', 'd'),
+            review_with_llm_func=lambda *_a, **_kw: 'the review',
+            publish=True,
+            publish_func=failing_publish,
+        )
+    assert excinfo.value.review_text == 'the review'
+
+
+def test_review_pr_resumes_after_llm_failure(tmp_path):
+    calls = []
+
+    def failing_llm(*_args, **_kwargs):
+        raise RuntimeError('llm down')
+
+    def run(llm, resume):
+        return review_pr(
+            'o',
+            'r',
+            4,
+            fetch_pr_data_func=lambda *_: (_code_diff(50), 'sha', 't', 'd'),
+            clone_repo_func=lambda *_: calls.append('clone') or '/tmp/repo',
+            checkout_func=lambda *_: None,
+            process_context_func=lambda *_: calls.append('context') or 'ctx',
+            review_with_llm_func=llm,
+            cleanup_func=lambda *_: None,
+            checkpoint_dir=str(tmp_path),
+            resume=resume,
+        )
+
+    with pytest.raises(RuntimeError):
+        run(failing_llm, resume=False)
+    assert calls == ['clone', 'context']
+
+    seen = {}
+
+    def fake_llm(title, desc, ctx, model, repo, chunk_reviews):
+        seen['ctx'] = ctx
+        return 'ok'
+
+    assert run(fake_llm, resume=True) == 'ok'
+    assert calls == ['clone', 'context']
+    assert seen['ctx'] == 'ctx'
+    # A finished review leaves no checkpoint behind.
+    assert not (tmp_path / 'o' / 'r' / '4').exists()
+
+    run(fake_llm, resume=True)
+    assert calls == ['clone', 'context'] * 2
+
+
+def test_review_pr_resumes_publish_with_the_same_model(tmp_path):
+    llm_calls = []
+    outcomes = [GitHubError('HTTP 502'), None]
+
+    def fake_llm(title, desc, ctx, model, repo, chunk_reviews):
+        llm_calls.append(model)
+        return f'review by {model}'
+
+    def flaky_publish(*args):
+        outcome = outcomes.pop(0)
+        if outcome is not None:
+            raise outcome
+        return {'review_id': 1}
+
+    def run(model):
+        return review_pr(
+            'o',
+            'r',
+            5,
+            model=model,
+            fetch_pr_data_func=lambda *_: (_code_diff(2), 'sha', 't', 'd'),
+            review_with_llm_func=fake_llm,
+            publish=True,
+            publish_func=flaky_publish,
+            checkpoint_dir=str(tmp_path),
+            resume=True,
+        )
+
+    with pytest.raises(PublishError):
+        run('a')
+    # Another model does not reuse the checkpointed review.
+    outcomes.insert(0, GitHubError('HTTP 502'))
+    with pytest.raises(PublishError):
+        run('b')
+    assert run('a') == 'review by a'
+    assert llm_calls == ['a', 'b']
+
+
+def test_review_pr_sends_repo_context_in_prefix():
+    seen = {}
+
+    def fake_review(title, desc, ctx, model, repo, repo_context):
+        seen['repo_context'] = repo_context
+        return 'ok'
+
+    review_pr(
+        'o',
+        'r',
+        1,
+        fetch_pr_data_func=lambda *_: (_code_diff(50), 'sha', 't', 'd'),
+        clone_repo_func=lambda *_: '/tmp/repo',
+        checkout_func=lambda *_: None,
+        process_context_func=lambda *_: 'ctx',
+        repo_context_func=lambda path: f'modules of {path}',
+        review_with_llm_func=fake_review,
+        cleanup_func=lambda *_: None,
+    )
+
+    assert seen['repo_context'] == 'modules of /tmp/repo'
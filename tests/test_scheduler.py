@@ -0,0 +1,161 @@
+"""Tests for cost-based review scheduling."""
+
+import threading
+import time
+
+import pytest
+
+from ai_pr_review.scheduler import (
+    FILE_COST,
+    ReviewJob,
+    ReviewScheduler,
+    estimate_review_cost,
+    parse_pr_ref,
+    queue_stats,
+    review_batch,
+)
+
+
+def _diff(files, lines_per_file=1):
+    out = []
+    for i in range(files):
+        out += [
+            f'diff --git a/f{i}.py b/f{i}.py',
+            'index 1111111..2222222 100644',
+            f'--- a/f{i}.py',
+            f'+++ b/f{i}.py',
+            f'@@ -1,0 +1,{lines_per_file} @@',
+            *(['+x = 1'] * lines_per_file),
+        ]
+    return '\n'.join(out) + '\n'
+
+
+def test_estimate_review_cost():
+    cost = estimate_review_cost(_diff(2, lines_per_file=3))
+    assert cost['files'] == 2
+    assert cost['lines'] == 16
+    assert cost['cost'] == 16 + 2 * FILE_COST
+
+
+def test_parse_pr_ref():
+    assert parse_pr_ref('octo/repo#12') == ('octo', 'repo', 12)
+    assert parse_pr_ref('octo repo 12') == ('octo', 'repo', 12)
+    with pytest.raises(ValueError):
+        parse_pr_ref('octo/repo')
+
+
+def test_small_jobs_run_cheapest_first():
+    order = []
+    scheduler = ReviewScheduler(
+        lambda job: order.append(job.pr_number) or 'ok', workers=1, large_workers=0
+    )
+    for number, cost in [(1, 50_000), (2, 300), (3, 10), (4, 900)]:
+        scheduler.submit(ReviewJob('o', f'r{number}', number, cost=cost))
+    scheduler.start()
+    scheduler.close()
+    jobs = scheduler.join()
+
+    assert order == [3, 2, 4, 1]
+    assert {job.pr_number: job.lane for job in jobs}[1] == 'large'
+    assert all(job.review == 'ok' for job in jobs)
+
+
+def test_large_lane_does_not_block_small_prs():
+    release = threading.Event()
+    started = []
+
+    def run(job):
+        started.append(job.pr_number)
+        if job.lane == 'large':
+            release.wait(5)
+        return 'ok'
+
+    scheduler = ReviewScheduler(run, workers=2, large_workers=1)
+    scheduler.submit(ReviewJob('o', 'big', 1, cost=100_000))
+    for number in range(2, 6):
+        scheduler.submit(ReviewJob('o', f'r{number}', number, cost=100))
+    scheduler.start()
+    deadline = time.monotonic() + 5
+    while len(started) < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    scheduler.close()
+    scheduler.join()
+
+    assert started.index(1) < 2
+    assert sorted(started) == [1, 2, 3, 4, 5]
+
+
+def test_per_repo_limit():
+    lock = threading.Lock()
+    running: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    def run(job):
+        with lock:
+            running[job.repo] = running.get(job.repo, 0) + 1
+            peak[job.repo] = max(peak.get(job.repo, 0), running[job.repo])
+        time.sleep(0.02)
+        with lock:
+            running[job.repo] -= 1
+        return 'ok'
+
+    scheduler = ReviewScheduler(run, workers=4, per_repo_limit=1)
+    for number in range(4):
+        scheduler.submit(ReviewJob('o', 'same', number, cost=10))
+    scheduler.submit(ReviewJob('o', 'other', 9, cost=10))
+    scheduler.start()
+    scheduler.close()
+    scheduler.join()
+
+    assert peak == {'o/same': 1, 'o/other': 1}
+
+
+def test_review_batch_with_fakes():
+    diffs = {1: _diff(20, 50), 2: _diff(1), 3: _diff(2)}
+    reviewed = []
+
+    def fake_fetch(owner, name, number):
+        if number == 4:
+            raise RuntimeError('not found')
+        return diffs[number], 'sha', 't', 'd'
+
+    def fake_review(
+        owner, name, number, *, model, publish, fetch_pr_data_func, **stages
+    ):
+        assert publish is False
+        assert set(stages) == {'clone_repo_func', 'checkout_func', 'cleanup_func'}
+        diff = fetch_pr_data_func(owner, name, number)[0]
+        assert diff == diffs[number]
+        reviewed.append(number)
+        return f'review {number}'
+
+    done = []
+    jobs = review_batch(
+        [('o', 'a', 1), ('o', 'b', 2), ('o', 'c', 3), ('o', 'd', 4)],
+        workers=1,
+        large_workers=0,
+        on_done=done.append,
+        fetch_pr_data_func=fake_fetch,
+        review_pr_func=fake_review,
+    )
+
+    by_number = {job.pr_number: job for job in jobs}
+    assert sorted(reviewed) == [1, 2, 3]
+    assert by_number[1].lane == 'large'
+    assert by_number[2].lane == 'small'
+    assert by_number[3].review == 'review 3'
+    assert by_number[4].lane == 'fetch'
+    assert isinstance(by_number[4].error, RuntimeError)
+    assert len(done) == 4
+
+    stats = queue_stats(jobs)
+    assert stats['small']['count'] == 2
+    assert stats['fetch'] == {
+        'count': 1,
+        'failed': 1,
+        'wait_ms_avg': 0.0,
+        'wait_ms_p50': 0.0,
+        'wait_ms_max': 0.0,
+    }
+    assert stats['large']['wait_ms_max'] >= 0
@@ -1,3 +1,4 @@
+import os
 import subprocess
 
 import pytest
@@ -38,3 +39,40 @@ def test_cli_catches_review_error(monkeypatch):
     with pytest.raises(SystemExit) as exc:
         cli_main(['o', 'r', '1'])
     assert exc.value.code == 1
+
+
+def test_fetch_pr_data_uses_configured_api_url(monkeypatch):
+    urls = []
+
+    class Response:
+        text = 'diff'
+        content = b'diff'
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {'head': {'sha': 'abc'}, 'title': 't', 'body': 'b'}
+
+    def fake_get(url, headers):
+        urls.append(url)
+        return Response()
+
+    import requests
+
+    monkeypatch.setattr(requests, 'get', fake_get)
+    monkeypatch.setattr(
+        'ai_pr_review.github.GITHUB_API_URL', 'http://127.0.0.1:9/api/v3'
+    )
+    assert fetch_pr_data('o', 'r', 7) == ('diff', 'abc', 't', 'b')
+    assert urls == ['http://127.0.0.1:9/api/v3/repos/o/r/pulls/7'] * 2
+
+
+def test_clone_repo_to_temp_dir_uses_github_url(monkeypatch):
+    calls = []
+    monkeypatch.setenv('GITHUB_URL', 'file:///srv/git/')
+    monkeypatch.setattr(subprocess, 'run', lambda cmd, **_kw: calls.append(cmd))
+
+    temp_dir = clone_repo_to_temp_dir('o', 'r')
+    assert calls == [['git', 'clone', 'file:///srv/git/o/r.git', temp_dir]]
+    os.rmdir(temp_dir)
@@ -0,0 +1,142 @@
+"""Tests for the precomputed repository summary."""
+
+import subprocess
+
+import pytest
+
+from ai_pr_review.context import process_pr_context, repo_context
+from ai_pr_review.index import SymbolIndex
+from ai_pr_review.summary import (
+    architecture_context,
+    build_repo_summary,
+    load_repo_summary,
+    main,
+    module_name,
+    repo_overview,
+    repo_summary,
+)
+
+
+def _git(repo, *args):
+    subprocess.run(['git', *args], cwd=repo, check=True, capture_output=True)
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    repo = tmp_path / 'repo'
+    pkg = repo / 'src' / 'pkg'
+    pkg.mkdir(parents=True)
+    (pkg / '__init__.py').write_text('')
+    (pkg / 'a.py').write_text(
+        'import os\nfrom .b import helper\nimport pkg.c\n\n'
+        'def run():\n    return helper()\n'
+    )
+    (pkg / 'b.py').write_text(
+        'class Base:\n    def method(self):\n        pass\n\n'
+        'def helper():\n    return 1\n'
+    )
+    (pkg / 'c.py').write_text('from . import b\nVALUE = 1\n')
+    _git(repo, 'init', '-q')
+    _git(repo, 'config', 'user.email', 'test@example.com')
+    _git(repo, 'config', 'user.name', 'Test')
+    _git(repo, 'add', '.')
+    _git(repo, 'commit', '-q', '-m', 'initial')
+    return repo
+
+
+def _index(repo, cache):
+    index = SymbolIndex.open(str(repo), str(cache))
+    index.refresh()
+    index.save()
+    return index
+
+
+def test_module_name():
+    assert module_name('src/pkg/a.py') == 'pkg.a'
+    assert module_name('pkg/__init__.py') == 'pkg'
+    assert module_name('tool.py') == 'tool'
+
+
+def test_build_repo_summary(git_repo, tmp_path):
+    summary = build_repo_summary(_index(git_repo, tmp_path / 'cache'))
+
+    modules = summary['modules']
+    assert modules['src/pkg/a.py'] == {
+        'module': 'pkg.a',
+        'symbols': ['function run'],
+        'imports': ['src/pkg/b.py', 'src/pkg/c.py'],
+    }
+    assert modules['src/pkg/b.py']['symbols'] == ['class Base', 'function helper']
+    assert modules['src/pkg/c.py']['imports'] == ['src/pkg/b.py']
+
+
+def test_summary_is_stored_per_commit(git_repo, tmp_path):
+    cache = tmp_path / 'cache'
+    index = _index(git_repo, cache)
+    assert load_repo_summary(index) is None
+    first = repo_summary(index)
+    assert load_repo_summary(index) == first
+
+    (git_repo / 'src' / 'pkg' / 'c.py').write_text('def extra():\n    pass\n')
+    _git(git_repo, 'commit', '-q', '-am', 'change c')
+    index = _index(git_repo, cache)
+    assert (index.parsed, index.reused) == (1, 3)
+    second = repo_summary(index)
+
+    assert second['commit'] != first['commit']
+    assert second['modules']['src/pkg/c.py']['imports'] == []
+    assert len(list(cache.glob('*.summary-*.json'))) == 2
+
+
+def test_architecture_context_lists_imports(git_repo, tmp_path):
+    summary = build_repo_summary(_index(git_repo, tmp_path / 'cache'))
+    text = architecture_context(summary, ['src/pkg/a.py', 'README.md'])
+
+    assert text.splitlines() == [
+        '## Repository architecture',
+        'pkg.a (src/pkg/a.py)',
+        '  defines: function run',
+        '  imports pkg.b: class Base, function helper',
+        '  imports pkg.c',
+    ]
+    assert architecture_context(summary, ['README.md']) == ''
+
+
+def test_process_pr_context_adds_architecture(git_repo, tmp_path):
+    diff_text = (
+        'diff --git a/src/pkg/a.py b/src/pkg/a.py\n'
+        'index 1111111..2222222 100644\n'
+        '--- a/src/pkg/a.py\n'
+        '+++ b/src/pkg/a.py\n'
+        '@@ -5,2 +5,2 @@\n'
+        ' def run():\n'
+        '-    return helper(0)\n'
+        '+    return helper()\n'
+    )
+    result = process_pr_context(
+        str(git_repo), diff_text, index_dir=str(tmp_path / 'cache')
+    )
+    assert '  imports pkg.b: class Base, function helper' in result
+
+
+def test_main_precomputes_summary(git_repo, tmp_path, capsys):
+    main([str(git_repo), '--index-dir', str(tmp_path / 'cache')])
+
+    assert '4 modules (4 files parsed, 0 reused)' in capsys.readouterr().out
+    assert list((tmp_path / 'cache').glob('*.summary-*.json'))
+
+
+def test_repo_context_lists_every_module(git_repo, tmp_path, monkeypatch):
+    monkeypatch.delenv('AI_PR_REVIEW_INDEX_DIR', raising=False)
+    text = repo_context(str(git_repo), index_dir=str(tmp_path / 'cache'))
+
+    assert text.splitlines() == [
+        '## Repository modules',
+        'pkg',
+        'pkg.a: function run',
+        'pkg.b: class Base, function helper',
+        'pkg.c',
+    ]
+    summary = build_repo_summary(_index(git_repo, tmp_path / 'cache'))
+    assert repo_overview(summary, max_chars=40).endswith('\n...')
+    assert repo_context(str(git_repo), index_dir='') == ''
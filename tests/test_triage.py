@@ -0,0 +1,79 @@
+"""Tests for diff-only triage."""
+
+from ai_pr_review.triage import (
+    SKIPPED_BASE_MS,
+    SKIPPED_PER_FILE_MS,
+    Triage,
+    diff_only_context,
+    estimated_saving_ms,
+    file_kind,
+    triage_patchset,
+)
+from logkit import capture, metrics
+
+
+def _diff(path, lines):
+    return (
+        f'diff --git a/{path} b/{path}\n'
+        f'--- a/{path}\n'
+        f'+++ b/{path}\n'
+        f'@@ -1,0 +1,{lines} @@\n' + '+x\n' * lines
+    )
+
+
+def test_file_kind():
+    assert file_kind('docs/guide.md') == 'docs'
+    assert file_kind('web/package-lock.json') == 'lockfile'
+    assert file_kind('static/app.min.js') == 'generated'
+    assert file_kind('proto/api_pb2.py') == 'generated'
+    assert file_kind('vendor/lib/util.py') == 'generated'
+    assert file_kind('src/app.py') == 'code'
+    assert file_kind('NOTES.txt') == 'docs'
+    assert file_kind('requirements-dev.txt') == 'code'
+    assert file_kind('requirements/base.txt') == 'code'
+    assert file_kind('native/CMakeLists.txt') == 'code'
+
+
+def test_triage_patchset():
+    assert triage_patchset('') == Triage('diff_only', 'empty', 0, 0, {})
+
+    lock = triage_patchset(_diff('uv.lock', 400))
+    assert (lock.path, lock.reason, lock.changed_lines) == (
+        'diff_only',
+        'lockfile-only',
+        400,
+    )
+
+    mixed = triage_patchset(_diff('README.md', 50) + _diff('yarn.lock', 50))
+    assert (mixed.path, mixed.reason) == ('diff_only', 'non-code')
+    assert mixed.kinds == {'docs': 1, 'lockfile': 1}
+
+    assert triage_patchset(_diff('app.py', 20)).reason == 'tiny'
+    assert triage_patchset(_diff('app.py', 21)).path == 'full'
+    three_files = _diff('a.py', 1) + _diff('b.py', 1) + _diff('c.py', 1)
+    assert triage_patchset(three_files).path == 'full'
+
+
+def test_diff_only_context():
+    triage = triage_patchset(_diff('README.md', 1))
+    context = diff_only_context(_diff('README.md', 1), triage)
+    assert context.startswith('## Diff\n```diff\ndiff --git a/README.md')
+    assert context.endswith('surrounding code is not shown.')
+
+
+def test_estimated_saving_ms():
+    metrics.reset()
+    triage = triage_patchset(_diff('README.md', 1) + _diff('docs/a.md', 1))
+    assert estimated_saving_ms(triage) == (
+        SKIPPED_BASE_MS + 2 * SKIPPED_PER_FILE_MS,
+        'diff size',
+    )
+
+    # Once a full review has timed the skipped stages, their average is used.
+    for stage in ('clone', 'context'):
+        with capture(stage=stage):
+            pass
+    saved_ms, source = estimated_saving_ms(triage)
+    assert source == 'observed'
+    assert saved_ms < SKIPPED_BASE_MS
+    metrics.reset()
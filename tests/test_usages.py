@@ -0,0 +1,34 @@
+"""Tests for batched symbol usage lookup."""
+
+from ai_pr_review.usages import find_symbol_usages_batch
+
+
+def test_find_symbol_usages_batch_groups_by_symbol(tmp_path):
+    (tmp_path / 'a.py').write_text('def foo():\n    return bar()\n')
+    (tmp_path / 'b.py').write_text('foo()\nfoobar = 1\nbar(foo)\n')
+    (tmp_path / 'bin.dat').write_bytes(b'foo\0bar')
+    (tmp_path / '.git').mkdir()
+    (tmp_path / '.git' / 'x').write_text('foo bar')
+
+    usages = find_symbol_usages_batch(str(tmp_path), ['foo', 'bar', 'missing'])
+
+    assert [(u['file'], u['line_number']) for u in usages['foo']] == [
+        ('a.py', 1),
+        ('b.py', 1),
+        ('b.py', 3),
+    ]
+    assert [(u['file'], u['line_number']) for u in usages['bar']] == [
+        ('a.py', 2),
+        ('b.py', 3),
+    ]
+    assert usages['missing'] == []
+    assert usages['foo'][0]['line'] == 'def foo():'
+
+
+def test_find_symbol_usages_batch_caps_per_symbol(tmp_path):
+    (tmp_path / 'many.py').write_text('x = 1\n' * 50)
+
+    usages = find_symbol_usages_batch(str(tmp_path), ['x'], max_per_symbol=20)
+
+    assert len(usages['x']) == 20
+    assert usages['x'][-1]['line_number'] == 20